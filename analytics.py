@@ -0,0 +1,239 @@
+import time
+from datetime import date, datetime, timedelta
+import logging
+from timeutils import period_bounds
+from lazy_imports import lazy_import, is_available
+
+# NumPy is optional; ReportsManager falls back to SQL reports without it.
+# It is imported when the first cube is built, not at startup.
+np = lazy_import('numpy')
+NUMPY_AVAILABLE = is_available('numpy')
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+DAY = 86400
+
+
+class SalesCube:
+    """Sales totals per product per day, held in NumPy arrays for report slicing
+
+    The cube has three planes of shape (products, days): quantity, revenue
+    and sale count. Days are UTC day numbers, the same calendar the SQL
+    reports use. It is loaded once from the daily rollup (archived years
+    included) and then topped up with sales whose id is newer than the last
+    one seen. After that every slice (day, week, month, year, category,
+    top-N) is a sum over array columns and never touches the database.
+    """
+
+    DAY_HEADROOM = 62
+
+    def __init__(self, db):
+        self.db = db
+        self.reset()
+
+    def reset(self):
+        """Drop everything loaded so far"""
+        self.loaded = False
+        self.last_sale_id = 0
+        self.product_ids = []
+        self.product_index = {}
+        self.names = []
+        self.categories = []
+        self.first_day = 0
+        self.qty = np.zeros((0, 0), dtype=np.int64)
+        self.revenue = np.zeros((0, 0), dtype=np.float64)
+        self.count = np.zeros((0, 0), dtype=np.int64)
+
+    def load(self):
+        """Build the cube from scratch"""
+        started = time.perf_counter()
+        self.reset()
+        rows, self.last_sale_id = self.db.get_daily_product_sales()
+        self._apply(rows)
+        self._sync_names()
+        self.loaded = True
+        logging.info(f"Sales cube loaded: {len(self.product_ids)} products x {self.qty.shape[1]} days "
+                     f"from {len(rows)} rows in {time.perf_counter() - started:.3f}s")
+
+    def refresh(self):
+        """Add sales recorded since the last load or refresh"""
+        if not self.loaded:
+            self.load()
+            return
+        rows, last_sale_id = self.db.get_daily_product_sales(self.last_sale_id)
+        if rows:
+            self._apply(rows)
+            self._sync_names()
+            self.last_sale_id = last_sale_id
+
+    def _apply(self, rows):
+        """Add (day, product_id, product_name, category, quantity, revenue, sale_count) rows"""
+        if not rows:
+            return
+        for _, product_id, product_name, category, _, _, _ in rows:
+            if product_id not in self.product_index:
+                self.product_index[product_id] = len(self.product_ids)
+                self.product_ids.append(product_id)
+                self.names.append(product_name or f"Product #{product_id}")
+                self.categories.append(category)
+        self._ensure_products(len(self.product_ids))
+
+        days = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        self._ensure_days(int(days.min()), int(days.max()))
+        columns = days - self.first_day
+        products = np.fromiter((self.product_index[row[1]] for row in rows), dtype=np.int64, count=len(rows))
+        np.add.at(self.qty, (products, columns), np.fromiter((row[4] or 0 for row in rows), dtype=np.int64))
+        np.add.at(self.revenue, (products, columns), np.fromiter((row[5] or 0 for row in rows), dtype=np.float64))
+        np.add.at(self.count, (products, columns), np.fromiter((row[6] for row in rows), dtype=np.int64))
+
+    def _ensure_products(self, size):
+        extra = size - self.qty.shape[0]
+        if extra > 0:
+            padding = ((0, extra), (0, 0))
+            self.qty = np.pad(self.qty, padding)
+            self.revenue = np.pad(self.revenue, padding)
+            self.count = np.pad(self.count, padding)
+
+    def _ensure_days(self, low, high):
+        """Grow the day axis to cover [low, high], leaving headroom for the days ahead"""
+        width = self.qty.shape[1]
+        if width == 0:
+            self.first_day = low
+        before = max(self.first_day - low, 0)
+        after = max(high - (self.first_day + width - 1), 0)
+        if before or after:
+            padding = ((0, 0), (before, after + self.DAY_HEADROOM if after else 0))
+            self.qty = np.pad(self.qty, padding)
+            self.revenue = np.pad(self.revenue, padding)
+            self.count = np.pad(self.count, padding)
+            self.first_day -= before
+
+    def _sync_names(self):
+        """Show products under their current name and category; deleted ones keep their last snapshot"""
+        for product in self.db.get_catalog():
+            index = self.product_index.get(product.id)
+            if index is not None:
+                self.names[index] = product.name
+                self.categories[index] = product.category
+
+    def day_range(self, period):
+        """[first, last) day numbers of a 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD' period"""
+        start, end = period_bounds(period)
+        return start // DAY, end // DAY
+
+    def _window(self, day_start, day_end, category=None, product_id=None):
+        """The three planes restricted to a day range and optionally one category or product
+
+        Days outside the loaded span contribute nothing.
+        """
+        low = min(max(day_start - self.first_day, 0), self.qty.shape[1])
+        high = min(max(day_end - self.first_day, low), self.qty.shape[1])
+        rows = slice(None)
+        if product_id is not None:
+            index = self.product_index.get(product_id)
+            rows = [] if index is None else [index]
+        elif category is not None:
+            rows = np.flatnonzero(np.array(self.categories, dtype=object) == category)
+        return self.qty[rows, low:high], self.revenue[rows, low:high], self.count[rows, low:high], low
+
+    def daily_quantities(self, product_ids, day_start, day_end):
+        """(len(product_ids), days) matrix of units sold per day, zero-filled for unknown products and days"""
+        matrix = np.zeros((len(product_ids), max(day_end - day_start, 0)), dtype=np.float64)
+        known = [(row, self.product_index[pid]) for row, pid in enumerate(product_ids) if pid in self.product_index]
+        if not known or not matrix.shape[1]:
+            return matrix
+        qty, _, _, low = self._window(day_start, day_end)
+        offset = self.first_day + low - day_start
+        targets, sources = zip(*known)
+        matrix[list(targets), offset:offset + qty.shape[1]] = qty[list(sources)]
+        return matrix
+
+    def totals(self, day_start, day_end, category=None):
+        """Per-product (qty, revenue, count) vectors over a day range"""
+        qty, revenue, count, _ = self._window(day_start, day_end)
+        totals = qty.sum(axis=1), revenue.sum(axis=1), count.sum(axis=1)
+        if category is not None:
+            mask = np.array(self.categories, dtype=object) == category
+            totals = tuple(np.where(mask, plane, 0) for plane in totals)
+        return totals
+
+    def _product_rows(self, period, with_category):
+        """Rows shaped like the SQL reports: products that sold in the period"""
+        qty, revenue, count = self.totals(*self.day_range(period))
+        sold = np.flatnonzero(count)
+        if with_category:
+            sold = sorted(sold, key=lambda i: (self.categories[i] or "", -revenue[i]))
+            return [(self.names[i], self.categories[i], int(qty[i]), float(revenue[i])) for i in sold]
+        sold = sold[np.argsort(-revenue[sold], kind='stable')]
+        return [(self.names[i], int(qty[i]), float(revenue[i])) for i in sold]
+
+    def daily_sales(self, day):
+        """Same rows as DatabaseHandler.get_daily_sales"""
+        return self._product_rows(day, with_category=False)
+
+    def monthly_sales(self, month):
+        """Same rows as DatabaseHandler.get_monthly_sales"""
+        return self._product_rows(month, with_category=True)
+
+    def yearly_sales(self, year):
+        """Same rows as DatabaseHandler.get_yearly_sales"""
+        return self._product_rows(str(year), with_category=True)
+
+    def top_products(self, period, n=10, category=None, key='revenue'):
+        """The n best-selling products of a period as (name, category, qty, revenue)"""
+        qty, revenue, count = self.totals(*self.day_range(period), category=category)
+        values = revenue if key == 'revenue' else qty
+        sold = np.flatnonzero(count)
+        if len(sold) > n:
+            sold = sold[np.argpartition(-values[sold], n - 1)[:n]]
+        sold = sold[np.argsort(-values[sold], kind='stable')]
+        return [(self.names[i], self.categories[i], int(qty[i]), float(revenue[i])) for i in sold]
+
+    def bin_edges(self, day_start, day_end, freq):
+        """Bucket start days for 'day', 'week' (7-day blocks from day_start) or 'month'"""
+        if freq == 'day':
+            return list(range(day_start, day_end))
+        if freq == 'week':
+            return list(range(day_start, day_end, 7))
+        if freq == 'month':
+            edges = []
+            current = date(1970, 1, 1) + timedelta(days=day_start)
+            while (current - date(1970, 1, 1)).days < day_end:
+                edges.append((current - date(1970, 1, 1)).days)
+                current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+            return edges
+        raise ValueError(f"Unknown frequency: {freq}")
+
+    def series(self, day_start, day_end, freq='week', category=None, product_id=None):
+        """Per-bucket (start day, qty, revenue) over a day range"""
+        edges = self.bin_edges(day_start, day_end, freq)
+        if not edges:
+            return []
+        qty, revenue, _, low = self._window(day_start, day_end, category, product_id)
+        # Zero-filled daily vectors for the whole range, so buckets outside the loaded span read as 0
+        offset = self.first_day + low - day_start
+        daily_qty = np.zeros(day_end - day_start, dtype=np.int64)
+        daily_revenue = np.zeros(day_end - day_start, dtype=np.float64)
+        daily_qty[offset:offset + qty.shape[1]] = qty.sum(axis=0)
+        daily_revenue[offset:offset + revenue.shape[1]] = revenue.sum(axis=0)
+        starts = np.array(edges, dtype=np.int64) - day_start
+        bucket_qty = np.add.reduceat(daily_qty, starts)
+        bucket_revenue = np.add.reduceat(daily_revenue, starts)
+        return [(edge, int(q), float(r)) for edge, q, r in zip(edges, bucket_qty, bucket_revenue)]
+
+    def compare_years(self, year, other_year, freq='week', category=None):
+        """Bucket-by-bucket totals of two years: (bucket, qty, revenue, other_qty, other_revenue)
+
+        Buckets are week 1..53 (7-day blocks from 1 January) or month 1..12.
+        """
+        current = self.series(*self.day_range(str(year)), freq=freq, category=category)
+        previous = self.series(*self.day_range(str(other_year)), freq=freq, category=category)
+        rows = []
+        for number in range(max(len(current), len(previous))):
+            _, qty, revenue = current[number] if number < len(current) else (None, 0, 0.0)
+            _, other_qty, other_revenue = previous[number] if number < len(previous) else (None, 0, 0.0)
+            label = f"Week {number + 1}" if freq == 'week' else datetime(2000, number + 1, 1).strftime('%B')
+            rows.append((label, qty, revenue, other_qty, other_revenue))
+        return rows
@@ -0,0 +1,383 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs
+import logging
+import os
+from database import DatabaseHandler, InsufficientStock
+from sale_journal import unapplied_quantities
+from timeutils import utc_text
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+PRODUCT_FIELDS = ('id', 'name', 'category', 'type', 'unit_price', 'stock', 'reorder_level', 'code')
+STOCK_FIELDS = ('id', 'name', 'category', 'stock', 'reorder_level')
+STATUS_TEXT = {
+    200: 'OK', 201: 'Created', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error',
+}
+
+
+class ApiError(Exception):
+    """Request error reported to the client as a JSON body"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def rows_to_dicts(fields, rows):
+    """Turn database tuples into JSON objects"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+class ApiServer:
+    """Local HTTP/JSON API over DatabaseHandler for tablets and other thin clients
+
+    Reads run on a thread pool against the read connection pool. Every write
+    goes through one queue drained by a single writer task, so concurrent
+    clients never contend for the SQLite write lock among themselves.
+
+    Sales are checked against stock inside their write transaction, less
+    the units still waiting in the GUI's sale journal (journal_path).
+    """
+
+    MAX_BODY_BYTES = 1024 * 1024
+    MAX_BATCH_SALES = 500
+
+    def __init__(self, db, host='127.0.0.1', port=8765, journal_path=None):
+        self.db = db
+        self.journal_path = journal_path
+        self.host = host
+        self.port = port
+        self.server = None
+        self.write_queue = None
+        self.writer_task = None
+        self.products_version = None
+        self.read_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="api-read")
+        self.write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-write")
+        self.routes = {
+            ('GET', '/api/products'): self.list_products,
+            ('GET', '/api/stock'): self.list_stock,
+            ('GET', '/api/stock/low'): self.list_low_stock,
+            ('GET', '/api/sales/recent'): self.list_recent_sales,
+            ('GET', '/api/reports/daily'): self.daily_report,
+            ('GET', '/api/reports/monthly'): self.monthly_report,
+            ('GET', '/api/reports/yearly'): self.yearly_report,
+            ('GET', '/api/reports/stock'): self.stock_report,
+            ('POST', '/api/sales'): self.create_sales,
+            ('POST', '/api/stock'): self.change_stock,
+        }
+
+    async def start(self):
+        """Start the writer task and begin accepting connections"""
+        self.write_queue = asyncio.Queue()
+        self.writer_task = asyncio.create_task(self.run_writer())
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        logging.info(f"API server listening on {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        """Start and run until cancelled"""
+        await self.start()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Stop accepting requests and let queued writes finish"""
+        if self.server is not None:
+            self.server.close()
+        if self.writer_task is not None:
+            await self.write_queue.join()
+            self.writer_task.cancel()
+        self.read_executor.shutdown(wait=True)
+        self.write_executor.shutdown(wait=True)
+        logging.info("API server stopped")
+
+    async def run_writer(self):
+        """Apply queued writes one at a time on the dedicated write thread"""
+        loop = asyncio.get_running_loop()
+        while True:
+            func, args, future = await self.write_queue.get()
+            try:
+                result = await loop.run_in_executor(self.write_executor, func, *args)
+                if not future.cancelled():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                self.write_queue.task_done()
+
+    async def write(self, func, *args):
+        """Queue a database write and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self.write_queue.put((func, args, future))
+        return await future
+
+    async def read(self, func, *args):
+        """Run a database read off the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self.read_executor, func, *args)
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.send(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.send(writer, 400, {"error": "Invalid Content-Length"}, keep_alive=False)
+                    break
+                if length > self.MAX_BODY_BYTES:
+                    await self.send(writer, 413, {"error": "Request body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload, extra = await self.dispatch(method, target, headers, body)
+                await self.send(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, headers, body):
+        """Route a request and turn errors into JSON responses"""
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            await self.sync_catalog()
+            if path.startswith('/api/products/'):
+                if method != 'GET':
+                    raise ApiError(405, "Method not allowed")
+                return await self.get_product(path.rsplit('/', 1)[1])
+            handler = self.routes.get((method, path))
+            if handler is None:
+                if any(route_path == path for _, route_path in self.routes):
+                    raise ApiError(405, "Method not allowed")
+                raise ApiError(404, "Not found")
+            if method == 'POST':
+                return await handler(self.parse_json(body))
+            return await handler(query, headers)
+        except ApiError as e:
+            return e.status, {"error": e.message}, {}
+        except sqlite3.Error as e:
+            logging.error(f"API database error on {method} {path}: {str(e)}")
+            return 500, {"error": "Database error"}, {}
+        except Exception as e:
+            logging.error(f"API error on {method} {path}: {str(e)}")
+            return 500, {"error": "Internal error"}, {}
+
+    async def send(self, writer, status, payload, extra_headers=None, keep_alive=True):
+        """Write one JSON response"""
+        body = b'' if status == 304 else json.dumps(payload).encode('utf-8')
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                 "Content-Type: application/json; charset=utf-8",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines.extend(f"{name}: {value}" for name, value in (extra_headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+    def parse_json(self, body):
+        """Decode a JSON request body"""
+        try:
+            return json.loads(body or b'{}')
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise ApiError(400, "Body must be valid JSON")
+
+    async def sync_catalog(self):
+        """Drop the handler's catalog cache when another process has changed products"""
+        version = await self.read(self.db.get_table_version, 'products')
+        if version != self.products_version:
+            self.products_version = version
+            self.db.invalidate_catalog()
+
+    async def catalog_etag(self):
+        """ETag that changes whenever any product row (including its stock) changes"""
+        return f'W/"products-{self.products_version}"'
+
+    async def cached_read(self, if_none_match, func, fields):
+        """Serve a catalog read, or 304 when the client's copy is current"""
+        etag = await self.catalog_etag()
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return 304, None, {"ETag": etag}
+        rows = await self.read(func)
+        return 200, rows_to_dicts(fields, rows), {"ETag": etag, "Cache-Control": "no-cache"}
+
+    async def list_products(self, query, headers):
+        return await self.cached_read(headers.get('if-none-match'), self.db.get_all_products, PRODUCT_FIELDS)
+
+    async def list_stock(self, query, headers):
+        return await self.cached_read(headers.get('if-none-match'), self.db.get_current_stocks, STOCK_FIELDS)
+
+    async def get_product(self, product_id):
+        try:
+            product_id = int(product_id)
+        except ValueError:
+            raise ApiError(404, "Not found")
+        rows = await self.read(self.db.get_products_by_ids, [product_id])
+        if not rows:
+            raise ApiError(404, f"Product {product_id} not found")
+        return 200, dict(zip(PRODUCT_FIELDS, rows[0])), {}
+
+    async def list_low_stock(self, query, headers):
+        rows = await self.read(self.db.get_low_stock)
+        return 200, rows_to_dicts(STOCK_FIELDS, rows), {}
+
+    async def list_recent_sales(self, query, headers):
+        rows = await self.read(self.db.get_recent_sales)
+        sales = rows_to_dicts(('id', 'product', 'quantity', 'total_price', 'sale_ts'), rows)
+        for sale in sales:
+            sale['sale_date'] = utc_text(sale['sale_ts'])
+        return 200, sales, {}
+
+    async def daily_report(self, query, headers):
+        date = self.require_date(query, 'date', '%Y-%m-%d')
+        rows = await self.read(self.db.get_daily_sales, date)
+        return 200, rows_to_dicts(('product', 'quantity', 'amount'), rows), {}
+
+    async def monthly_report(self, query, headers):
+        month = self.require_date(query, 'month', '%Y-%m')
+        rows = await self.read(self.db.get_monthly_sales, month)
+        return 200, rows_to_dicts(('product', 'category', 'quantity', 'amount'), rows), {}
+
+    async def yearly_report(self, query, headers):
+        year = self.require_date(query, 'year', '%Y')
+        rows = await self.read(self.db.get_yearly_sales, year)
+        return 200, rows_to_dicts(('product', 'category', 'quantity', 'amount'), rows), {}
+
+    async def stock_report(self, query, headers):
+        rows = await self.read(self.db.get_stock_report)
+        fields = ('name', 'category', 'type', 'unit_price', 'stock', 'stock_value', 'reorder_level')
+        return 200, rows_to_dicts(fields, rows), {}
+
+    def require_date(self, query, key, fmt):
+        """Validate a date-like query parameter"""
+        value = query.get(key)
+        try:
+            datetime.strptime(value or '', fmt)
+        except ValueError:
+            raise ApiError(400, f"Query parameter '{key}' is required in the form {fmt}")
+        return value
+
+    def require_int(self, data, key, positive=True):
+        """Validate an integer field of a request body"""
+        value = data.get(key)
+        if not isinstance(value, int) or isinstance(value, bool) or (positive and value <= 0):
+            raise ApiError(400, f"'{key}' must be a {'positive ' if positive else ''}integer")
+        return value
+
+    async def create_sales(self, data):
+        """Record one sale ({product_id, quantity}) or a batch ({"sales": [...]})
+
+        total_price defaults to unit_price * quantity. Clients may send a uid
+        per sale so a retried request is not counted twice.
+        """
+        items = data.get('sales') if isinstance(data, dict) and 'sales' in data else [data]
+        if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+            raise ApiError(400, "Expected a sale object or {\"sales\": [...]}")
+        if len(items) > self.MAX_BATCH_SALES:
+            raise ApiError(400, f"At most {self.MAX_BATCH_SALES} sales per request")
+
+        lines = [(self.require_int(item, 'product_id'), self.require_int(item, 'quantity')) for item in items]
+        products = {row[0]: row for row in await self.read(
+            self.db.get_products_by_ids, {product_id for product_id, _ in lines})}
+        sale_date = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        sales = []
+        for item, (product_id, quantity) in zip(items, lines):
+            product = products.get(product_id)
+            if product is None:
+                raise ApiError(400, f"Product {product_id} not found")
+            total_price = item.get('total_price', product[4] * quantity)
+            if not isinstance(total_price, (int, float)) or isinstance(total_price, bool) or total_price < 0:
+                raise ApiError(400, "'total_price' must be a non-negative number")
+            sales.append({
+                "uid": str(item.get('uid') or uuid.uuid4().hex),
+                "product_id": product_id,
+                "quantity": quantity,
+                "total_price": float(total_price),
+                "sale_date": sale_date,
+            })
+
+        try:
+            inserted = await self.write(self.record_sales, sales)
+        except InsufficientStock as e:
+            raise ApiError(400, str(e))
+        logging.info(f"API recorded {inserted} of {len(sales)} sales")
+        return 201, {"received": len(sales), "inserted": inserted,
+                     "uids": [sale["uid"] for sale in sales]}, {}
+
+    def record_sales(self, sales):
+        """Write job: record sales only if stock covers them, net of the GUI's unapplied journal"""
+        reserved = unapplied_quantities(self.db, self.journal_path) if self.journal_path else {}
+        return self.db.add_sales_batch(sales, reserved=reserved)
+
+    async def change_stock(self, data):
+        """Apply a stock adjustment: {product_id, qty_change, note}"""
+        if not isinstance(data, dict):
+            raise ApiError(400, "Expected a JSON object")
+        product_id = self.require_int(data, 'product_id')
+        qty_change = self.require_int(data, 'qty_change', positive=False)
+        if qty_change == 0:
+            raise ApiError(400, "'qty_change' must not be zero")
+        note = str(data.get('note') or 'API adjustment')
+        if not await self.read(self.db.get_product_by_id, product_id):
+            raise ApiError(400, f"Product {product_id} not found")
+        await self.write(self.db.update_stock, product_id, qty_change, note)
+        rows = await self.read(self.db.get_products_by_ids, [product_id])
+        return 201, {"product_id": product_id, "stock": rows[0][5]}, {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local JSON API for the Block & Cement POS database")
+    parser.add_argument('--db', default='blocks_cement.db', help="SQLite database file")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to bind (use 0.0.0.0 for the yard network)")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    db = DatabaseHandler(args.db)
+    server = ApiServer(db, args.host, args.port,
+                       journal_path=os.path.splitext(db.db_name)[0] + '.journal')
+    print(f"Serving POS API on http://{args.host}:{args.port}/api/")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
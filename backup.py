@@ -0,0 +1,165 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import logging
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class BackupCancelled(Exception):
+    """Raised from the progress callback to abandon a copy on shutdown"""
+
+
+class BackupService:
+    """Scheduled online backups that never hold the database for more than a few pages
+
+    The copy uses sqlite3's backup API in small page steps with a sleep in
+    between, from a separate read-only connection, so sales keep committing
+    while it runs (WAL readers don't block the writer). Each copy is checked
+    with PRAGMA quick_check before it replaces anything, old copies are
+    rotated out, and every run appends its timings to backup_stats.jsonl.
+    """
+
+    STATS_FILE = 'backup_stats.jsonl'
+
+    def __init__(self, db, backup_dir='backups', interval_hours=24, keep=7,
+                 pages=256, sleep=0.005, quick_check=True, vacuum_pages=1000):
+        self.db = db
+        self.backup_dir = Path(backup_dir)
+        self.interval = interval_hours * 3600
+        self.keep = keep
+        self.pages = pages
+        self.sleep = sleep
+        self.quick_check = quick_check
+        self.vacuum_pages = vacuum_pages
+        self.prefix = Path(db.db_name).stem
+        self.last_result = None
+
+        self._stop = threading.Event()
+        self._run_now = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="backup-service", daemon=True)
+
+    def start(self):
+        """Start the background scheduler"""
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self._thread.start()
+        logging.info(f"Backup service started: every {self.interval / 3600:.0f}h into {self.backup_dir}")
+
+    def stop(self, timeout=5.0):
+        """Stop the scheduler; a backup in progress finishes its current step first"""
+        self._stop.set()
+        self._run_now.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def request_backup(self):
+        """Run a backup as soon as possible"""
+        self._run_now.set()
+
+    def list_backups(self):
+        """Completed backup files, newest first"""
+        return sorted(self.backup_dir.glob(f"{self.prefix}_*.db"), reverse=True)
+
+    def is_due(self):
+        """True when the newest backup is older than the interval"""
+        backups = self.list_backups()
+        return not backups or time.time() - backups[0].stat().st_mtime >= self.interval
+
+    def _run(self):
+        # Check once a minute, or immediately when a backup is requested
+        while not self._stop.is_set():
+            forced = self._run_now.is_set()
+            self._run_now.clear()
+            if forced or self.is_due():
+                try:
+                    self.run_backup()
+                except Exception as e:
+                    logging.error(f"Backup failed: {str(e)}")
+            self._run_now.wait(60)
+
+    def run_backup(self):
+        """Copy the database, verify the copy, rotate old copies and record stats"""
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        target = self.backup_dir / f"{self.prefix}_{stamp}.db"
+        partial = target.with_suffix('.db.part')
+        stats = {"started": datetime.now().isoformat(timespec='seconds'), "file": target.name,
+                 "pages_per_step": self.pages, "sleep": self.sleep}
+        steps = 0
+        error = None
+
+        def progress(status, remaining, total):
+            nonlocal steps
+            steps += 1
+            stats["total_pages"] = total
+            if self._stop.is_set():
+                # Abort quickly on shutdown; the partial file is discarded
+                raise BackupCancelled()
+
+        started = time.perf_counter()
+        source = sqlite3.connect(f"{Path(self.db.db_name).resolve().as_uri()}?mode=ro", uri=True)
+        dest = sqlite3.connect(str(partial))
+        try:
+            source.backup(dest, pages=self.pages, progress=progress, sleep=self.sleep)
+            stats["copy_seconds"] = round(time.perf_counter() - started, 3)
+
+            if self.quick_check:
+                check_started = time.perf_counter()
+                result = [row[0] for row in dest.execute("PRAGMA quick_check")]
+                stats["quick_check"] = "ok" if result == ["ok"] else "; ".join(result[:5])
+                stats["check_seconds"] = round(time.perf_counter() - check_started, 3)
+        except BackupCancelled:
+            stats["status"] = "cancelled"
+        except (sqlite3.Error, OSError) as e:
+            # Locked or full disk, vanished source...: the partial copy is removed below
+            logging.error(f"Error copying database to {partial}: {str(e)}")
+            stats["status"] = "failed"
+            stats["error"] = str(e)
+            error = e
+        finally:
+            dest.close()
+            source.close()
+
+        if stats.get("status") in ("cancelled", "failed") or stats.get("quick_check", "ok") != "ok":
+            stats.setdefault("status", "failed")
+            partial.unlink(missing_ok=True)
+        else:
+            os.replace(partial, target)
+            stats["status"] = "ok"
+            stats["bytes"] = target.stat().st_size
+            stats["steps"] = steps
+            copy_seconds = stats["copy_seconds"] or 0.001
+            stats["mb_per_second"] = round(stats["bytes"] / 1024 / 1024 / copy_seconds, 2)
+            stats["rotated"] = self.rotate()
+            if self.vacuum_pages:
+                stats["vacuum_pages_freed"] = self.db.incremental_vacuum(self.vacuum_pages)
+
+        stats["total_seconds"] = round(time.perf_counter() - started, 3)
+        self.record_stats(stats)
+        self.last_result = stats
+        log = logging.info if stats["status"] == "ok" else logging.error
+        log(f"Backup {stats['status']}: {target.name} in {stats['total_seconds']}s")
+        if error is not None:
+            raise error
+        return stats
+
+    def rotate(self):
+        """Delete all but the newest `keep` backups; returns how many were removed"""
+        removed = 0
+        for old in self.list_backups()[self.keep:]:
+            try:
+                old.unlink()
+                removed += 1
+            except OSError as e:
+                logging.warning(f"Could not remove old backup {old}: {str(e)}")
+        return removed
+
+    def record_stats(self, stats):
+        """Append one run's timings to the stats file"""
+        with open(self.backup_dir / self.STATS_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(stats) + "\n")
@@ -0,0 +1,93 @@
+"""Headless timings for the view-model builders
+
+Usage: python bench_view_models.py [rows ...]   (default: 10000 100000 1000000)
+
+Rows are synthetic, shaped like the DatabaseHandler results each screen
+consumes. No display or database is needed. The "per-row" lines time the
+formatting as it was written inline next to tree.insert, for comparison.
+"""
+import random
+import sys
+import time
+from database import ProductRecord
+from timeutils import format_local
+import view_models
+
+CATEGORIES = ["Block", "Cement", "Rod", "Sand"]
+
+
+def make_catalog(n):
+    return [ProductRecord(i, f"Product {i}", CATEGORIES[i % 4], "Standard", round(random.uniform(5, 200), 2),
+                          random.randint(0, 500), 10, f"C{i:06d}" if i % 3 else None)
+            for i in range(1, n + 1)]
+
+
+def make_sales(n, now):
+    # Newest first, a few seconds apart, like get_recent_sales; totals are price x quantity
+    prices = [round(random.uniform(5, 200), 2) for _ in range(500)]
+    rows = []
+    for i in range(n):
+        quantity = random.randint(1, 50)
+        rows.append((n - i, f"Product {i % 500}", quantity, prices[i % 500] * quantity, now - i * 7))
+    return rows
+
+
+def make_logs(n, now):
+    return [(n - i, f"Product {i % 500}", random.randint(-50, 200), "Restock" if i % 4 else None, now - i * 11)
+            for i in range(n)]
+
+
+def make_history(n, now):
+    return [("Sale" if i % 3 else "Adjustment", n - i, -random.randint(1, 50), 12.5 * random.randint(1, 400),
+             None if i % 3 else "Count", now - i * 13)
+            for i in range(n)]
+
+
+def per_row_sales(rows):
+    return [(sale_id, name, qty, f"GH₵{total:.2f}", format_local(ts)) for sale_id, name, qty, total, ts in rows]
+
+
+def per_row_logs(rows):
+    return [(log_id, name, f"+{change}" if change > 0 else str(change), note or "No note", format_local(ts))
+            for log_id, name, change, note, ts in rows]
+
+
+def timed(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        format_local.cache_clear()
+        started = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(sizes):
+    random.seed(1)
+    now = int(time.time())
+    print(f"{'builder':<28}{'rows':>10}{'ms':>10}{'rows/s':>14}")
+    for n in sizes:
+        repeat = 3 if n <= 100000 else 1
+        catalog = make_catalog(n)
+        sales = make_sales(n, now)
+        logs = make_logs(n, now)
+        history = make_history(n, now)
+        cases = [
+            ("recent_sales_rows", view_models.recent_sales_rows, sales),
+            ("  per-row", per_row_sales, sales),
+            ("inventory_log_rows", view_models.inventory_log_rows, logs),
+            ("  per-row", per_row_logs, logs),
+            ("history_rows", view_models.history_rows, history),
+            ("stock_rows", view_models.stock_rows, catalog),
+            ("product_rows", view_models.product_rows, catalog),
+            ("recent_change_rows", view_models.recent_change_rows, logs),
+        ]
+        for name, func, rows in cases:
+            elapsed = timed(func, rows, repeat=repeat)
+            print(f"{name:<28}{n:>10}{elapsed * 1000:>10.1f}{n / elapsed:>14,.0f}")
+        print()
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
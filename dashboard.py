@@ -3,8 +3,16 @@ from tkinter import messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from datetime import datetime, timedelta
+import json
+import os
+import queue
+import threading
 import logging
+from database import ProductRecord
 from gui_utils import create_card_frame
+from forecast import StockForecaster, write_forecast_csv
+from view_models import (money, signed, recent_sale_summary_rows, recent_change_rows,
+                         ranked_sales_rows, forecast_rows)
 import calendar
 
 # Safe ToolTip import
@@ -22,12 +30,48 @@ except ImportError:
 logging.basicConfig(filename='pos.log', level=logging.INFO, 
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+def is_low_stock(stock, reorder_level):
+    """Low stock rule used by the metrics and stock cards"""
+    return stock < reorder_level
+
 class DashboardManager:
+    # Full recomputation from the database only runs this often (or on demand)
+    RECONCILE_INTERVAL_MS = 5 * 60 * 1000
+    # How often the Tk side checks whether a background refresh has finished
+    REFRESH_POLL_MS = 100
+    # Bump when the snapshot layout changes so older cache files are ignored
+    CACHE_FORMAT = 1
+
     def __init__(self, app, parent, db):
         self.app = app
         self.db = db
         self.dashboard_frame = ttk.Frame(parent, padding=10)
+
+        # Running aggregates kept in memory between reconciles
+        self.totals = {"today": 0.0, "month": 0.0, "year": 0.0}
+        self.period_keys = {}
+        self.products = {}
+        self.low_stock_count = 0
+        self.year_product_sales = {}
+        # Stock cards by category: {"frame", "col", "total_label", "total", "rows": {product_id: row}, "order"}
+        self.stock_cards = {}
+        self.category_totals = {}
+        self.today_row = None
+        self.month_row = None
+        self.stale = False
+        self.forecasts = []
+        self.forecast_view = None
+        # Last snapshot, saved next to the database so the next login can show it at once
+        self.cache_path = os.path.splitext(db.db_name)[0] + '.dashboard.json'
+        self.refresh_thread = None
+        self.refresh_results = None
+        self.refresh_pending = False
+        # Journal position to wait for before a full refresh (see apply_sale)
+        self.refresh_after_journal = None
+        self.reconcile_job = None
+
         self.create_dashboard()
+        self.reconcile_job = self.dashboard_frame.after(self.RECONCILE_INTERVAL_MS, self.periodic_reconcile)
 
     def create_dashboard(self):
         """Create a professional dashboard with modern design"""
@@ -40,6 +84,10 @@ class DashboardManager:
                                  font=("Helvetica", 24, "bold"), bootstyle="primary")
         welcome_label.pack(side='left')
         
+        refresh_btn = ttk.Button(header_frame, text="🔄 Refresh", bootstyle="outline-primary",
+                                command=self.refresh_dashboard)
+        refresh_btn.pack(side='right', padx=(10, 0))
+
         date_label = ttk.Label(header_frame, text=datetime.now().strftime("%B %d, %Y"), 
                               font=("Helvetica", 14), bootstyle="secondary")
         date_label.pack(side='right')
@@ -72,11 +120,13 @@ class DashboardManager:
         # Create dashboard sections
         self.create_metrics_overview()
         self.create_stock_overview()
+        self.create_forecast_overview()
         self.create_sales_analytics()
         self.create_recent_activity()
 
-        # Refresh data
-        self.refresh_dashboard()
+        # Show the last session's figures straight away; query only if they are out of date
+        if not self.load_cached_snapshot():
+            self.refresh_dashboard()
         logging.info("Dashboard initialized")
 
     def create_metrics_overview(self):
@@ -150,6 +200,26 @@ class DashboardManager:
         self.stock_cards_frame = ttk.Frame(stock_frame)
         self.stock_cards_frame.pack(fill='x')
 
+    def create_forecast_overview(self):
+        """Create the stock-out forecast section"""
+        forecast_card = create_card_frame(self.scrollable_frame, "Stock-out Forecast")
+        forecast_card.pack(fill='x', pady=(0, 20))
+
+        controls = ttk.Frame(forecast_card)
+        controls.pack(fill='x', padx=10, pady=(10, 0))
+        self.forecast_status = ttk.Label(controls, text="", font=("Helvetica", 10), bootstyle="secondary")
+        self.forecast_status.pack(side='left')
+        ttk.Button(controls, text="Export CSV", bootstyle="outline-primary",
+                   command=self.export_forecast).pack(side='right')
+
+        columns = ('Product', 'Available', 'Per Day', 'Days Left', 'Runs Out', 'Suggested Order')
+        self.forecast_tree = ttk.Treeview(forecast_card, columns=columns, show='headings', height=8,
+                                          bootstyle="light")
+        for col in columns:
+            self.forecast_tree.heading(col, text=col)
+            self.forecast_tree.column(col, width=180 if col == 'Product' else 90)
+        self.forecast_tree.pack(fill='both', expand=True, padx=10, pady=10)
+
     def create_sales_analytics(self):
         """Create sales analytics section"""
         analytics_frame = ttk.Frame(self.scrollable_frame)
@@ -248,83 +318,359 @@ class DashboardManager:
         activity_container.rowconfigure(0, weight=1)
 
     def refresh_dashboard(self):
-        """Refresh all dashboard data"""
+        """Full reconcile against the database
+
+        The queries, the sales cube and the forecast all run on a worker
+        thread (run_refresh) while the current figures stay on screen;
+        finish_refresh picks up each result as it lands and draws it.
+        """
+        if self.refresh_thread is not None:
+            # One refresh at a time; run another once this one lands
+            self.refresh_pending = True
+            return
+        self.stale = False
+        self.refresh_results = queue.Queue()
+        self.refresh_thread = threading.Thread(target=self.run_refresh, args=(self.refresh_results,),
+                                               name='dashboard-refresh', daemon=True)
+        self.refresh_thread.start()
+        self.dashboard_frame.after(self.REFRESH_POLL_MS, self.finish_refresh)
+
+    def run_refresh(self, results):
+        """Worker thread body: the snapshot first, then the forecast; no Tk calls"""
         try:
-            self.refresh_metrics()
-            self.refresh_stock_overview()
-            self.refresh_sales_analytics()
-            self.refresh_recent_activity()
-            logging.info("Dashboard data refreshed")
+            snapshot = self.refresh_snapshot()
         except Exception as e:
-            logging.error(f"Error refreshing dashboard: {str(e)}")
-            messagebox.showerror("Error", f"Failed to refresh dashboard: {str(e)}")
-
-    def refresh_metrics(self):
-        """Refresh key metrics cards"""
+            results.put(("error", e))
+            return
+        results.put(("snapshot", snapshot))
+        # Loading or topping up the sales cube can take seconds, so it happens here too
+        results.put(("forecast", (snapshot, self.refresh_forecast())))
+
+    def finish_refresh(self):
+        """Draw whatever the background refresh has produced, and check again until it is done"""
+        if not self.dashboard_frame.winfo_exists():
+            return  # Logged out while the refresh was running
+        # Checked before draining, so nothing the thread put is left behind once it has exited
+        running = self.refresh_thread.is_alive()
+        while True:
+            try:
+                kind, value = self.refresh_results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if kind == "error":
+                    raise value
+                if kind == "snapshot":
+                    self.render_snapshot(value)
+                    logging.info("Dashboard data refreshed")
+                else:
+                    snapshot, (self.forecasts, view) = value
+                    self.render_forecast_view(view)
+                    snapshot["forecast"] = view
+                    self.save_snapshot(snapshot)
+            except Exception as e:
+                logging.error(f"Error refreshing dashboard: {str(e)}")
+                messagebox.showerror("Error", f"Failed to refresh dashboard: {str(e)}")
+        if running:
+            self.dashboard_frame.after(self.REFRESH_POLL_MS, self.finish_refresh)
+            return
+        self.refresh_thread = None
+        if self.refresh_pending:
+            self.refresh_pending = False
+            self.refresh_dashboard()
+
+    def periodic_reconcile(self):
+        """Re-run the full refresh on a timer to correct any drift in the running aggregates"""
+        self.refresh_dashboard()
+        self.reconcile_job = self.dashboard_frame.after(self.RECONCILE_INTERVAL_MS, self.periodic_reconcile)
+
+    def stop(self):
+        """Cancel the periodic reconcile (on logout or exit)"""
+        if self.reconcile_job:
+            self.dashboard_frame.after_cancel(self.reconcile_job)
+            self.reconcile_job = None
+
+    def mark_stale(self):
+        """Flag the dashboard for a full refresh the next time it is shown"""
+        self.stale = True
+
+    def refresh_if_stale(self):
+        """Reconcile only if a change couldn't be applied as a delta"""
+        if self.stale:
+            self.refresh_dashboard()
+
+    def current_period_keys(self):
+        """Day, month and year the running totals belong to"""
+        now = datetime.now()
+        return {"today": now.strftime('%Y-%m-%d'), "month": now.strftime('%Y-%m'), "year": str(now.year)}
+
+    def apply_sale(self, product_id, quantity, total_price):
+        """Apply a completed sale to the running aggregates without re-querying"""
+        try:
+            product = self.products.get(product_id)
+            if product is None or self.current_period_keys() != self.period_keys:
+                # Unknown product or the day rolled over since the last reconcile. The sale is
+                # only in the journal so far, so refresh once the applier has written it.
+                journal = getattr(self.app, 'sale_journal', None)
+                if journal is None:
+                    self.refresh_dashboard()
+                else:
+                    self.refresh_after_journal = journal.accepted_count
+                    self.on_journal_progress()
+                return
+
+            for period in self.totals:
+                self.totals[period] += total_price
+            self.today_sales_card["value"].configure(text=f"GH₵{self.totals['today']:.2f}")
+            self.month_sales_card["value"].configure(text=f"GH₵{self.totals['month']:.2f}")
+            self.year_sales_card["value"].configure(text=f"GH₵{self.totals['year']:.2f}")
+
+            if self.today_row:
+                self.daily_sales_tree.set(self.today_row, 'Sales', f"{self.totals['today']:.2f}")
+            if self.month_row:
+                self.monthly_sales_tree.set(self.month_row, 'Sales', f"{self.totals['month']:.2f}")
+
+            qty, revenue = self.year_product_sales.get(product["name"], (0, 0.0))
+            self.year_product_sales[product["name"]] = (qty + quantity, revenue + total_price)
+            self.render_yearly_sales()
+
+            self.recent_sales_tree.insert("", 0, values=(product["name"], quantity, money(total_price)))
+            self.trim_tree(self.recent_sales_tree)
+
+            self.apply_stock_delta(product_id, -quantity)
+            logging.info(f"Dashboard applied sale delta for product_id {product_id}")
+        except Exception as e:
+            logging.error(f"Error applying sale to dashboard: {str(e)}")
+            self.mark_stale()
+
+    def on_journal_progress(self):
+        """Run a refresh deferred by apply_sale once the journal has caught up with it"""
+        if self.refresh_after_journal is None:
+            return
+        if self.app.sale_journal.settled_count >= self.refresh_after_journal:
+            self.refresh_after_journal = None
+            self.refresh_dashboard()
+
+    def apply_stock_change(self, product_id, qty_change, note):
+        """Apply a manual stock adjustment without re-querying"""
         try:
-            # Today's sales
-            today = datetime.now().strftime('%Y-%m-%d')
-            today_sales = self.db.get_daily_sales(today)
-            today_total = sum(row[2] for row in today_sales) if today_sales else 0
-            self.today_sales_card["value"].configure(text=f"GH₵{today_total:.2f}")
-
-            # This month's sales
-            current_month = datetime.now().strftime('%Y-%m')
-            month_sales = self.db.get_monthly_sales(current_month)
-            month_total = sum(row[3] for row in month_sales) if month_sales else 0
-            self.month_sales_card["value"].configure(text=f"GH₵{month_total:.2f}")
-
-            # This year's sales
-            current_year = datetime.now().year
-            year_sales = self.db.get_yearly_product_sales(current_year)
-            year_total = sum(row[2] for row in year_sales) if year_sales else 0
-            self.year_sales_card["value"].configure(text=f"GH₵{year_total:.2f}")
-
-            # Total products
-            products = self.db.get_all_products()
-            self.total_products_card["value"].configure(text=str(len(products)))
-
-            # Low stock items
-            low_stock_count = 0
-            for product in products:
-                _, _, category, _, _, stock = product
-                if (category == 'Block' and stock < 10) or (category == 'Cement' and stock < 5):
-                    low_stock_count += 1
-            self.low_stock_card["value"].configure(text=str(low_stock_count))
+            product = self.products.get(product_id)
+            if product is None:
+                self.refresh_dashboard()
+                return
+
+            self.recent_inventory_tree.insert("", 0, values=(product["name"], signed(qty_change), note or "N/A"))
+            self.trim_tree(self.recent_inventory_tree)
 
+            self.apply_stock_delta(product_id, qty_change)
+            logging.info(f"Dashboard applied stock delta for product_id {product_id}")
         except Exception as e:
-            logging.error(f"Error refreshing metrics: {str(e)}")
+            logging.error(f"Error applying stock change to dashboard: {str(e)}")
+            self.mark_stale()
+
+    def apply_stock_delta(self, product_id, qty_change):
+        """Update one product's stock label, its category total and the low stock count"""
+        if self.refresh_thread is not None:
+            # The running refresh may have read the database before this change
+            self.refresh_pending = True
+        product = self.products[product_id]
+        category = product["category"]
+        was_low = is_low_stock(product["stock"], product["reorder_level"])
+        product["stock"] += qty_change
+        now_low = is_low_stock(product["stock"], product["reorder_level"])
+
+        if was_low != now_low:
+            self.low_stock_count += 1 if now_low else -1
+            self.low_stock_card["value"].configure(text=str(self.low_stock_count))
+
+        self.category_totals[category] = self.category_totals.get(category, 0) + qty_change
+        card = self.stock_cards.get(category)
+        if card is not None:
+            row = card["rows"].get(product_id)
+            if row is not None:
+                self.set_stock_label(row, product["stock"], product["reorder_level"])
+            card["total_label"].configure(text=f"Total Stock: {self.category_totals[category]}")
+            card["total"] = self.category_totals[category]
+
+    def apply_product_row(self, row, pending_quantity=0):
+        """Bring one product in line with a row changed by another terminal"""
+        try:
+            product_id, name, category, stock, reorder_level = row.id, row.name, row.category, row.stock, row.reorder_level
+            product = self.products.get(product_id)
+            if (product is None or product["name"] != name or product["category"] != category
+                    or product["reorder_level"] != reorder_level):
+                # Layout-affecting change: rebuild on the next visit
+                self.mark_stale()
+                return
+            # Sales still in our journal are already shown but not yet in products.stock
+            qty_change = stock - pending_quantity - product["stock"]
+            if qty_change:
+                self.apply_stock_delta(product_id, qty_change)
+        except Exception as e:
+            logging.error(f"Error applying product change to dashboard: {str(e)}")
+            self.mark_stale()
+
+    def trim_tree(self, tree, limit=10):
+        """Keep only the newest rows of a recent-activity tree"""
+        for item in tree.get_children()[limit:]:
+            tree.delete(item)
+
+    def refresh_snapshot(self):
+        """Query everything the dashboard shows into a plain, JSON-ready dict
+
+        Runs on the refresh thread, so it makes no Tk calls. The change_log
+        version is read first: a change committed while the queries run
+        makes the saved snapshot look older than it is, never newer.
+        """
+        now = datetime.now()
+        keys = self.current_period_keys()
+        version = self.db.get_change_log_bounds()[1]
+
+        today_sales = self.db.get_daily_sales(keys["today"])
+        month_sales = self.db.get_monthly_sales(keys["month"])
+        year_sales = self.db.get_yearly_product_sales(now.year)
+        totals = {"today": sum(row[2] for row in today_sales),
+                  "month": sum(row[3] for row in month_sales),
+                  "year": sum(row[2] for row in year_sales)}
+
+        # Last 7 days and last 6 months, oldest first
+        daily = []
+        for i in range(6, -1, -1):
+            date = now - timedelta(days=i)
+            sales_data = self.db.get_daily_sales(date.strftime('%Y-%m-%d'))
+            daily.append([date.strftime('%m/%d'), sum(row[2] for row in sales_data)])
+        monthly = []
+        for i in range(5, -1, -1):
+            date = now - timedelta(days=i*30)
+            sales_data = self.db.get_monthly_sales(date.strftime('%Y-%m'))
+            monthly.append([date.strftime('%b %Y'), sum(row[3] for row in sales_data)])
+
+        return {
+            "format": self.CACHE_FORMAT,
+            "version": version,
+            "saved_at": now.strftime('%Y-%m-%d %H:%M:%S'),
+            "period_keys": keys,
+            "totals": totals,
+            "catalog": [list(product) for product in self.db.get_catalog()],
+            "daily": daily,
+            "monthly": monthly,
+            "yearly": [list(row) for row in year_sales],
+            "recent_sales": [list(row) for row in self.db.get_recent_sales()[:10]],
+            "recent_logs": [list(row) for row in self.db.get_inventory_logs()[:10]],
+            "forecast": None,
+        }
 
-    def refresh_stock_overview(self):
-        """Refresh stock overview cards"""
+    def render_snapshot(self, snapshot):
+        """Put a snapshot on screen and make it the base for the running aggregates"""
+        self.totals = dict(snapshot["totals"])
+        self.period_keys = dict(snapshot["period_keys"])
+        self.today_sales_card["value"].configure(text=f"GH₵{self.totals['today']:.2f}")
+        self.month_sales_card["value"].configure(text=f"GH₵{self.totals['month']:.2f}")
+        self.year_sales_card["value"].configure(text=f"GH₵{self.totals['year']:.2f}")
+
+        catalog = [ProductRecord._make(product) for product in snapshot["catalog"]]
+        self.total_products_card["value"].configure(text=str(len(catalog)))
+        self.products = {}
+        for product in catalog:
+            self.products[product.id] = {"name": product.name, "category": product.category,
+                                         "stock": product.stock, "reorder_level": product.reorder_level}
+        # Low stock items against each product's reorder level
+        self.low_stock_count = sum(1 for p in catalog if is_low_stock(p.stock, p.reorder_level))
+        self.low_stock_card["value"].configure(text=str(self.low_stock_count))
+        self.render_stock_overview(catalog)
+
+        self.daily_sales_tree.delete(*self.daily_sales_tree.get_children())
+        for display_date, total in snapshot["daily"]:
+            self.today_row = self.daily_sales_tree.insert("", "end", values=(display_date, f"{total:.2f}"))
+        self.monthly_sales_tree.delete(*self.monthly_sales_tree.get_children())
+        for display_month, total in snapshot["monthly"]:
+            self.month_row = self.monthly_sales_tree.insert("", "end", values=(display_month, f"{total:.2f}"))
+        self.year_product_sales = {name: (qty, revenue) for name, qty, revenue in snapshot["yearly"]}
+        self.render_yearly_sales()
+
+        self.recent_sales_tree.delete(*self.recent_sales_tree.get_children())
+        for values in recent_sale_summary_rows(snapshot["recent_sales"]):
+            self.recent_sales_tree.insert("", "end", values=values)
+        self.recent_inventory_tree.delete(*self.recent_inventory_tree.get_children())
+        for values in recent_change_rows(snapshot["recent_logs"]):
+            self.recent_inventory_tree.insert("", "end", values=values)
+
+    def load_cached_snapshot(self):
+        """Render the snapshot saved by the last refresh, if there is one
+
+        Returns True when it is still current (same change_log version and
+        same day), in which case no refresh is needed yet.
+        """
         try:
-            # Clear existing stock cards
-            for widget in self.stock_cards_frame.winfo_children():
-                widget.destroy()
+            with open(self.cache_path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+            if snapshot.get("format") != self.CACHE_FORMAT:
+                return False
+            self.render_snapshot(snapshot)
+            if snapshot.get("forecast"):
+                self.render_forecast_view(snapshot["forecast"])
+            current = (snapshot["version"] == self.db.get_change_log_bounds()[1]
+                       and snapshot["period_keys"] == self.current_period_keys())
+            logging.info(f"Dashboard shown from cache saved {snapshot['saved_at']} "
+                         f"({'current' if current else 'refreshing'})")
+            return current
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logging.warning(f"Ignoring dashboard cache {self.cache_path}: {str(e)}")
+            return False
 
+    def save_snapshot(self, snapshot):
+        """Write the snapshot for the next startup (atomically, so a crash never leaves half a file)"""
+        try:
+            tmp_path = self.cache_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logging.warning(f"Could not save dashboard cache {self.cache_path}: {str(e)}")
+
+    def render_stock_overview(self, catalog):
+        """Bring the stock cards in line with the catalog, reusing the widgets already on screen
+
+        Cards are kept in self.stock_cards by category and their product rows
+        by product id. Only text or colour that changed is reconfigured and
+        only added or removed categories and products create or destroy
+        widgets, so a refresh after a sale doesn't re-lay-out the dashboard.
+        """
+        try:
             # Get products grouped by category
-            products = self.db.get_all_products()
             categories = {}
-            
-            for product in products:
-                _, name, category, _, _, stock = product
-                if category not in categories:
-                    categories[category] = {"total_stock": 0, "products": []}
-                categories[category]["total_stock"] += stock
-                categories[category]["products"].append({"name": name, "stock": stock})
+            for product in catalog:
+                if product.category not in categories:
+                    categories[product.category] = {"total_stock": 0, "products": []}
+                categories[product.category]["total_stock"] += product.stock
+                categories[product.category]["products"].append(product)
 
-            # Create cards for each category
-            col = 0
-            for category, data in categories.items():
-                self.create_stock_category_card(self.stock_cards_frame, category, 
-                                              data["total_stock"], data["products"], col)
-                col += 1
+            for category in list(self.stock_cards):
+                if category not in categories:
+                    self.remove_stock_category_card(category)
+
+            for col, (category, data) in enumerate(categories.items()):
+                card = self.stock_cards.get(category)
+                if card is None:
+                    card = self.create_stock_category_card(self.stock_cards_frame, category, col)
+                elif card["col"] != col:
+                    card["frame"].grid_configure(column=col)
+                    self.stock_cards_frame.columnconfigure(col, weight=1)
+                    card["col"] = col
+                self.update_stock_category_card(card, data["total_stock"], data["products"][:5])  # Show top 5 products
+                self.category_totals[category] = data["total_stock"]
+
+            # Columns left empty by removed categories shouldn't keep taking space
+            for col in range(len(categories), self.stock_cards_frame.grid_size()[0]):
+                self.stock_cards_frame.columnconfigure(col, weight=0)
 
         except Exception as e:
             logging.error(f"Error refreshing stock overview: {str(e)}")
 
-    def create_stock_category_card(self, parent, category, total_stock, products, col):
-        """Create a stock category card"""
+    def create_stock_category_card(self, parent, category, col):
+        """Create an empty stock category card and register it"""
         card = ttk.Frame(parent, padding=15, relief="raised", borderwidth=1)
         card.grid(row=0, column=col, padx=10, pady=5, sticky="ew")
         parent.columnconfigure(col, weight=1)
@@ -334,115 +680,125 @@ class DashboardManager:
                  foreground="#007bff").pack(anchor='w')
         
         # Total stock
-        ttk.Label(card, text=f"Total Stock: {total_stock}", font=("Helvetica", 12), 
-                 foreground="#17a2b8").pack(anchor='w', pady=(5, 10))
-
-        # Individual products
-        for product in products[:5]:  # Show top 5 products
-            product_frame = ttk.Frame(card)
-            product_frame.pack(fill='x', pady=2)
-            
-            ttk.Label(product_frame, text=product["name"], font=("Helvetica", 10)).pack(side='left')
-            
-            # Color code stock levels
-            stock = product["stock"]
-            if (category == 'Block' and stock < 10) or (category == 'Cement' and stock < 5):
-                color = "#dc3545"  # Red for danger
-            elif stock < 20:
-                color = "#ffc107"  # Yellow for warning
-            else:
-                color = "#28a745"  # Green for success
-                
-            ttk.Label(product_frame, text=str(stock), font=("Helvetica", 10, "bold"), 
-                     foreground=color).pack(side='right')
-
-    def refresh_sales_analytics(self):
-        """Refresh sales analytics data"""
+        total_label = ttk.Label(card, text="", font=("Helvetica", 12), foreground="#17a2b8")
+        total_label.pack(anchor='w', pady=(5, 10))
+
+        entry = {"frame": card, "col": col, "total_label": total_label, "total": None, "rows": {}, "order": []}
+        self.stock_cards[category] = entry
+        return entry
+
+    def update_stock_category_card(self, card, total_stock, products):
+        """Update a card's total and product rows in place"""
+        if card["total"] != total_stock:
+            card["total_label"].configure(text=f"Total Stock: {total_stock}")
+            card["total"] = total_stock
+
+        rows = card["rows"]
+        order = [product.id for product in products]
+        for product_id in [pid for pid in rows if pid not in order]:
+            rows.pop(product_id)["frame"].destroy()
+
+        for product in products:
+            row = rows.get(product.id)
+            if row is None:
+                row = rows[product.id] = self.create_stock_row(card["frame"], product)
+            if row["name"] != product.name:
+                row["name_label"].configure(text=product.name)
+                row["name"] = product.name
+            self.set_stock_label(row, product.stock, product.reorder_level)
+
+        if order != card["order"]:
+            # Products added, removed or reordered: repack this card's rows only
+            for product_id in order:
+                rows[product_id]["frame"].pack_forget()
+            for product_id in order:
+                rows[product_id]["frame"].pack(fill='x', pady=2)
+            card["order"] = order
+
+    def create_stock_row(self, card, product):
+        """Create one product row; it is packed by update_stock_category_card"""
+        product_frame = ttk.Frame(card)
+        name_label = ttk.Label(product_frame, text=product.name, font=("Helvetica", 10))
+        name_label.pack(side='left')
+        # Fixed width so a changing figure doesn't resize the card
+        stock_label = ttk.Label(product_frame, text="", width=7, anchor='e', font=("Helvetica", 10, "bold"))
+        stock_label.pack(side='right')
+        return {"frame": product_frame, "name_label": name_label, "stock_label": stock_label,
+                "name": product.name, "text": None, "color": None}
+
+    def set_stock_label(self, row, stock, reorder_level):
+        """Colour-coded stock figure, reconfigured only when it changed"""
+        text, color = str(stock), self.stock_color(stock, reorder_level)
+        if row["text"] != text or row["color"] != color:
+            row["stock_label"].configure(text=text, foreground=color)
+            row["text"], row["color"] = text, color
+
+    def remove_stock_category_card(self, category):
+        """Destroy a category's card once it has no products"""
+        self.stock_cards.pop(category)["frame"].destroy()
+        self.category_totals.pop(category, None)
+
+    def stock_color(self, stock, reorder_level):
+        """Colour for a product's stock figure"""
+        if is_low_stock(stock, reorder_level):
+            return "#dc3545"  # Red for danger
+        elif stock < 20:
+            return "#ffc107"  # Yellow for warning
+        return "#28a745"  # Green for success
+
+    def refresh_forecast(self):
+        """Recompute the stock-out forecast for the whole catalog
+
+        Runs on the refresh thread, so it makes no Tk calls. Returns
+        (forecasts, view), where view is the table rows and status text.
+        """
         try:
-            # Daily sales (last 7 days)
-            self.refresh_daily_sales()
-            
-            # Monthly sales (last 6 months)
-            self.refresh_monthly_sales()
-            
-            # Yearly product sales
-            self.refresh_yearly_sales()
-
+            cube = self.app.get_sales_cube() if hasattr(self.app, 'get_sales_cube') else None
+            if cube is None:
+                return [], {"rows": [], "status": "Forecast needs NumPy"}
+            pending = self.app.sale_journal.pending_quantities() if hasattr(self.app, 'sale_journal') else {}
+            forecasts = StockForecaster(cube).forecast(self.db.get_catalog(), pending)
+
+            # Only products that run out within the horizon or need an order
+            urgent = [f for f in forecasts if f.days_left is not None or f.reorder_qty > 0]
+            return forecasts, {
+                "rows": [list(values) for values in forecast_rows(urgent[:10])],
+                "status": f"{len(urgent)} of {len(forecasts)} products need attention",
+            }
         except Exception as e:
-            logging.error(f"Error refreshing sales analytics: {str(e)}")
-
-    def refresh_daily_sales(self):
-        """Refresh daily sales data"""
-        # Clear existing data
-        for item in self.daily_sales_tree.get_children():
-            self.daily_sales_tree.delete(item)
+            logging.error(f"Error refreshing stock forecast: {str(e)}")
+            return [], {"rows": [], "status": "Forecast unavailable"}
+
+    def render_forecast_view(self, view):
+        """Show forecast table rows and status text (fresh, or from the cached snapshot)"""
+        self.forecast_tree.delete(*self.forecast_tree.get_children())
+        for values in view["rows"]:
+            self.forecast_tree.insert('', 'end', values=values)
+        self.forecast_status.configure(text=view["status"])
+        self.forecast_view = view
+
+    def export_forecast(self):
+        """Export the full forecast (every product) to CSV"""
+        if not self.forecasts and self.forecast_view and self.forecast_view["rows"]:
+            # Only the cached summary is on screen; compute the full forecast in the background
+            self.refresh_dashboard()
+            messagebox.showinfo("Forecast", "The forecast is being recalculated; export again in a moment")
+            return
+        if not self.forecasts:
+            messagebox.showerror("Error", "No forecast to export")
+            return
+        try:
+            filename = f"stock_forecast_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            write_forecast_csv(self.forecasts, filename)
+            messagebox.showinfo("Success", f"Forecast exported to {filename}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export forecast: {str(e)}")
+            logging.error(f"Stock forecast export error: {str(e)}")
 
-        # Get last 7 days of sales
-        for i in range(6, -1, -1):
-            date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-            sales_data = self.db.get_daily_sales(date)
-            total = sum(row[2] for row in sales_data) if sales_data else 0
-            
-            display_date = (datetime.now() - timedelta(days=i)).strftime('%m/%d')
-            self.daily_sales_tree.insert("", "end", values=(display_date, f"{total:.2f}"))
-
-    def refresh_monthly_sales(self):
-        """Refresh monthly sales data"""
-        # Clear existing data
-        for item in self.monthly_sales_tree.get_children():
-            self.monthly_sales_tree.delete(item)
-
-        # Get last 6 months of sales
-        for i in range(5, -1, -1):
-            date = datetime.now() - timedelta(days=i*30)
-            month_str = date.strftime('%Y-%m')
-            sales_data = self.db.get_monthly_sales(month_str)
-            total = sum(row[3] for row in sales_data) if sales_data else 0
-            
-            display_month = date.strftime('%b %Y')
-            self.monthly_sales_tree.insert("", "end", values=(display_month, f"{total:.2f}"))
-
-    def refresh_yearly_sales(self):
-        """Refresh yearly product sales data"""
-        # Clear existing data
+    def render_yearly_sales(self):
+        """Redraw the top products table from the in-memory yearly totals"""
         for item in self.yearly_sales_tree.get_children():
             self.yearly_sales_tree.delete(item)
 
-        # Get current year sales by product
-        current_year = datetime.now().year
-        yearly_sales = self.db.get_yearly_product_sales(current_year)
-        
-        for row in yearly_sales:
-            product_name, total_qty, total_revenue = row
-            self.yearly_sales_tree.insert("", "end", values=(
-                product_name, total_qty, f"{total_revenue:.2f}"
-            ))
-
-    def refresh_recent_activity(self):
-        """Refresh recent activity data"""
-        try:
-            # Recent sales
-            for item in self.recent_sales_tree.get_children():
-                self.recent_sales_tree.delete(item)
-            
-            recent_sales = self.db.get_recent_sales()
-            for sale in recent_sales[:10]:  # Show last 10 sales
-                _, product_name, quantity, total_price, _ = sale
-                self.recent_sales_tree.insert("", "end", values=(
-                    product_name, quantity, f"GH₵{total_price:.2f}"
-                ))
-
-            # Recent inventory changes
-            for item in self.recent_inventory_tree.get_children():
-                self.recent_inventory_tree.delete(item)
-            
-            recent_logs = self.db.get_inventory_logs()
-            for log in recent_logs[:10]:  # Show last 10 changes
-                _, product_name, change_qty, note, _ = log
-                change_text = f"+{change_qty}" if change_qty > 0 else str(change_qty)
-                self.recent_inventory_tree.insert("", "end", values=(
-                    product_name, change_text, note or "N/A"
-                ))
-
-        except Exception as e:
-            logging.error(f"Error refreshing recent activity: {str(e)}")
+        for values in ranked_sales_rows(self.year_product_sales):
+            self.yearly_sales_tree.insert("", "end", values=values)
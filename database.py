@@ -1,23 +1,178 @@
 import sqlite3
-from datetime import datetime
-import bcrypt
+import queue
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
 import logging
+from lazy_imports import lazy_import
+from timeutils import now_ts, utc_text, text_to_ts, period_bounds
+
+# Only needed to create or check a password, so it loads on the first login
+bcrypt = lazy_import('bcrypt')
 
 # Configure logging
 logging.basicConfig(filename='pos.log', level=logging.INFO, 
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Reorder thresholds applied when a product is created without one
+DEFAULT_REORDER_LEVELS = {'Block': 10, 'Cement': 5}
+DEFAULT_REORDER_LEVEL = 10
+
+# Read-only catalog record; namedtuple gives __slots__ and keeps tuple indexing working
+ProductRecord = namedtuple('ProductRecord', ['id', 'name', 'category', 'type', 'unit_price', 'stock', 'reorder_level',
+                                             'code'])
+
+# Row changes recorded in change_log for other terminals to pick up
+CHANGE_FEED_TRIGGERS = {
+    'products': ('INSERT', 'UPDATE', 'DELETE'),
+    'sales': ('INSERT', 'DELETE'),
+    'inventory_logs': ('INSERT', 'DELETE'),
+}
+
+# Day before any ledger activity; replay windows start after it
+LEDGER_START = '0001-01-01'
+
+# Sales carry the product's name, category and price as of the sale; the
+# LEFT JOIN keeps the insert even if the product row is gone
+INSERT_SALE = '''
+    {verb} INTO sales (product_id, quantity, total_price, sale_date, sale_ts, sale_uid,
+                       product_name, category, unit_price)
+    SELECT ?, ?, ?, ?, ?, ?, p.name, p.category, p.unit_price
+    FROM (SELECT ? AS id) AS s LEFT JOIN products p ON p.id = s.id
+'''
+
+class InsufficientStock(Exception):
+    """A checked sale batch would sell more than is available; nothing was recorded"""
+
+    def __init__(self, product_id, name, available):
+        super().__init__(f"Insufficient stock for {name} (available: {available})")
+        self.product_id = product_id
+        self.name = name
+        self.available = available
+
+def default_reorder_level(category):
+    """Reorder threshold for a category when none is given"""
+    return DEFAULT_REORDER_LEVELS.get(category, DEFAULT_REORDER_LEVEL)
+
+def normalize_code(code):
+    """Product codes are matched case-insensitively and without surrounding spaces"""
+    return code.strip().upper() if code is not None else None
+
+class ReadConnectionPool:
+    """Capped pool of read-only connections so reports don't queue behind till writes"""
+
+    def __init__(self, db_name, max_size=4, timeout=5.0):
+        self.uri = f"{Path(db_name).resolve().as_uri()}?mode=ro"
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def checkout(self):
+        """Take an idle connection, open a new one under the cap, or wait for a return"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_size:
+                conn = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+                self._created += 1
+                logging.info(f"Read pool opened connection {self._created}/{self.max_size}")
+                return conn
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("Timed out waiting for a read-only connection")
+
+    def checkin(self, conn):
+        """Return a connection to the pool"""
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a with block"""
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def close(self):
+        """Close every idle connection; connections still checked out close on return"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
 class DatabaseHandler:
-    def __init__(self, db_name):
-        self.conn = sqlite3.connect(db_name)
+    def __init__(self, db_name, read_pool_size=4, read_only=False):
+        self.db_name = db_name
+        self.read_only = read_only
+        self._write_lock = threading.RLock()
+        # Product catalog cache, dropped whenever a product or stock write commits
+        self._catalog = None
+        self._catalog_version = 0
+        self._catalog_lock = threading.Lock()
+        if read_only:
+            # Report worker processes: no writer connection and no schema changes
+            if db_name == ':memory:':
+                raise ValueError("An in-memory database can't be opened read-only")
+            self.conn = None
+            self.read_pool = ReadConnectionPool(db_name, read_pool_size)
+            logging.info(f"Database connected read-only: {db_name}")
+            return
+        # Dedicated writer connection; sales and stock changes are serialised through _write_lock
+        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        # Only takes effect on a new file; lets the backup service hand free pages back in small steps
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode=WAL")
         self.init_database()
+        self._init_local_change_tracking()
+        # In-memory databases can't be opened twice, so reads fall back to the writer
+        self.read_pool = ReadConnectionPool(db_name, read_pool_size) if db_name != ':memory:' else None
         logging.info(f"Database connected: {db_name}")
 
+    @contextmanager
+    def _writer(self, catalog=False):
+        """Run a write transaction on the dedicated writer connection
+
+        Pass catalog=True for writes that touch products or stock so the
+        catalog cache is invalidated once the transaction commits.
+        """
+        if self.conn is None:
+            raise sqlite3.OperationalError("Database was opened read-only")
+        with self._write_lock:
+            with self.conn:
+                yield self.conn
+            if catalog:
+                self.invalidate_catalog()
+
+    @contextmanager
+    def _reader(self):
+        """Borrow a read-only connection from the pool"""
+        if self.read_pool is None:
+            with self._write_lock:
+                yield self.conn
+            return
+        with self.read_pool.connection() as conn:
+            yield conn
+
     def init_database(self):
         """Initialize SQLite database with required tables"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._writer() as conn:
+                cursor = conn.cursor()
                 
                 # Products table
                 cursor.execute('''
@@ -27,9 +182,28 @@ class DatabaseHandler:
                     category TEXT,
                     type TEXT,
                     unit_price REAL NOT NULL,
-                    stock INTEGER NOT NULL DEFAULT 0
+                    stock INTEGER NOT NULL DEFAULT 0,
+                    reorder_level INTEGER NOT NULL DEFAULT 10
                 )
                 ''')
+
+                # Per-product reorder threshold (older databases predate the column)
+                if self._add_column_if_missing(cursor, 'products', 'reorder_level',
+                                               'INTEGER NOT NULL DEFAULT 10'):
+                    for category, level in DEFAULT_REORDER_LEVELS.items():
+                        cursor.execute("UPDATE products SET reorder_level = ? WHERE category = ?",
+                                       (level, category))
+                    logging.info("Added reorder_level column to products")
+
+                # Short SKU/barcode for fast sale entry; optional but unique when set
+                self._add_column_if_missing(cursor, 'products', 'code', 'TEXT')
+                cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_products_code ON products(code) WHERE code IS NOT NULL")
+
+                # Partial index holding only the rows currently below their threshold
+                cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_products_low_stock
+                ON products(stock) WHERE stock < reorder_level
+                ''')
                 
                 # Sales table
                 cursor.execute('''
@@ -55,6 +229,126 @@ class DatabaseHandler:
                 )
                 ''')
                 
+                # Journal id of each sale so a replayed journal entry is never applied twice
+                self._add_column_if_missing(cursor, 'sales', 'sale_uid', 'TEXT')
+                cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_sales_uid ON sales(sale_uid) WHERE sale_uid IS NOT NULL")
+
+                # Integer epoch timestamps so range filters are plain integer comparisons.
+                # The TEXT dates are still written; the triggers fill in rows from older terminals.
+                for table, ts_col, date_col in (('sales', 'sale_ts', 'sale_date'),
+                                                ('inventory_logs', 'log_ts', 'log_date')):
+                    if self._add_column_if_missing(cursor, table, ts_col, 'INTEGER'):
+                        cursor.execute(f"UPDATE {table} SET {ts_col} = CAST(strftime('%s', {date_col}) AS INTEGER)")
+                        logging.info(f"Backfilled {table}.{ts_col} for {cursor.rowcount} rows")
+                    cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_ts
+                    AFTER INSERT ON {table} WHEN NEW.{ts_col} IS NULL
+                    BEGIN
+                        UPDATE {table} SET {ts_col} = CAST(strftime('%s', NEW.{date_col}) AS INTEGER) WHERE id = NEW.id;
+                    END
+                    ''')
+
+                # Product name, category and price as they were at sale time, so sales reads
+                # don't join products and stay right after a rename, reprice or delete
+                added = [self._add_column_if_missing(cursor, 'sales', column, definition)
+                         for column, definition in (('product_name', 'TEXT'), ('category', 'TEXT'),
+                                                    ('unit_price', 'REAL'))]
+                if any(added):
+                    cursor.execute('''
+                    UPDATE sales SET (product_name, category, unit_price) =
+                        (SELECT name, category, unit_price FROM products WHERE id = sales.product_id)
+                    WHERE product_name IS NULL
+                    ''')
+                    logging.info(f"Backfilled product snapshot for {cursor.rowcount} sales")
+                cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_sales_product_snapshot
+                AFTER INSERT ON sales WHEN NEW.product_name IS NULL
+                BEGIN
+                    UPDATE sales SET (product_name, category, unit_price) =
+                        (SELECT name, category, unit_price FROM products WHERE id = NEW.product_id)
+                    WHERE id = NEW.id;
+                END
+                ''')
+
+                # Daily closing stock per product, written by compact_stock_snapshots.
+                # Sparse: a row only exists for days the product had sales or adjustments.
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stock_snapshots (
+                    product_id INTEGER NOT NULL,
+                    snapshot_date TEXT NOT NULL,
+                    closing_stock INTEGER NOT NULL,
+                    PRIMARY KEY (product_id, snapshot_date)
+                ) WITHOUT ROWID
+                ''')
+
+                # Per-month sales totals for years moved out to archive files
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sales_rollup (
+                    year TEXT NOT NULL,
+                    month TEXT NOT NULL,
+                    product_id INTEGER NOT NULL,
+                    product_name TEXT NOT NULL,
+                    category TEXT,
+                    quantity INTEGER NOT NULL,
+                    revenue REAL NOT NULL,
+                    sale_count INTEGER NOT NULL,
+                    PRIMARY KEY (year, month, product_id)
+                ) WITHOUT ROWID
+                ''')
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS archives (
+                    year TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    sales_count INTEGER NOT NULL,
+                    logs_count INTEGER NOT NULL,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                ''')
+
+                # Small key/value store for maintenance watermarks
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS app_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+                ''')
+
+                # Timestamp indexes so reports, compaction and replay only touch the range they need
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_ts ON sales(sale_ts)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_inventory_logs_ts ON inventory_logs(log_ts)")
+
+                # Per-product history indexes for keyset paging in get_product_history_page
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_product_ts ON sales(product_id, sale_ts)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_inventory_logs_product_ts ON inventory_logs(product_id, log_ts)")
+
+                # The TEXT date indexes are no longer used by any query
+                for index in ('idx_sales_date', 'idx_inventory_logs_date',
+                              'idx_sales_product_date', 'idx_inventory_logs_product_date'):
+                    cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+                # Change feed: every product/sale/log write appends a row here via triggers,
+                # so other terminals on the same file can pull just what changed
+                cursor.execute('''
+                CREATE TABLE IF NOT EXISTS change_log (
+                    version INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    row_id INTEGER NOT NULL,
+                    op TEXT NOT NULL,
+                    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                ''')
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_table ON change_log(table_name, version)")
+                for table, ops in CHANGE_FEED_TRIGGERS.items():
+                    for op in ops:
+                        row = "OLD" if op == 'DELETE' else "NEW"
+                        cursor.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_change
+                        AFTER {op} ON {table}
+                        BEGIN
+                            INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {row}.id, '{op}');
+                        END
+                        ''')
+
                 # Users table
                 cursor.execute('''
                 CREATE TABLE IF NOT EXISTS users (
@@ -68,14 +362,14 @@ class DatabaseHandler:
                 cursor.execute("SELECT COUNT(*) FROM products")
                 if cursor.fetchone()[0] == 0:
                     sample_products = [
-                        ("5 inch Solid Block", "Block", "5 inch Solid", 5.0, 0),
-                        ("6 inch Solid Block", "Block", "6 inch Solid", 6.0, 0),
-                        ("9 inch Solid Block", "Block", "9 inch Solid", 9.0, 0),
-                        ("Dangote Cement", "Cement", "Dangote Cement", 90.0, 0),
-                        ("Ghacem Cement", "Cement", "Ghacem Cement", 85.0, 0)
+                        ("5 inch Solid Block", "Block", "5 inch Solid", 5.0, 0, 10),
+                        ("6 inch Solid Block", "Block", "6 inch Solid", 6.0, 0, 10),
+                        ("9 inch Solid Block", "Block", "9 inch Solid", 9.0, 0, 10),
+                        ("Dangote Cement", "Cement", "Dangote Cement", 90.0, 0, 5),
+                        ("Ghacem Cement", "Cement", "Ghacem Cement", 85.0, 0, 5)
                     ]
                     cursor.executemany(
-                        "INSERT INTO products (name, category, type, unit_price, stock) VALUES (?, ?, ?, ?, ?)",
+                        "INSERT INTO products (name, category, type, unit_price, stock, reorder_level) VALUES (?, ?, ?, ?, ?, ?)",
                         sample_products
                     )
                     logging.info("Sample products added to database")
@@ -94,11 +388,88 @@ class DatabaseHandler:
             logging.error(f"Error initializing database: {str(e)}")
             raise
 
+    def _init_local_change_tracking(self):
+        """Remember which change_log versions this process wrote
+
+        TEMP objects belong to the writer connection alone, so the trigger only
+        fires for our own writes and the change feed can skip them.
+        """
+        with self._writer() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS local_changes (version INTEGER PRIMARY KEY)")
+            conn.execute('''
+            CREATE TEMP TRIGGER IF NOT EXISTS trg_local_change
+            AFTER INSERT ON main.change_log
+            BEGIN
+                INSERT INTO local_changes (version) VALUES (NEW.version);
+            END
+            ''')
+
+    def _get_meta(self, cursor, key, default=None):
+        """Read a value from app_meta"""
+        cursor.execute("SELECT value FROM app_meta WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, cursor, key, value):
+        """Write a value to app_meta"""
+        cursor.execute("INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _add_column_if_missing(self, cursor, table, column, definition):
+        """Add a column to an existing table (optionally schema.table); returns True if it had to be added"""
+        schema, _, name = table.rpartition('.')
+        cursor.execute(f"PRAGMA {schema + '.' if schema else ''}table_info({name})")
+        if column in [row[1] for row in cursor.fetchall()]:
+            return False
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        return True
+
+    @property
+    def catalog_version(self):
+        """Bumped on every catalog invalidation"""
+        return self._catalog_version
+
+    def invalidate_catalog(self):
+        """Drop the cached catalog; the next read reloads it"""
+        with self._catalog_lock:
+            self._catalog_version += 1
+            self._catalog = None
+
+    def _load_catalog(self):
+        """Return the cached (records, records_by_id) pair, loading it if needed"""
+        catalog = self._catalog
+        if catalog is not None:
+            return catalog
+        version = self._catalog_version
+        try:
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT id, name, category, type, unit_price, stock, reorder_level, code "
+                               "FROM products ORDER BY name")
+                records = tuple(map(ProductRecord._make, cursor.fetchall()))
+        except sqlite3.Error as e:
+            logging.error(f"Error loading product catalog: {str(e)}")
+            raise
+        catalog = (records, {record.id: record for record in records})
+        with self._catalog_lock:
+            # A write that committed while we were reading makes this copy stale
+            if version == self._catalog_version:
+                self._catalog = catalog
+        logging.info(f"Product catalog loaded: {len(records)} products (version {version})")
+        return catalog
+
+    def get_catalog(self):
+        """All products as ProductRecords ordered by name, served from the cache"""
+        return self._load_catalog()[0]
+
+    def get_catalog_product(self, product_id):
+        """One ProductRecord by id, or None"""
+        return self._load_catalog()[1].get(product_id)
+
     def get_user(self, username):
         """Retrieve user credentials by username for login.py"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._reader() as conn:
+                cursor = conn.cursor()
                 cursor.execute("SELECT username, password_hash FROM users WHERE username = ?", (username,))
                 user = cursor.fetchone()
                 logging.info(f"User lookup for {username}: {'Found' if user else 'Not found'}")
@@ -110,8 +481,8 @@ class DatabaseHandler:
     def authenticate_user(self, username, password):
         """Authenticate a user"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._reader() as conn:
+                cursor = conn.cursor()
                 cursor.execute("SELECT password_hash FROM users WHERE username = ?", (username,))
                 result = cursor.fetchone()
                 if result:
@@ -128,12 +499,9 @@ class DatabaseHandler:
     def get_products(self):
         """Retrieve all products for dropdowns"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
-                cursor.execute("SELECT id, name, unit_price, stock FROM products ORDER BY name")
-                products = cursor.fetchall()
-                logging.info(f"Fetched {len(products)} products")
-                return products
+            products = [(p.id, p.name, p.unit_price, p.stock) for p in self.get_catalog()]
+            logging.info(f"Fetched {len(products)} products")
+            return products
         except sqlite3.Error as e:
             logging.error(f"Error retrieving products: {str(e)}")
             raise
@@ -141,12 +509,9 @@ class DatabaseHandler:
     def get_product_by_name(self, name):
         """Get product details by name"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
-                cursor.execute("SELECT id, unit_price, stock FROM products WHERE name = ?", (name,))
-                result = cursor.fetchone()
-                logging.info(f"Product lookup by name {name}: {'Found' if result else 'Not found'}")
-                return result
+            product = next((p for p in self.get_catalog() if p.name == name), None)
+            logging.info(f"Product lookup by name {name}: {'Found' if product else 'Not found'}")
+            return (product.id, product.unit_price, product.stock) if product else None
         except sqlite3.Error as e:
             logging.error(f"Error retrieving product by name {name}: {str(e)}")
             raise
@@ -154,12 +519,9 @@ class DatabaseHandler:
     def get_product_by_id(self, product_id):
         """Get product details by ID"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
-                cursor.execute("SELECT unit_price, stock FROM products WHERE id = ?", (product_id,))
-                result = cursor.fetchone()
-                logging.info(f"Product lookup ID {product_id}: {'Found' if result else 'Not found'}")
-                return result
+            product = self.get_catalog_product(product_id)
+            logging.info(f"Product lookup by ID {product_id}: {'Found' if product else 'Not found'}")
+            return (product.unit_price, product.stock) if product else None
         except sqlite3.Error as e:
             logging.error(f"Error retrieving product ID {product_id}: {str(e)}")
             raise
@@ -167,11 +529,12 @@ class DatabaseHandler:
     def add_sale(self, product_id, quantity, total_price):
         """Record a sale and update stock"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._writer(catalog=True) as conn:
+                cursor = conn.cursor()
+                sale_ts = now_ts()
                 cursor.execute(
-                    "INSERT INTO sales (product_id, quantity, total_price) VALUES (?, ?, ?)",
-                    (product_id, quantity, total_price)
+                    INSERT_SALE.format(verb='INSERT'),
+                    (product_id, quantity, total_price, utc_text(sale_ts), sale_ts, None, product_id)
                 )
                 cursor.execute(
                     "UPDATE products SET stock = stock - ? WHERE id = ?",
@@ -182,16 +545,65 @@ class DatabaseHandler:
             logging.error(f"Error in add_sale: {str(e)}")
             raise
 
+    def add_sales_batch(self, sales, reserved=None):
+        """Record a batch of journaled sales in one transaction
+
+        Each sale is a dict with uid, product_id, quantity, total_price and
+        sale_date. Sales whose uid is already recorded are skipped, so a
+        journal can safely be replayed. Returns the number of new sales.
+
+        Journaled sales were already accepted at the till and are always
+        recorded. Pass reserved ({product_id: units}, e.g. another
+        process's unapplied journal) to check stock instead: each deduction
+        is guarded inside the write transaction, and a sale that would take
+        stock below the reserved units raises InsufficientStock and rolls
+        the whole batch back.
+        """
+        try:
+            with self._writer(catalog=True) as conn:
+                cursor = conn.cursor()
+                inserted = 0
+                taken = {}
+                for sale in sales:
+                    product_id, quantity = sale["product_id"], sale["quantity"]
+                    cursor.execute(
+                        INSERT_SALE.format(verb='INSERT OR IGNORE'),
+                        (product_id, quantity, sale["total_price"], sale["sale_date"],
+                         text_to_ts(sale["sale_date"]), sale["uid"], product_id)
+                    )
+                    if cursor.rowcount != 1:
+                        continue
+                    if reserved is None:
+                        cursor.execute("UPDATE products SET stock = stock - ? WHERE id = ?", (quantity, product_id))
+                    else:
+                        held = reserved.get(product_id, 0)
+                        cursor.execute(
+                            "UPDATE products SET stock = stock - ? WHERE id = ? AND stock - ? >= ?",
+                            (quantity, product_id, quantity, held)
+                        )
+                        if cursor.rowcount == 0:
+                            cursor.execute("SELECT name, stock FROM products WHERE id = ?", (product_id,))
+                            row = cursor.fetchone()
+                            name, stock = row if row else (f"Product {product_id}", 0)
+                            # Leaving the with block rolls back the sales already inserted
+                            raise InsufficientStock(product_id, name, max(stock + taken.get(product_id, 0) - held, 0))
+                        taken[product_id] = taken.get(product_id, 0) + quantity
+                    inserted += 1
+                logging.info(f"Sale batch recorded: {inserted} new of {len(sales)}")
+                return inserted
+        except sqlite3.Error as e:
+            logging.error(f"Error in add_sales_batch: {str(e)}")
+            raise
+
     def get_recent_sales(self):
         """Get recent sales for display"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._reader() as conn:
+                cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT s.id, p.name, s.quantity, s.total_price, s.sale_date
-                    FROM sales s
-                    JOIN products p ON s.product_id = p.id
-                    ORDER BY s.sale_date DESC
+                    SELECT id, COALESCE(product_name, 'Product #' || product_id), quantity, total_price, sale_ts
+                    FROM sales
+                    ORDER BY sale_ts DESC, id DESC
                     LIMIT 20
                 """)
                 sales = cursor.fetchall()
@@ -201,28 +613,34 @@ class DatabaseHandler:
             logging.error(f"Error retrieving recent sales: {str(e)}")
             raise
 
-    def add_product(self, name, category, ptype, unit_price):
+    def add_product(self, name, category, ptype, unit_price, reorder_level=None, code=None):
         """Add a new product"""
+        if reorder_level is None:
+            reorder_level = default_reorder_level(category)
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._writer(catalog=True) as conn:
+                cursor = conn.cursor()
                 cursor.execute(
-                    "INSERT INTO products (name, category, type, unit_price, stock) VALUES (?, ?, ?, ?, 0)",
-                    (name, category, ptype, unit_price)
+                    "INSERT INTO products (name, category, type, unit_price, stock, reorder_level, code) "
+                    "VALUES (?, ?, ?, ?, 0, ?, NULLIF(?, ''))",
+                    (name, category, ptype, unit_price, reorder_level, normalize_code(code))
                 )
                 logging.info(f"Product added: {name}")
         except sqlite3.Error as e:
             logging.error(f"Error adding product {name}: {str(e)}")
             raise
 
-    def update_product(self, product_id, name, category, ptype, unit_price):
-        """Update an existing product"""
+    def update_product(self, product_id, name, category, ptype, unit_price, reorder_level=None, code=None):
+        """Update an existing product; reorder_level/code None keeps the current value, code '' clears it"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._writer(catalog=True) as conn:
+                cursor = conn.cursor()
+                code = normalize_code(code)
                 cursor.execute(
-                    "UPDATE products SET name=?, category=?, type=?, unit_price=? WHERE id=?",
-                    (name, category, ptype, unit_price, product_id)
+                    "UPDATE products SET name=?, category=?, type=?, unit_price=?, "
+                    "reorder_level=COALESCE(?, reorder_level), "
+                    "code=CASE WHEN ? IS NULL THEN code ELSE NULLIF(?, '') END WHERE id=?",
+                    (name, category, ptype, unit_price, reorder_level, code, code, product_id)
                 )
                 logging.info(f"Product updated: ID {product_id}")
         except sqlite3.Error as e:
@@ -232,8 +650,8 @@ class DatabaseHandler:
     def delete_product(self, product_id):
         """Delete a product"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._writer(catalog=True) as conn:
+                cursor = conn.cursor()
                 cursor.execute("DELETE FROM products WHERE id=?", (product_id,))
                 logging.info(f"Product deleted: ID {product_id}")
         except sqlite3.Error as e:
@@ -243,12 +661,9 @@ class DatabaseHandler:
     def get_all_products(self):
         """Get all products for display"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
-                cursor.execute("SELECT id, name, category, type, unit_price, stock FROM products ORDER BY name")
-                products = cursor.fetchall()
-                logging.info(f"Fetched {len(products)} products with full details")
-                return products
+            products = list(self.get_catalog())
+            logging.info(f"Fetched {len(products)} products for display")
+            return products
         except sqlite3.Error as e:
             logging.error(f"Error retrieving all products: {str(e)}")
             raise
@@ -256,28 +671,76 @@ class DatabaseHandler:
     def update_stock(self, product_id, qty_change, note):
         """Update stock and log the change"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._writer(catalog=True) as conn:
+                cursor = conn.cursor()
                 cursor.execute("UPDATE products SET stock = stock + ? WHERE id = ?", (qty_change, product_id))
+                log_ts = now_ts()
                 cursor.execute(
-                    "INSERT INTO inventory_logs (product_id, change_qty, note) VALUES (?, ?, ?)",
-                    (product_id, qty_change, note)
+                    "INSERT INTO inventory_logs (product_id, change_qty, note, log_date, log_ts) VALUES (?, ?, ?, ?, ?)",
+                    (product_id, qty_change, note, utc_text(log_ts), log_ts)
                 )
                 logging.info(f"Stock updated for product_id {product_id}, change {qty_change}")
         except sqlite3.Error as e:
             logging.error(f"Error updating stock for product_id {product_id}: {str(e)}")
             raise
 
+    def update_stock_bulk(self, changes, note):
+        """Apply many stock changes and their log entries in one transaction
+
+        changes is a list of (product_id, qty_change) pairs. Returns a dict of
+        the resulting stock balance per product id.
+        """
+        try:
+            with self._writer(catalog=True) as conn:
+                cursor = conn.cursor()
+                cursor.executemany("UPDATE products SET stock = stock + ? WHERE id = ?",
+                                   [(qty_change, product_id) for product_id, qty_change in changes])
+                log_ts = now_ts()
+                cursor.executemany(
+                    "INSERT INTO inventory_logs (product_id, change_qty, note, log_date, log_ts) VALUES (?, ?, ?, ?, ?)",
+                    [(product_id, qty_change, note, utc_text(log_ts), log_ts) for product_id, qty_change in changes]
+                )
+                product_ids = list({product_id for product_id, _ in changes})
+                balances = {}
+                if product_ids:
+                    cursor.execute(
+                        f"SELECT id, stock FROM products WHERE id IN ({','.join('?' * len(product_ids))})",
+                        product_ids
+                    )
+                    balances = dict(cursor.fetchall())
+                logging.info(f"Bulk stock update applied for {len(changes)} products")
+                return balances
+        except sqlite3.Error as e:
+            logging.error(f"Error in update_stock_bulk: {str(e)}")
+            raise
+
+    def receive_stock_bulk(self, items, note):
+        """Add stock for many products in one transaction; items is a list of (product_id, quantity)"""
+        return self.update_stock_bulk(items, note)
+
+    def update_prices_bulk(self, items):
+        """Set unit prices for many products in one transaction; items is a list of (product_id, unit_price)"""
+        try:
+            with self._writer(catalog=True) as conn:
+                cursor = conn.cursor()
+                cursor.executemany("UPDATE products SET unit_price = ? WHERE id = ?",
+                                   [(price, product_id) for product_id, price in items])
+                logging.info(f"Bulk price update applied for {len(items)} products")
+                return len(items)
+        except sqlite3.Error as e:
+            logging.error(f"Error in update_prices_bulk: {str(e)}")
+            raise
+
     def get_inventory_logs(self):
         """Get recent inventory logs"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._reader() as conn:
+                cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT l.id, p.name, l.change_qty, l.note, l.log_date
+                    SELECT l.id, p.name, l.change_qty, l.note, l.log_ts
                     FROM inventory_logs l
                     JOIN products p ON l.product_id = p.id
-                    ORDER BY l.log_date DESC
+                    ORDER BY l.log_ts DESC, l.id DESC
                     LIMIT 50
                 """)
                 logs = cursor.fetchall()
@@ -290,18 +753,18 @@ class DatabaseHandler:
     def get_product_history(self, product_id):
         """Get full transaction history for a product"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._reader() as conn:
+                cursor = conn.cursor()
                 cursor.execute("""
                     SELECT 'Sale' as type, -s.quantity as change_qty, 
                            'Sale ID: ' || s.id || ', Total: GH₵' || s.total_price as note, 
-                           s.sale_date as date
+                           s.sale_ts as date
                     FROM sales s
                     WHERE s.product_id = ?
                     
                     UNION ALL
                     
-                    SELECT 'Adjustment' as type, l.change_qty, l.note, l.log_date as date
+                    SELECT 'Adjustment' as type, l.change_qty, l.note, l.log_ts as date
                     FROM inventory_logs l
                     WHERE l.product_id = ?
                     
@@ -314,36 +777,577 @@ class DatabaseHandler:
             logging.error(f"Error retrieving product history for product_id {product_id}: {str(e)}")
             raise
 
+    def _history_keyset_filter(self, kind, date_col, id_col, cursor):
+        """WHERE fragment selecting rows of one history branch that sort after the cursor"""
+        if cursor is None:
+            return "", []
+        cursor_date, cursor_type, cursor_id = cursor
+        if kind == cursor_type:
+            return f"AND ({date_col}, {id_col}) < (?, ?)", [cursor_date, cursor_id]
+        if kind < cursor_type:
+            # Rows of this type sort after the cursor's type on the same timestamp
+            return f"AND {date_col} <= ?", [cursor_date]
+        return f"AND {date_col} < ?", [cursor_date]
+
+    def get_product_history_page(self, product_id, limit=100, cursor=None):
+        """Get one page of a product's history, newest first
+
+        Rows are (type, id, change_qty, total_price, note, ts) with raw values;
+        total_price is only set for sales and note only for adjustments. Pass the
+        returned cursor back in to fetch the next page; it is None on the last page.
+        """
+        try:
+            with self._reader() as conn:
+                db_cursor = conn.cursor()
+                sale_filter, sale_params = self._history_keyset_filter('Sale', 's.sale_ts', 's.id', cursor)
+                log_filter, log_params = self._history_keyset_filter('Adjustment', 'l.log_ts', 'l.id', cursor)
+                db_cursor.execute(f"""
+                    SELECT * FROM (
+                        SELECT 'Sale' AS type, s.id, -s.quantity AS change_qty, s.total_price,
+                               NULL AS note, s.sale_ts AS date
+                        FROM sales s
+                        WHERE s.product_id = ? {sale_filter}
+                        ORDER BY s.sale_ts DESC, s.id DESC
+                        LIMIT ?
+                    )
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT 'Adjustment' AS type, l.id, l.change_qty, NULL AS total_price,
+                               l.note, l.log_ts AS date
+                        FROM inventory_logs l
+                        WHERE l.product_id = ? {log_filter}
+                        ORDER BY l.log_ts DESC, l.id DESC
+                        LIMIT ?
+                    )
+                    ORDER BY date DESC, type DESC, id DESC
+                    LIMIT ?
+                """, [product_id, *sale_params, limit, product_id, *log_params, limit, limit])
+                rows = db_cursor.fetchall()
+                next_cursor = None
+                if len(rows) == limit:
+                    kind, row_id, _, _, _, date = rows[-1]
+                    next_cursor = (date, kind, row_id)
+                logging.info(f"Fetched {len(rows)} history records for product_id {product_id}")
+                return rows, next_cursor
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving product history page for product_id {product_id}: {str(e)}")
+            raise
+
     def get_current_stocks(self):
         """Get current stock levels for all products"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            stocks = [(p.id, p.name, p.category, p.stock, p.reorder_level) for p in self.get_catalog()]
+            logging.info(f"Fetched {len(stocks)} current stock levels")
+            return stocks
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving current stocks: {str(e)}")
+            raise
+
+    def get_low_stock(self):
+        """Get products below their reorder level"""
+        try:
+            with self._reader() as conn:
+                cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT id, name, category, stock
+                    SELECT id, name, category, stock, reorder_level
                     FROM products
-                    ORDER BY name
+                    WHERE stock < reorder_level
+                    ORDER BY stock
                 """)
-                stocks = cursor.fetchall()
-                logging.info(f"Fetched {len(stocks)} stock records")
-                return stocks
+                products = cursor.fetchall()
+                logging.info(f"Fetched {len(products)} low stock products")
+                return products
         except sqlite3.Error as e:
-            logging.error(f"Error retrieving current stocks: {str(e)}")
+            logging.error(f"Error retrieving low stock products: {str(e)}")
+            raise
+
+    def get_low_stock_count(self):
+        """Count products below their reorder level"""
+        try:
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM products WHERE stock < reorder_level")
+                count = cursor.fetchone()[0]
+                logging.info(f"Low stock count: {count}")
+                return count
+        except sqlite3.Error as e:
+            logging.error(f"Error counting low stock products: {str(e)}")
+            raise
+
+    def compact_stock_snapshots(self, through_date=None, chunk_days=31):
+        """Write closing stock balances for every day up to through_date (default yesterday)
+
+        Days are UTC calendar days of the stored timestamps. Only days after the
+        previous compaction are processed, so routine runs are cheap. Days are
+        written chunk_days at a time, each chunk in its own transaction, so a
+        first run over years of history lets sales in between chunks instead
+        of holding the writer lock for all of it. Returns the snapshots written.
+        """
+        if through_date is None:
+            through_date = (datetime.now(timezone.utc).date() - timedelta(days=1)).isoformat()
+        written = 0
+        chunks = 0
+        balances = None
+        last_written = None
+        try:
+            while True:
+                with self._writer() as conn:
+                    cursor = conn.cursor()
+                    compacted = self._get_meta(cursor, 'snapshots_through')
+                    if compacted is not None and compacted >= through_date:
+                        break
+
+                    if balances is None or compacted != last_written:
+                        # Opening balance for each product is its latest existing snapshot
+                        cursor.execute("""
+                            SELECT s.product_id, s.closing_stock
+                            FROM stock_snapshots s
+                            WHERE s.snapshot_date = (SELECT MAX(snapshot_date) FROM stock_snapshots
+                                                     WHERE product_id = s.product_id)
+                        """)
+                        balances = dict(cursor.fetchall())
+
+                    if compacted is None:
+                        # First run: start the chunks at the oldest sale or stock change
+                        cursor.execute("""
+                            SELECT MIN(ts) FROM (SELECT MIN(sale_ts) AS ts FROM sales
+                                                 UNION ALL SELECT MIN(log_ts) FROM inventory_logs)
+                        """)
+                        first_ts = cursor.fetchone()[0]
+                        first_day = (datetime.fromtimestamp(first_ts, timezone.utc).date() if first_ts is not None
+                                     else date.fromisoformat(through_date))
+                        chunk_end = (first_day + timedelta(days=chunk_days - 1)).isoformat()
+                    else:
+                        chunk_end = (date.fromisoformat(compacted) + timedelta(days=chunk_days)).isoformat()
+                    chunk_end = min(chunk_end, through_date)
+
+                    start = period_bounds(compacted or LEDGER_START)[1]
+                    end = period_bounds(chunk_end)[1]
+                    cursor.execute("""
+                        SELECT product_id, day, SUM(delta) FROM (
+                            SELECT product_id, date(sale_ts, 'unixepoch') AS day, -quantity AS delta
+                            FROM sales
+                            WHERE sale_ts >= ? AND sale_ts < ?
+                            UNION ALL
+                            SELECT product_id, date(log_ts, 'unixepoch') AS day, change_qty AS delta
+                            FROM inventory_logs
+                            WHERE log_ts >= ? AND log_ts < ?
+                        )
+                        GROUP BY product_id, day
+                        ORDER BY product_id, day
+                    """, (start, end, start, end))
+
+                    snapshots = []
+                    for product_id, day, delta in cursor.fetchall():
+                        balances[product_id] = balances.get(product_id, 0) + delta
+                        snapshots.append((product_id, day, balances[product_id]))
+
+                    cursor.executemany(
+                        "INSERT OR REPLACE INTO stock_snapshots (product_id, snapshot_date, closing_stock) VALUES (?, ?, ?)",
+                        snapshots
+                    )
+                    self._set_meta(cursor, 'snapshots_through', chunk_end)
+                    last_written = chunk_end
+                    written += len(snapshots)
+                    chunks += 1
+            if chunks:
+                logging.info(f"Compacted {written} stock snapshots through {through_date} in {chunks} chunks")
+            return written
+        except sqlite3.Error as e:
+            logging.error(f"Error compacting stock snapshots: {str(e)}")
+            raise
+
+    def _replay_since(self, cursor, since_date, until_date=None, product_id=None):
+        """Net stock change per product for days after since_date (up to and including until_date)"""
+        params = [period_bounds(since_date or LEDGER_START)[1]]
+        sale_filter = "sale_ts >= ?"
+        log_filter = "log_ts >= ?"
+        if until_date is not None:
+            sale_filter += " AND sale_ts < ?"
+            log_filter += " AND log_ts < ?"
+            params.append(period_bounds(until_date)[1])
+        if product_id is not None:
+            sale_filter += " AND product_id = ?"
+            log_filter += " AND product_id = ?"
+            params.append(product_id)
+        cursor.execute(f"""
+            SELECT product_id, SUM(delta) FROM (
+                SELECT product_id, -quantity AS delta FROM sales WHERE {sale_filter}
+                UNION ALL
+                SELECT product_id, change_qty AS delta FROM inventory_logs WHERE {log_filter}
+            )
+            GROUP BY product_id
+        """, params + params)
+        return dict(cursor.fetchall())
+
+    def get_stock_at(self, product_id, as_of_date):
+        """Closing stock of a product on a given YYYY-MM-DD day"""
+        try:
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT snapshot_date, closing_stock FROM stock_snapshots
+                    WHERE product_id = ? AND snapshot_date <= ?
+                    ORDER BY snapshot_date DESC LIMIT 1
+                """, (product_id, as_of_date))
+                snapshot = cursor.fetchone()
+                snapshot_date, stock = snapshot if snapshot else (None, 0)
+
+                # Snapshots are complete up to the compaction watermark; replay only the tail
+                compacted = self._get_meta(cursor, 'snapshots_through')
+                if compacted is None or as_of_date > compacted:
+                    since = max(snapshot_date or LEDGER_START, compacted or LEDGER_START)
+                    stock += self._replay_since(cursor, since, as_of_date, product_id).get(product_id, 0)
+                logging.info(f"Stock for product_id {product_id} on {as_of_date}: {stock}")
+                return stock
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving stock for product_id {product_id} on {as_of_date}: {str(e)}")
+            raise
+
+    def reconcile_stock(self):
+        """Compare products.stock against the ledger (snapshots plus the uncompacted tail)
+
+        Returns (product_id, name, recorded_stock, ledger_stock) for every mismatch.
+        """
+        try:
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                compacted = self._get_meta(cursor, 'snapshots_through')
+                cursor.execute("""
+                    SELECT s.product_id, s.closing_stock
+                    FROM stock_snapshots s
+                    WHERE s.snapshot_date = (SELECT MAX(snapshot_date) FROM stock_snapshots
+                                             WHERE product_id = s.product_id)
+                """)
+                ledger = dict(cursor.fetchall())
+                for product_id, delta in self._replay_since(cursor, compacted).items():
+                    ledger[product_id] = ledger.get(product_id, 0) + delta
+
+                cursor.execute("SELECT id, name, stock FROM products ORDER BY name")
+                mismatches = [
+                    (product_id, name, stock, ledger.get(product_id, 0))
+                    for product_id, name, stock in cursor.fetchall()
+                    if stock != ledger.get(product_id, 0)
+                ]
+                logging.info(f"Stock reconciliation found {len(mismatches)} mismatches")
+                return mismatches
+        except sqlite3.Error as e:
+            logging.error(f"Error reconciling stock: {str(e)}")
+            raise
+
+    def archive_path(self, year):
+        """Archive file for a year, kept in an archive/ folder next to the database"""
+        return str(Path(self.db_name).resolve().parent / 'archive' / f'pos_archive_{year}.db')
+
+    def get_archives(self):
+        """List archived years as (year, path, sales_count, logs_count, archived_at)"""
+        try:
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT year, path, sales_count, logs_count, archived_at FROM archives ORDER BY year")
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving archives: {str(e)}")
+            raise
+
+    def _archive_for(self, cursor, year):
+        """Archive file path if the year has been archived, else None"""
+        cursor.execute("SELECT path FROM archives WHERE year = ?", (str(year),))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def archive_year(self, year):
+        """Move one closed year's sales and inventory logs into its own archive file
+
+        Stock snapshots are compacted through the end of the year first, so
+        the stock ledger no longer needs the detail rows. Rows are copied
+        and committed to the archive before they are removed from the main
+        file, so an interrupted run can simply be repeated. Monthly totals
+        stay behind in sales_rollup for the yearly and monthly reports.
+        Returns (sales_moved, logs_moved).
+        """
+        year = str(int(year))
+        if year >= datetime.now().strftime('%Y'):
+            raise ValueError(f"{year} is not a closed year")
+        start, end = period_bounds(year)
+        path = self.archive_path(year)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+        self.compact_stock_snapshots(through_date=f"{year}-12-31")
+        try:
+            with self._write_lock:
+                self.conn.execute("ATTACH DATABASE ? AS archive", (path,))
+                try:
+                    # Step 1: copy into the archive file (self-contained: names travel with the rows)
+                    with self.conn:
+                        cursor = self.conn.cursor()
+                        cursor.execute('''
+                        CREATE TABLE IF NOT EXISTS archive.sales (
+                            id INTEGER PRIMARY KEY,
+                            product_id INTEGER,
+                            quantity INTEGER,
+                            total_price REAL,
+                            sale_date TIMESTAMP,
+                            sale_uid TEXT,
+                            product_name TEXT,
+                            category TEXT,
+                            sale_ts INTEGER,
+                            unit_price REAL
+                        )
+                        ''')
+                        cursor.execute('''
+                        CREATE TABLE IF NOT EXISTS archive.inventory_logs (
+                            id INTEGER PRIMARY KEY,
+                            product_id INTEGER,
+                            change_qty INTEGER,
+                            note TEXT,
+                            log_date TIMESTAMP,
+                            product_name TEXT,
+                            log_ts INTEGER
+                        )
+                        ''')
+                        # Archives written before the timestamp columns existed
+                        if self._add_column_if_missing(cursor, 'archive.sales', 'sale_ts', 'INTEGER'):
+                            cursor.execute("UPDATE archive.sales SET sale_ts = CAST(strftime('%s', sale_date) AS INTEGER)")
+                        if self._add_column_if_missing(cursor, 'archive.inventory_logs', 'log_ts', 'INTEGER'):
+                            cursor.execute("UPDATE archive.inventory_logs SET log_ts = CAST(strftime('%s', log_date) AS INTEGER)")
+                        self._add_column_if_missing(cursor, 'archive.sales', 'unit_price', 'REAL')
+                        cursor.execute("DROP INDEX IF EXISTS archive.idx_sales_date")
+                        cursor.execute("DROP INDEX IF EXISTS archive.idx_inventory_logs_date")
+                        cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_sales_ts ON sales(sale_ts)")
+                        cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_inventory_logs_ts ON inventory_logs(log_ts)")
+                        cursor.execute("""
+                            INSERT OR IGNORE INTO archive.sales
+                                (id, product_id, quantity, total_price, sale_date, sale_uid, product_name, category,
+                                 sale_ts, unit_price)
+                            SELECT s.id, s.product_id, s.quantity, s.total_price, s.sale_date, s.sale_uid,
+                                   COALESCE(s.product_name, p.name, 'Product #' || s.product_id),
+                                   COALESCE(s.category, p.category), s.sale_ts, s.unit_price
+                            FROM main.sales s LEFT JOIN main.products p ON p.id = s.product_id
+                            WHERE s.sale_ts >= ? AND s.sale_ts < ?
+                        """, (start, end))
+                        cursor.execute("""
+                            INSERT OR IGNORE INTO archive.inventory_logs
+                                (id, product_id, change_qty, note, log_date, product_name, log_ts)
+                            SELECT l.id, l.product_id, l.change_qty, l.note, l.log_date,
+                                   COALESCE(p.name, 'Product #' || l.product_id), l.log_ts
+                            FROM main.inventory_logs l LEFT JOIN main.products p ON p.id = l.product_id
+                            WHERE l.log_ts >= ? AND l.log_ts < ?
+                        """, (start, end))
+
+                    # Step 2: roll up, then drop the detail rows from the hot file
+                    with self.conn:
+                        cursor = self.conn.cursor()
+                        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM change_log")
+                        version_before = cursor.fetchone()[0]
+                        cursor.execute("""
+                            INSERT OR REPLACE INTO sales_rollup
+                                (year, month, product_id, product_name, category, quantity, revenue, sale_count)
+                            SELECT ?, strftime('%Y-%m', sale_ts, 'unixepoch'), product_id, product_name, category,
+                                   SUM(quantity), SUM(total_price), COUNT(*)
+                            FROM archive.sales
+                            WHERE sale_ts >= ? AND sale_ts < ?
+                            GROUP BY strftime('%Y-%m', sale_ts, 'unixepoch'), product_id
+                        """, (year, start, end))
+                        cursor.execute("DELETE FROM main.sales WHERE sale_ts >= ? AND sale_ts < ?", (start, end))
+                        sales_moved = cursor.rowcount
+                        cursor.execute("DELETE FROM main.inventory_logs WHERE log_ts >= ? AND log_ts < ?", (start, end))
+                        logs_moved = cursor.rowcount
+                        # Other terminals don't need a delete per archived row; reports read the rollup
+                        cursor.execute("DELETE FROM change_log WHERE version > ? AND op = 'DELETE'", (version_before,))
+                        cursor.execute("SELECT COUNT(*) FROM archive.sales")
+                        archived_sales = cursor.fetchone()[0]
+                        cursor.execute("SELECT COUNT(*) FROM archive.inventory_logs")
+                        archived_logs = cursor.fetchone()[0]
+                        cursor.execute(
+                            "INSERT OR REPLACE INTO archives (year, path, sales_count, logs_count) VALUES (?, ?, ?, ?)",
+                            (year, path, archived_sales, archived_logs)
+                        )
+                finally:
+                    self.conn.execute("DETACH DATABASE archive")
+            logging.info(f"Archived {year}: {sales_moved} sales and {logs_moved} inventory logs to {path}")
+            return sales_moved, logs_moved
+        except sqlite3.Error as e:
+            logging.error(f"Error archiving {year}: {str(e)}")
+            raise
+
+    @contextmanager
+    def _archive_reader(self, path):
+        """Read-only connection to one archive file"""
+        conn = sqlite3.connect(f"{Path(path).as_uri()}?mode=ro", uri=True)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def incremental_vacuum(self, max_pages=1000):
+        """Return up to max_pages free pages to the OS; a no-op unless auto_vacuum is INCREMENTAL
+
+        Runs in small chunks on the writer so it never holds the write lock for long.
+        Returns the number of pages freed.
+        """
+        try:
+            with self._write_lock:
+                if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                    return 0
+            freed = 0
+            while freed < max_pages:
+                # Take the lock per chunk so sales can interleave
+                with self._write_lock:
+                    free_pages = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+                    if not free_pages:
+                        break
+                    step = min(100, free_pages, max_pages - freed)
+                    self.conn.execute(f"PRAGMA incremental_vacuum({step})").fetchall()
+                freed += step
+            logging.info(f"Incremental vacuum freed {freed} pages")
+            return freed
+        except sqlite3.Error as e:
+            logging.error(f"Error running incremental vacuum: {str(e)}")
+            raise
+
+    def get_data_version(self):
+        """PRAGMA data_version of the writer connection; changes only when another connection commits"""
+        with self._write_lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def get_change_log_bounds(self):
+        """Oldest and newest change_log versions (0, 0 when empty)"""
+        try:
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COALESCE(MIN(version), 0), COALESCE(MAX(version), 0) FROM change_log")
+                return cursor.fetchone()
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving change log bounds: {str(e)}")
+            raise
+
+    def get_table_version(self, table_name):
+        """Latest change_log version for one table (0 if it has never changed)"""
+        try:
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COALESCE(MAX(version), 0) FROM change_log WHERE table_name = ?", (table_name,))
+                return cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving change version for {table_name}: {str(e)}")
+            raise
+
+    def get_changes_since(self, version, limit=1000):
+        """Get change_log rows after a version as (version, table_name, row_id, op, is_local)"""
+        try:
+            with self._writer() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT c.version, c.table_name, c.row_id, c.op, l.version IS NOT NULL
+                    FROM change_log c
+                    LEFT JOIN temp.local_changes l ON l.version = c.version
+                    WHERE c.version > ?
+                    ORDER BY c.version
+                    LIMIT ?
+                """, (version, limit))
+                changes = cursor.fetchall()
+                if changes:
+                    cursor.execute("DELETE FROM temp.local_changes WHERE version <= ?", (changes[-1][0],))
+                logging.info(f"Fetched {len(changes)} changes since version {version}")
+                return changes
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving changes since version {version}: {str(e)}")
+            raise
+
+    def _get_rows_by_ids(self, query, ids):
+        """Run a query with an IN (...) list of ids"""
+        if not ids:
+            return []
+        ids = list(ids)
+        with self._reader() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query.format(placeholders=",".join("?" * len(ids))), ids)
+            return cursor.fetchall()
+
+    def get_products_by_ids(self, product_ids):
+        """Get full product rows for a set of ids (same columns as get_all_products)"""
+        try:
+            products = [product for product in map(self.get_catalog_product, set(product_ids))
+                        if product is not None]
+            logging.info(f"Fetched {len(products)} products by id")
+            return products
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving products by id: {str(e)}")
+            raise
+
+    def get_sales_by_ids(self, sale_ids):
+        """Get raw sale rows (id, product_id, quantity, total_price, sale_ts) for a set of ids"""
+        try:
+            return self._get_rows_by_ids(
+                "SELECT id, product_id, quantity, total_price, sale_ts "
+                "FROM sales WHERE id IN ({placeholders}) ORDER BY id", sale_ids)
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving sales by id: {str(e)}")
+            raise
+
+    def get_recorded_sale_uids(self, uids):
+        """The subset of sale uids already in the sales table"""
+        try:
+            uids = list(uids)
+            recorded = set()
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(uids), 500):
+                recorded.update(row[0] for row in self._get_rows_by_ids(
+                    "SELECT sale_uid FROM sales WHERE sale_uid IN ({placeholders})", uids[start:start + 500]))
+            return recorded
+        except sqlite3.Error as e:
+            logging.error(f"Error checking recorded sale uids: {str(e)}")
+            raise
+
+    def get_inventory_logs_by_ids(self, log_ids):
+        """Get raw inventory log rows (id, product_id, change_qty, note, log_ts) for a set of ids"""
+        try:
+            return self._get_rows_by_ids(
+                "SELECT id, product_id, change_qty, note, log_ts "
+                "FROM inventory_logs WHERE id IN ({placeholders}) ORDER BY id", log_ids)
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving inventory logs by id: {str(e)}")
+            raise
+
+    def prune_change_log(self, keep_days=7):
+        """Drop change feed entries older than keep_days"""
+        try:
+            with self._writer() as conn:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM change_log WHERE changed_at < datetime('now', ?)",
+                               (f"-{int(keep_days)} days",))
+                logging.info(f"Pruned {cursor.rowcount} change log entries")
+                return cursor.rowcount
+        except sqlite3.Error as e:
+            logging.error(f"Error pruning change log: {str(e)}")
             raise
 
     def get_daily_sales(self, date):
         """Get daily sales report"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                start, end = period_bounds(date)
+                archive = self._archive_for(cursor, date[:4])
+                if archive is not None:
+                    with self._archive_reader(archive) as archive_conn:
+                        sales = archive_conn.execute("""
+                            SELECT product_name, SUM(quantity) as total_qty, SUM(total_price) as total_amount
+                            FROM sales
+                            WHERE sale_ts >= ? AND sale_ts < ?
+                            GROUP BY product_name
+                            ORDER BY total_amount DESC
+                        """, (start, end)).fetchall()
+                    logging.info(f"Fetched {len(sales)} archived daily sales records for {date}")
+                    return sales
                 cursor.execute("""
-                    SELECT p.name, SUM(s.quantity) as total_qty, SUM(s.total_price) as total_amount
-                    FROM sales s
-                    JOIN products p ON s.product_id = p.id
-                    WHERE date(s.sale_date) = ?
-                    GROUP BY p.name
+                    SELECT product_name, SUM(quantity) as total_qty, SUM(total_price) as total_amount
+                    FROM sales
+                    WHERE sale_ts >= ? AND sale_ts < ?
+                    GROUP BY product_name
                     ORDER BY total_amount DESC
-                """, (date,))
+                """, (start, end))
                 sales = cursor.fetchall()
                 logging.info(f"Fetched {len(sales)} daily sales records for {date}")
                 return sales
@@ -354,16 +1358,26 @@ class DatabaseHandler:
     def get_monthly_sales(self, month):
         """Get monthly sales report"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                if self._archive_for(cursor, month[:4]) is not None:
+                    cursor.execute("""
+                        SELECT product_name, category, SUM(quantity) as total_qty, SUM(revenue) as total_amount
+                        FROM sales_rollup
+                        WHERE year = ? AND month = ?
+                        GROUP BY product_name, category
+                        ORDER BY category, total_amount DESC
+                    """, (month[:4], month))
+                    sales = cursor.fetchall()
+                    logging.info(f"Fetched {len(sales)} archived monthly sales records for {month}")
+                    return sales
                 cursor.execute("""
-                    SELECT p.name, p.category, SUM(s.quantity) as total_qty, SUM(s.total_price) as total_amount
-                    FROM sales s
-                    JOIN products p ON s.product_id = p.id
-                    WHERE strftime('%Y-%m', s.sale_date) = ?
-                    GROUP BY p.name, p.category
-                    ORDER BY p.category, total_amount DESC
-                """, (month,))
+                    SELECT product_name, category, SUM(quantity) as total_qty, SUM(total_price) as total_amount
+                    FROM sales
+                    WHERE sale_ts >= ? AND sale_ts < ?
+                    GROUP BY product_name, category
+                    ORDER BY category, total_amount DESC
+                """, period_bounds(month))
                 sales = cursor.fetchall()
                 logging.info(f"Fetched {len(sales)} monthly sales records for {month}")
                 return sales
@@ -371,19 +1385,52 @@ class DatabaseHandler:
             logging.error(f"Error retrieving monthly sales for {month}: {str(e)}")
             raise
 
+    def get_daily_product_sales(self, after_id=0):
+        """Per-day, per-product sales totals for the analytics cube
+
+        Rows are (day, product_id, product_name, category, quantity, revenue,
+        sale_count) where day counts days since 1970-01-01 (UTC). Only sales
+        with an id above after_id are read; a full load (after_id=0) also
+        reads every archived year. Returns (rows, highest sale id seen).
+        """
+        try:
+            rows = []
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                if not after_id:
+                    cursor.execute("SELECT path FROM archives ORDER BY year")
+                    for (path,) in cursor.fetchall():
+                        with self._archive_reader(path) as archive_conn:
+                            rows.extend(archive_conn.execute("""
+                                SELECT CAST(strftime('%s', sale_date) AS INTEGER) / 86400 AS day, product_id,
+                                       product_name, category, SUM(quantity), SUM(total_price), COUNT(*)
+                                FROM sales
+                                GROUP BY day, product_id
+                            """).fetchall())
+                cursor.execute("""
+                    SELECT sale_ts / 86400 AS day, product_id, product_name, category,
+                           SUM(quantity), SUM(total_price), COUNT(*), MAX(id)
+                    FROM sales
+                    WHERE id > ?
+                    GROUP BY day, product_id
+                """, (after_id,))
+                last_id = after_id
+                for row in cursor.fetchall():
+                    rows.append(row[:7])
+                    last_id = max(last_id, row[7])
+                logging.info(f"Fetched {len(rows)} daily product sales rows after sale id {after_id}")
+                return rows, last_id
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving daily product sales: {str(e)}")
+            raise
+
     def get_stock_report(self):
         """Get stock report"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
-                cursor.execute("""
-                    SELECT name, category, type, unit_price, stock, (unit_price * stock) as stock_value
-                    FROM products
-                    ORDER BY category, name
-                """)
-                stocks = cursor.fetchall()
-                logging.info(f"Fetched {len(stocks)} stock report records")
-                return stocks
+            report = [(p.name, p.category, p.type, p.unit_price, p.stock, p.unit_price * p.stock, p.reorder_level)
+                      for p in sorted(self.get_catalog(), key=lambda p: (p.category, p.name))]
+            logging.info(f"Fetched stock report with {len(report)} products")
+            return report
         except sqlite3.Error as e:
             logging.error(f"Error retrieving stock report: {str(e)}")
             raise
@@ -391,13 +1438,13 @@ class DatabaseHandler:
     def get_sales_for_export(self):
         """Get sales data for CSV export"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._reader() as conn:
+                cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT s.id, p.name, p.category, s.quantity, p.unit_price, s.total_price, s.sale_date
-                    FROM sales s
-                    JOIN products p ON s.product_id = p.id
-                    ORDER BY s.sale_date DESC
+                    SELECT id, COALESCE(product_name, 'Product #' || product_id), category, quantity,
+                           COALESCE(unit_price, total_price / quantity), total_price, sale_ts
+                    FROM sales
+                    ORDER BY sale_ts DESC
                 """)
                 sales = cursor.fetchall()
                 logging.info(f"Fetched {len(sales)} sales records for export")
@@ -409,16 +1456,26 @@ class DatabaseHandler:
     def get_yearly_product_sales(self, year):
         """Get yearly sales data by product"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                if self._archive_for(cursor, year) is not None:
+                    cursor.execute("""
+                        SELECT product_name, SUM(quantity) as total_qty, SUM(revenue) as total_revenue
+                        FROM sales_rollup
+                        WHERE year = ?
+                        GROUP BY product_name
+                        ORDER BY total_revenue DESC
+                    """, (str(year),))
+                    sales = cursor.fetchall()
+                    logging.info(f"Fetched {len(sales)} archived yearly product sales records for {year}")
+                    return sales
                 cursor.execute("""
-                    SELECT p.name, SUM(s.quantity) as total_qty, SUM(s.total_price) as total_revenue
-                    FROM sales s
-                    JOIN products p ON s.product_id = p.id
-                    WHERE strftime('%Y', s.sale_date) = ?
-                    GROUP BY p.name
+                    SELECT product_name, SUM(quantity) as total_qty, SUM(total_price) as total_revenue
+                    FROM sales
+                    WHERE sale_ts >= ? AND sale_ts < ?
+                    GROUP BY product_name
                     ORDER BY total_revenue DESC
-                """, (str(year),))
+                """, period_bounds(year))
                 sales = cursor.fetchall()
                 logging.info(f"Fetched {len(sales)} yearly product sales records for {year}")
                 return sales
@@ -426,19 +1483,49 @@ class DatabaseHandler:
             logging.error(f"Error retrieving yearly product sales for {year}: {str(e)}")
             raise
 
+    def get_sales_years(self):
+        """Years that have sales, archived years included, oldest first"""
+        try:
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT year FROM archives")
+                years = {int(row[0]) for row in cursor.fetchall()}
+                cursor.execute("""
+                    SELECT CAST(strftime('%Y', MIN(sale_ts), 'unixepoch') AS INTEGER),
+                           CAST(strftime('%Y', MAX(sale_ts), 'unixepoch') AS INTEGER)
+                    FROM sales
+                """)
+                first, last = cursor.fetchone()
+                if first is not None:
+                    years.update(range(first, last + 1))
+                return sorted(years)
+        except sqlite3.Error as e:
+            logging.error(f"Error retrieving sales years: {str(e)}")
+            raise
+
     def get_yearly_sales(self, year):
         """Get yearly sales report with category breakdown"""
         try:
-            with self.conn:
-                cursor = self.conn.cursor()
+            with self._reader() as conn:
+                cursor = conn.cursor()
+                if self._archive_for(cursor, year) is not None:
+                    cursor.execute("""
+                        SELECT product_name, category, SUM(quantity) as total_qty, SUM(revenue) as total_amount
+                        FROM sales_rollup
+                        WHERE year = ?
+                        GROUP BY product_name, category
+                        ORDER BY category, total_amount DESC
+                    """, (str(year),))
+                    sales = cursor.fetchall()
+                    logging.info(f"Fetched {len(sales)} archived yearly sales records for {year}")
+                    return sales
                 cursor.execute("""
-                    SELECT p.name, p.category, SUM(s.quantity) as total_qty, SUM(s.total_price) as total_amount
-                    FROM sales s
-                    JOIN products p ON s.product_id = p.id
-                    WHERE strftime('%Y', s.sale_date) = ?
-                    GROUP BY p.name, p.category
-                    ORDER BY p.category, total_amount DESC
-                """, (str(year),))
+                    SELECT product_name, category, SUM(quantity) as total_qty, SUM(total_price) as total_amount
+                    FROM sales
+                    WHERE sale_ts >= ? AND sale_ts < ?
+                    GROUP BY product_name, category
+                    ORDER BY category, total_amount DESC
+                """, period_bounds(year))
                 sales = cursor.fetchall()
                 logging.info(f"Fetched {len(sales)} yearly sales records for {year}")
                 return sales
@@ -446,10 +1533,17 @@ class DatabaseHandler:
             logging.error(f"Error retrieving yearly sales for {year}: {str(e)}")
             raise
 
+    def close(self):
+        """Close the writer connection and the read pool"""
+        if self.read_pool is not None:
+            self.read_pool.close()
+        if self.conn is not None:
+            self.conn.close()
+
     def __del__(self):
         """Clean up database connection"""
         try:
-            self.conn.close()
+            self.close()
             logging.info("Database connection closed")
         except Exception as e:
             logging.error(f"Error closing database connection: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,173 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import logging
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class CallStats:
+    """Timings for one instrumented method"""
+
+    SAMPLES = 512
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        # Percentiles come from the most recent calls only
+        self.samples = deque(maxlen=self.SAMPLES)
+
+    def record(self, elapsed, rows, failed):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.samples.append(elapsed)
+        if rows is not None:
+            self.rows += rows
+        if failed:
+            self.errors += 1
+
+    def snapshot(self):
+        samples = sorted(self.samples)
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        return {
+            "name": self.name,
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total * 1000, 2),
+            "avg_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(percentile(0.50) * 1000, 3),
+            "p95_ms": round(percentile(0.95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "rows": self.rows,
+        }
+
+
+class Instrumentation:
+    """Per-method call counts and timings for the database layer and the tab refreshes
+
+    Methods are wrapped on the class, so every caller (including Tk button
+    commands bound at construction time) goes through the timer. Times are
+    inclusive: a refresh that calls three queries is charged for all three,
+    and each query is also charged on its own line.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        # Import and first-window timings, filled in once the app is up
+        self.startup = {}
+        # Main-thread stall counts and the latest stall, kept up to date by the stall watchdog
+        self.stalls = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        # Calls currently running, per thread: {thread id: [(name, start), ...]}
+        self._active = {}
+
+    def instrument_class(self, cls, label, prefix=None, exclude=()):
+        """Wrap the plain public methods of cls (or only those starting with prefix)"""
+        wrapped = 0
+        for attr, func in list(vars(cls).items()):
+            if attr.startswith('_') or attr in exclude or not inspect.isfunction(func):
+                continue
+            if prefix and not attr.startswith(prefix):
+                continue
+            if getattr(func, '_instrumented', False):
+                continue
+            setattr(cls, attr, self.wrap(func, f"{label}.{attr}"))
+            wrapped += 1
+        logging.info(f"Instrumented {wrapped} methods of {cls.__name__}")
+        return cls
+
+    def wrap(self, func, name):
+        """Return func timed under name"""
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            stack = self._active.setdefault(threading.get_ident(), [])
+            started = time.perf_counter()
+            stack.append((name, started))
+            result = None
+            failed = True
+            try:
+                result = func(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - started
+                stack.pop()
+                rows = len(result) if isinstance(result, (list, tuple, dict)) else None
+                self.record(name, elapsed, rows, failed)
+
+        timed._instrumented = True
+        return timed
+
+    def record(self, name, elapsed, rows=None, failed=False):
+        """Add one call to the stats for name"""
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = CallStats(name)
+            stats.record(elapsed, rows, failed)
+
+    def snapshot(self):
+        """All stats as dicts, most expensive first"""
+        with self._lock:
+            rows = [stats.snapshot() for stats in self._stats.values()]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def in_flight(self):
+        """Outermost call running on each thread: [(thread name, method, seconds so far)]"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        now = time.perf_counter()
+        running = []
+        for ident, stack in list(self._active.items()):
+            outermost = stack[:1]
+            if outermost:
+                name, started = outermost[0]
+                running.append((names.get(ident, str(ident)), name, now - started))
+        return running
+
+    def stack_of(self, ident):
+        """Calls running on one thread, outermost first: [(method, seconds so far)]"""
+        now = time.perf_counter()
+        return [(name, now - started) for name, started in list(self._active.get(ident, ()))]
+
+    def reset(self):
+        """Forget all recorded calls"""
+        with self._lock:
+            self._stats.clear()
+        self.started = time.time()
+        logging.info("Diagnostics counters reset")
+
+    def dump(self, path):
+        """Write the current stats to a JSON file (replaced atomically)"""
+        data = {
+            "generated_at": datetime.now().isoformat(timespec='seconds'),
+            "since": datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            "pid": os.getpid(),
+            "startup": self.startup,
+            "stalls": self.stalls,
+            "in_flight": [{"thread": thread, "name": name, "seconds": round(seconds, 3)}
+                          for thread, name, seconds in self.in_flight()],
+            "methods": self.snapshot(),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, path)
+        return data
@@ -0,0 +1,116 @@
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+from tkinter import messagebox
+from datetime import datetime
+from gui_utils import create_card_frame
+import logging
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class DiagnosticsManager:
+    """Hidden tab (Ctrl+Shift+D) showing what each query and tab refresh has cost"""
+
+    REFRESH_INTERVAL_MS = 2000
+
+    def __init__(self, app, parent, db):
+        self.app = app
+        self.db = db
+        self.diagnostics = app.diagnostics
+        self.refresh_job = None
+        self.diagnostics_frame = ttk.Frame(parent, padding=10)
+        self.create_diagnostics_tab()
+
+    def create_diagnostics_tab(self):
+        """Create the stats table and controls"""
+        header_frame = ttk.Frame(self.diagnostics_frame)
+        header_frame.pack(fill='x', pady=(0, 10))
+
+        ttk.Label(header_frame, text="Diagnostics", font=("Helvetica", 24, "bold"),
+                  foreground="#007bff").pack(side='left')
+        self.summary_label = ttk.Label(header_frame, text="", font=("Helvetica", 11), foreground="#6c757d")
+        self.summary_label.pack(side='left', padx=20)
+
+        ttk.Button(header_frame, text="Reset", bootstyle="outline-danger",
+                   command=self.reset_counters).pack(side='right')
+        ttk.Button(header_frame, text="Save JSON", bootstyle="outline-primary",
+                   command=self.save_json).pack(side='right', padx=(0, 10))
+
+        stats_card = create_card_frame(self.diagnostics_frame, "⏱ Calls (inclusive time, most expensive first)")
+        stats_card.pack(fill='both', expand=True)
+
+        tree_frame = ttk.Frame(stats_card)
+        tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
+
+        columns = ('Method', 'Calls', 'Errors', 'Total ms', 'Avg ms', 'p50 ms', 'p95 ms', 'Max ms', 'Rows')
+        self.stats_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=18)
+        for col in columns:
+            self.stats_tree.heading(col, text=col, anchor='center')
+            self.stats_tree.column(col, width=260 if col == 'Method' else 80,
+                                   anchor='w' if col == 'Method' else 'e')
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.stats_tree.yview)
+        self.stats_tree.configure(yscrollcommand=scrollbar.set)
+        self.stats_tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        self.in_flight_label = ttk.Label(self.diagnostics_frame, text="", font=("Helvetica", 10),
+                                         foreground="#6c757d", justify='left')
+        self.in_flight_label.pack(fill='x', pady=(10, 0))
+
+    def start(self):
+        """Update the table every few seconds while the tab is shown"""
+        self.stop()
+        self.update_stats()
+
+    def stop(self):
+        if self.refresh_job:
+            self.diagnostics_frame.after_cancel(self.refresh_job)
+            self.refresh_job = None
+
+    def update_stats(self):
+        """Redraw the table from the current counters"""
+        if not self.diagnostics_frame.winfo_exists():
+            return
+        rows = self.diagnostics.snapshot()
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        for row in rows:
+            self.stats_tree.insert('', 'end', values=(
+                row['name'], row['count'], row['errors'], f"{row['total_ms']:.1f}", f"{row['avg_ms']:.2f}",
+                f"{row['p50_ms']:.2f}", f"{row['p95_ms']:.2f}", f"{row['max_ms']:.1f}", row['rows']))
+
+        calls = sum(row['count'] for row in rows)
+        since = datetime.fromtimestamp(self.diagnostics.started).strftime('%Y-%m-%d %H:%M')
+        stalls = self.diagnostics.stalls
+        stall_text = (f", {stalls['count']} stalls ({stalls['total_ms'] / 1000:.1f}s total, "
+                      f"longest {stalls['longest_ms']:.0f} ms)") if stalls else ", no stalls"
+        self.summary_label.config(text=f"{calls} calls since {since}{stall_text}")
+
+        running = [f"{thread}: {name} ({seconds:.2f}s)"
+                   for thread, name, seconds in self.diagnostics.in_flight()]
+        text = "Running: " + ("; ".join(running) if running else "nothing")
+        if stalls:
+            last = stalls['last']
+            where = f" in {last['db_call']['name']}" if last['db_call'] else ""
+            text += f"\nLast stall: {last['seconds']:.2f}s at {last['started_at']} on {last['tab']}{where}"
+        self.in_flight_label.config(text=text)
+
+        if self.diagnostics_frame.winfo_manager():
+            # Still packed, i.e. the tab is showing
+            self.refresh_job = self.diagnostics_frame.after(self.REFRESH_INTERVAL_MS, self.update_stats)
+        else:
+            self.refresh_job = None
+
+    def reset_counters(self):
+        self.diagnostics.reset()
+        self.update_stats()
+
+    def save_json(self):
+        """Write the stats file now instead of waiting for the periodic dump"""
+        try:
+            self.app.dump_diagnostics()
+            messagebox.showinfo("Diagnostics", f"Saved to {self.app.DIAGNOSTICS_FILE}")
+        except OSError as e:
+            logging.error(f"Error saving diagnostics: {str(e)}")
+            messagebox.showerror("Error", f"Could not save diagnostics: {str(e)}")
@@ -4,6 +4,7 @@ from ttkbootstrap.constants import *
 from tkinter import messagebox
 from datetime import datetime
 from gui_utils import create_labeled_entry, create_button_frame, create_card_frame
+from view_models import stock_rows
 import logging
 
 # Configure logging
@@ -42,8 +43,9 @@ class InventoryManager:
         
         # Get quick stats
         try:
-            total_products = len(self.db.get_products())
-            low_stock_count = len([p for p in self.db.get_products() if p[3] < 10])
+            catalog = self.db.get_catalog()
+            total_products = len(catalog)
+            low_stock_count = sum(1 for p in catalog if p.stock < p.reorder_level)
             
             stats_text = f"Total Products: {total_products} | Low Stock Alerts: {low_stock_count}"
             stats_label = ttk.Label(stats_frame, text=stats_text, 
@@ -144,7 +146,11 @@ class InventoryManager:
         
         clear_btn = ttk.Button(button_frame, text="🗑️ Clear Form", 
                               bootstyle="outline-secondary", command=self.clear_form)
-        clear_btn.pack(fill='x')
+        clear_btn.pack(fill='x', pady=(0, 10))
+
+        stock_take_btn = ttk.Button(button_frame, text="📋 Stock Take",
+                                   bootstyle="outline-primary", command=self.open_stock_take)
+        stock_take_btn.pack(fill='x')
 
         # Right column - Stock overview
         right_column = ttk.Frame(main_container)
@@ -162,7 +168,7 @@ class InventoryManager:
         
         self.filter_var = tk.StringVar()
         filter_combo = ttk.Combobox(filter_frame, textvariable=self.filter_var, 
-                                   values=["All", "Low Stock (<10)", "Out of Stock", "Normal Stock"], 
+                                   values=["All", "Low Stock", "Out of Stock", "Normal Stock"], 
                                    state='readonly', width=15)
         filter_combo.pack(side='left', padx=(0, 10))
         filter_combo.set("All")
@@ -244,9 +250,9 @@ class InventoryManager:
         product_display = self.inv_product_var.get()
         product_id = self.product_map.get(product_display)
         if product_id:
-            result = self.db.get_product_by_id(product_id)
-            if result:
-                price, stock = result
+            product = self.db.get_catalog_product(product_id)
+            if product:
+                stock = product.stock
                 self.current_stock_var.set(f"{stock} units")
                 logging.info(f"Selected product: {product_display}, Current stock: {stock}")
 
@@ -277,8 +283,7 @@ class InventoryManager:
     def refresh_product_list(self):
         """Refresh the product dropdown"""
         try:
-            products = self.db.get_products()
-            self.product_map = {f"{p[1]} (Stock: {p[3]})": p[0] for p in products}
+            self.product_map = {f"{p.name} (Stock: {p.stock})": p.id for p in self.db.get_catalog()}
             product_names = list(self.product_map.keys())
             self.inv_product_combo['values'] = product_names
             logging.info("Inventory product dropdown refreshed")
@@ -307,14 +312,14 @@ class InventoryManager:
         
         product_display = self.inv_product_var.get()
         product_id = self.product_map.get(product_display)
-        result = self.db.get_product_by_id(product_id)
+        product = self.db.get_catalog_product(product_id)
         
-        if not result:
+        if not product:
             messagebox.showerror("Error", "Product not found")
             logging.error(f"Stock update failed: Product not found for display {product_display}")
             return
         
-        current_stock = result[1]
+        current_stock = product.stock
         new_stock = current_stock + qty_change
         
         if new_stock < 0:
@@ -323,7 +328,8 @@ class InventoryManager:
             return
         
         try:
-            self.db.update_stock(product_id, qty_change, self.inv_note_var.get() if self.inv_note_var.get() != "Enter note (optional)" else "")
+            note = self.inv_note_var.get() if self.inv_note_var.get() != "Enter note (optional)" else ""
+            self.db.update_stock(product_id, qty_change, note)
             messagebox.showinfo("Success", f"Stock updated. New stock: {new_stock}")
             logging.info(f"Stock updated: Product ID {product_id}, Change {qty_change}, New stock {new_stock}")
             self.inv_qty_var.set("")
@@ -338,10 +344,30 @@ class InventoryManager:
                 self.app.inventory_details_manager.refresh_history()
             if hasattr(self.app, 'reports_manager'):
                 self.app.reports_manager.refresh_reports()
+            if hasattr(self.app.dashboard_manager, 'apply_stock_change'):
+                self.app.dashboard_manager.apply_stock_change(product_id, qty_change, note)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to update stock: {str(e)}")
             logging.error(f"Stock update error: {str(e)}")
 
+    def open_stock_take(self):
+        """Open the stock-take grid for counting the whole catalog"""
+        StockTakeWindow(self.inventory_frame, self.app, self.db, self.on_stock_take_committed)
+
+    def on_stock_take_committed(self, changes, note):
+        """Refresh views after a stock-take has been written"""
+        self.refresh_current_stocks()
+        self.refresh_product_list()
+        if hasattr(self.app, 'products_manager'):
+            self.app.products_manager.refresh_products_display()
+        if hasattr(self.app, 'inventory_details_manager'):
+            self.app.inventory_details_manager.refresh_history()
+        if hasattr(self.app, 'reports_manager'):
+            self.app.reports_manager.refresh_reports()
+        if hasattr(self.app.dashboard_manager, 'apply_stock_change'):
+            for product_id, qty_change in changes:
+                self.app.dashboard_manager.apply_stock_change(product_id, qty_change, note)
+
     def refresh_current_stocks(self):
         """Refresh current stock display with filtering and search"""
         try:
@@ -354,46 +380,161 @@ class InventoryManager:
             if search_term == "Search products...":
                 search_term = ""
             
-            for row in self.db.get_current_stocks():
-                product_id, name, category, stock = row
-                
-                # Apply search filter
-                if search_term and search_term.lower() not in name.lower():
-                    continue
-                
-                # Determine status and apply filter
-                if stock == 0:
-                    status = "Out of Stock"
-                    status_color = "danger"
-                elif stock < 10:
-                    status = "Low Stock"
-                    status_color = "warning"
-                else:
-                    status = "Normal"
-                    status_color = "success"
-                
-                # Apply status filter
-                if filter_type == "Low Stock (<10)" and stock >= 10:
-                    continue
-                elif filter_type == "Out of Stock" and stock > 0:
-                    continue
-                elif filter_type == "Normal Stock" and stock < 10:
-                    continue
-                
-                # Insert item with color coding
-                item_id = self.stock_tree.insert("", "end", values=(
-                    product_id, name, category, stock, status
-                ))
-                
-                # Apply color coding based on stock level
-                if stock == 0:
-                    self.stock_tree.set(item_id, "Status", "🔴 Out of Stock")
-                elif stock < 10:
-                    self.stock_tree.set(item_id, "Status", "🟡 Low Stock")
-                else:
-                    self.stock_tree.set(item_id, "Status", "🟢 Normal")
-                    
+            for values in stock_rows(self.db.get_catalog(), search_term, filter_type):
+                self.stock_tree.insert("", "end", values=values)
+
             logging.info("Current stocks display refreshed with filters")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to refresh stocks: {str(e)}")
-            logging.error(f"Error refreshing current stocks: {str(e)}")
\ No newline at end of file
+            logging.error(f"Error refreshing current stocks: {str(e)}")
+
+
+class StockTakeWindow:
+    """Grid for entering counted quantities of every product and committing them together"""
+
+    def __init__(self, parent, app, db, on_committed):
+        self.app = app
+        self.db = db
+        self.on_committed = on_committed
+        self.rows = []
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Stock Take")
+        self.window.geometry("760x600")
+
+        top_frame = ttk.Frame(self.window, padding=10)
+        top_frame.pack(fill='x')
+        ttk.Label(top_frame, text="Stock Take", font=("Helvetica", 18, "bold"),
+                 foreground="#007bff").pack(side='left')
+        self.summary_var = tk.StringVar(value="Enter counted quantities")
+        ttk.Label(top_frame, textvariable=self.summary_var, font=("Helvetica", 10),
+                 foreground="#6c757d").pack(side='right')
+
+        # Scrollable grid of products
+        grid_container = ttk.Frame(self.window, padding=(10, 0))
+        grid_container.pack(fill='both', expand=True)
+        canvas = tk.Canvas(grid_container, highlightthickness=0)
+        scrollbar = ttk.Scrollbar(grid_container, orient='vertical', command=canvas.yview)
+        self.grid_frame = ttk.Frame(canvas)
+        self.grid_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        canvas.create_window((0, 0), window=self.grid_frame, anchor="nw")
+        canvas.configure(yscrollcommand=scrollbar.set)
+        canvas.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+
+        for col, heading in enumerate(("Product", "Category", "System", "Counted", "Variance")):
+            ttk.Label(self.grid_frame, text=heading, font=("Helvetica", 11, "bold")).grid(
+                row=0, column=col, padx=8, pady=(0, 6), sticky='w')
+
+        bottom_frame = ttk.Frame(self.window, padding=10)
+        bottom_frame.pack(fill='x')
+        ttk.Label(bottom_frame, text="Note:", font=("Helvetica", 11)).pack(side='left', padx=(0, 5))
+        self.note_var = tk.StringVar(value=f"Stock take {datetime.now().strftime('%Y-%m-%d')}")
+        ttk.Entry(bottom_frame, textvariable=self.note_var, width=30).pack(side='left')
+        ttk.Button(bottom_frame, text="✅ Commit Counts", bootstyle="success",
+                  command=self.commit).pack(side='right')
+        ttk.Button(bottom_frame, text="Cancel", bootstyle="outline-secondary",
+                  command=self.window.destroy).pack(side='right', padx=(0, 10))
+
+        self.load_products()
+        logging.info("Stock take window opened")
+
+    def expected_stock(self, product_id, stock):
+        """Stock the shelf should hold, counting sales still waiting in the journal"""
+        journal = getattr(self.app, 'sale_journal', None)
+        return stock - journal.pending_quantity(product_id) if journal else stock
+
+    def load_products(self):
+        """Build one grid row per product"""
+        try:
+            catalog = self.db.get_catalog()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load products: {str(e)}", parent=self.window)
+            logging.error(f"Error loading stock take products: {str(e)}")
+            return
+
+        for index, product in enumerate(catalog, 1):
+            product_id, name, category = product.id, product.name, product.category
+            expected = self.expected_stock(product_id, product.stock)
+            counted_var = tk.StringVar()
+            variance_label = ttk.Label(self.grid_frame, text="", width=8)
+            ttk.Label(self.grid_frame, text=name).grid(row=index, column=0, padx=8, pady=2, sticky='w')
+            ttk.Label(self.grid_frame, text=category).grid(row=index, column=1, padx=8, pady=2, sticky='w')
+            ttk.Label(self.grid_frame, text=str(expected)).grid(row=index, column=2, padx=8, pady=2, sticky='e')
+            entry = ttk.Entry(self.grid_frame, textvariable=counted_var, width=10)
+            entry.grid(row=index, column=3, padx=8, pady=2)
+            variance_label.grid(row=index, column=4, padx=8, pady=2, sticky='e')
+            row = {"product_id": product_id, "name": name, "expected": expected,
+                   "counted_var": counted_var, "variance_label": variance_label}
+            counted_var.trace_add('write', lambda *args, row=row: self.update_variance(row))
+            self.rows.append(row)
+
+    def parse_count(self, row):
+        """Counted quantity for a row, None when left blank; raises ValueError if invalid"""
+        text = row["counted_var"].get().strip()
+        if not text:
+            return None
+        count = int(text)
+        if count < 0:
+            raise ValueError("negative count")
+        return count
+
+    def update_variance(self, row):
+        """Show counted minus expected as the user types"""
+        try:
+            count = self.parse_count(row)
+        except ValueError:
+            row["variance_label"].configure(text="?", foreground="#dc3545")
+            return
+        if count is None:
+            row["variance_label"].configure(text="")
+        else:
+            variance = count - row["expected"]
+            color = "#28a745" if variance > 0 else "#dc3545" if variance < 0 else "#6c757d"
+            row["variance_label"].configure(text=f"{variance:+d}", foreground=color)
+        self.update_summary()
+
+    def update_summary(self):
+        """Count filled-in rows and rows that differ from the system stock"""
+        counted = changed = 0
+        for row in self.rows:
+            try:
+                count = self.parse_count(row)
+            except ValueError:
+                continue
+            if count is not None:
+                counted += 1
+                changed += count != row["expected"]
+        self.summary_var.set(f"{counted} counted, {changed} with variance")
+
+    def commit(self):
+        """Write every variance as one bulk stock update"""
+        changes = []
+        for row in self.rows:
+            try:
+                count = self.parse_count(row)
+            except ValueError:
+                messagebox.showerror("Error", f"Invalid count for {row['name']}", parent=self.window)
+                return
+            if count is not None and count != row["expected"]:
+                changes.append((row["product_id"], count - row["expected"]))
+
+        if not changes:
+            messagebox.showinfo("Stock Take", "No variances to record", parent=self.window)
+            return
+        if not messagebox.askyesno("Confirm", f"Record stock variances for {len(changes)} products?",
+                                   parent=self.window):
+            return
+
+        note = self.note_var.get().strip() or "Stock take"
+        try:
+            self.db.update_stock_bulk(changes, note)
+            logging.info(f"Stock take committed: {len(changes)} variances")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save stock take: {str(e)}", parent=self.window)
+            logging.error(f"Stock take error: {str(e)}")
+            return
+
+        self.window.destroy()
+        self.on_committed(changes, note)
+        messagebox.showinfo("Success", f"Stock take saved: {len(changes)} products adjusted")
@@ -3,8 +3,10 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.tooltip import ToolTip
 from tkinter import messagebox
-from datetime import datetime, timedelta
+from datetime import datetime
 from gui_utils import create_card_frame
+from timeutils import now_ts, local_day_start
+from view_models import inventory_log_rows, history_rows
 import logging
 
 # Configure logging
@@ -45,14 +47,8 @@ class InventoryDetailsManager:
         try:
             logs = self.db.get_inventory_logs()
             total_adjustments = len(logs)
-            recent_adjustments = 0
-            for log in logs:
-                if len(log) >= 5:
-                    try:
-                        if (datetime.now() - datetime.fromisoformat(log[4])).days <= 7:
-                            recent_adjustments += 1
-                    except:
-                        continue
+            week_ago = now_ts() - 7 * 86400
+            recent_adjustments = sum(1 for log in logs if log[4] >= week_ago)
             
             stats_text = f"Total Adjustments: {total_adjustments} | This Week: {recent_adjustments}"
             stats_label = ttk.Label(stats_frame, text=stats_text, 
@@ -82,14 +78,8 @@ class InventoryDetailsManager:
         
         try:
             logs = self.db.get_inventory_logs()
-            recent_count = 0
-            for log in logs:
-                if len(log) >= 5:
-                    try:
-                        if (datetime.now() - datetime.fromisoformat(log[4])).days <= 7:
-                            recent_count += 1
-                    except:
-                        continue
+            week_ago = now_ts() - 7 * 86400
+            recent_count = sum(1 for log in logs if log[4] >= week_ago)
             recent_label = ttk.Label(recent_card, text=str(recent_count), 
                                     font=("Helvetica", 20, "bold"), foreground="#17a2b8")
             recent_label.pack(anchor='w')
@@ -108,14 +98,8 @@ class InventoryDetailsManager:
         
         try:
             logs = self.db.get_inventory_logs()
-            today_count = 0
-            for log in logs:
-                if len(log) >= 5:
-                    try:
-                        if datetime.fromisoformat(log[4]).date() == datetime.now().date():
-                            today_count += 1
-                    except:
-                        continue
+            today_start = local_day_start()
+            today_count = sum(1 for log in logs if log[4] >= today_start)
             today_label = ttk.Label(value_card, text=str(today_count), 
                                    font=("Helvetica", 20, "bold"), foreground="#28a745")
             today_label.pack(anchor='w')
@@ -191,6 +175,11 @@ class InventoryDetailsManager:
                                 bootstyle="outline-primary", command=self.refresh_history)
         refresh_btn.pack(side='right')
 
+        # Full per-product history opens in its own window
+        product_history_btn = ttk.Button(filter_frame, text="📜 Product History", 
+                                        bootstyle="outline-info", command=self.open_product_history)
+        product_history_btn.pack(side='right', padx=(0, 10))
+
         # Enhanced treeview with modern styling
         tree_frame = ttk.Frame(history_card)
         tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
@@ -257,33 +246,9 @@ class InventoryDetailsManager:
             
             filtered_logs = self.apply_filters(logs)
             
-            for row in filtered_logs:
-                try:
-                    # Ensure we have exactly 5 elements: id, product_name, change_qty, note, log_date
-                    if len(row) != 5:
-                        logging.error(f"Invalid row structure: {row}, Length: {len(row)}")
-                        continue
-                        
-                    log_id, product_name, change_qty, note, log_date = row
-                    
-                    # Format datetime
-                    try:
-                        dt = datetime.fromisoformat(log_date)
-                        formatted_datetime = dt.strftime("%Y-%m-%d %H:%M:%S")
-                    except:
-                        formatted_datetime = str(log_date)
-                    
-                    # Color code quantity changes
-                    change_display = f"+{change_qty}" if change_qty > 0 else str(change_qty)
-                    
-                    self.history_tree.insert("", "end", values=(
-                        log_id, product_name, change_display, note or "No note", 
-                        formatted_datetime
-                    ))
-                except Exception as row_error:
-                    logging.error(f"Error processing row {row}: {str(row_error)}")
-                    continue
-            
+            for values in inventory_log_rows(filtered_logs):
+                self.history_tree.insert("", "end", values=values)
+
             logging.info("Enhanced inventory history display refreshed")
         except Exception as e:
             error_msg = f"Failed to refresh inventory history: {str(e)}"
@@ -303,31 +268,11 @@ class InventoryDetailsManager:
             # Apply time filter
             time_filter = getattr(self, 'time_filter_var', None)
             if time_filter and time_filter.get() != "All Time":
+                # Start of the period as epoch seconds, so each row is one integer comparison
                 now = datetime.now()
-                temp_filtered = []
-                
-                for log in filtered_logs:
-                    try:
-                        if len(log) < 5:
-                            continue
-                        log_date = log[4]  # This is the 5th element (index 4)
-                        
-                        if time_filter.get() == "Today":
-                            if datetime.fromisoformat(log_date).date() == now.date():
-                                temp_filtered.append(log)
-                        elif time_filter.get() == "This Week":
-                            week_start = now - timedelta(days=now.weekday())
-                            if datetime.fromisoformat(log_date) >= week_start:
-                                temp_filtered.append(log)
-                        elif time_filter.get() == "This Month":
-                            month_start = now.replace(day=1)
-                            if datetime.fromisoformat(log_date) >= month_start:
-                                temp_filtered.append(log)
-                    except Exception as e:
-                        logging.error(f"Error filtering log by time {log}: {str(e)}")
-                        continue
-                        
-                filtered_logs = temp_filtered
+                days_back = {"Today": 0, "This Week": now.weekday(), "This Month": now.day - 1}
+                period_start = local_day_start(days_back.get(time_filter.get(), 0))
+                filtered_logs = [log for log in filtered_logs if len(log) >= 5 and log[4] >= period_start]
             
             # Apply search filter
             search_var = getattr(self, 'search_var', None)
@@ -377,7 +322,109 @@ class InventoryDetailsManager:
             entry.insert(0, placeholder)
             entry.configure(foreground='gray')
 
+    def open_product_history(self):
+        """Open the paged product history window"""
+        ProductHistoryWindow(self.inv_details_frame.winfo_toplevel(), self.db)
+
     def refresh_product_list(self):
         """Refresh product list (called by other tabs if needed)"""
         logging.info("Inventory details product list refresh called (no-op)")
-        # No product dropdown in this tab, but included for consistency
\ No newline at end of file
+        # No product dropdown in this tab, but included for consistency
+
+
+class ProductHistoryWindow:
+    """Sales and adjustments for one product, streamed into the table a page at a time"""
+    PAGE_SIZE = 200
+
+    def __init__(self, parent, db):
+        self.db = db
+        self.cursor = None
+        self.product_id = None
+        self.loaded = 0
+        self.exhausted = True
+        self.page_pending = False
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Product History")
+        self.window.geometry("800x550")
+
+        top_frame = ttk.Frame(self.window, padding=10)
+        top_frame.pack(fill='x')
+
+        ttk.Label(top_frame, text="Product:", font=("Helvetica", 11)).pack(side='left', padx=(0, 5))
+        self.product_var = tk.StringVar()
+        self.product_combo = ttk.Combobox(top_frame, textvariable=self.product_var, 
+                                         state='readonly', width=35)
+        self.product_combo.pack(side='left')
+        self.product_combo.bind('<<ComboboxSelected>>', self.on_product_select)
+
+        self.status_label = ttk.Label(top_frame, text="Select a product", 
+                                     font=("Helvetica", 10), foreground="#6c757d")
+        self.status_label.pack(side='right')
+
+        tree_frame = ttk.Frame(self.window, padding=(10, 0, 10, 10))
+        tree_frame.pack(fill='both', expand=True)
+
+        columns = ('Type', 'Change', 'Details', 'Date & Time')
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show='headings', selectmode='browse')
+        column_configs = {
+            'Type': {'width': 100, 'anchor': 'center'},
+            'Change': {'width': 80, 'anchor': 'center'},
+            'Details': {'width': 350, 'anchor': 'w'},
+            'Date & Time': {'width': 160, 'anchor': 'center'}
+        }
+        for col, config in column_configs.items():
+            self.tree.heading(col, text=col, anchor='center')
+            self.tree.column(col, width=config['width'], anchor=config['anchor'])
+
+        self.v_scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.v_scrollbar.grid(row=0, column=1, sticky='ns')
+        tree_frame.grid_rowconfigure(0, weight=1)
+        tree_frame.grid_columnconfigure(0, weight=1)
+
+        self.load_more_btn = ttk.Button(self.window, text="Load More", bootstyle="outline-primary",
+                                       command=self.load_next_page, state='disabled')
+        self.load_more_btn.pack(pady=(0, 10))
+
+        self.product_map = {p.name: p.id for p in self.db.get_catalog()}
+        self.product_combo['values'] = list(self.product_map.keys())
+        logging.info("Product history window opened")
+
+    def on_product_select(self, event=None):
+        """Start streaming history for the chosen product"""
+        self.product_id = self.product_map.get(self.product_var.get())
+        self.cursor = None
+        self.loaded = 0
+        self.exhausted = False
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        self.load_next_page()
+
+    def on_scroll(self, first, last):
+        """Keep the scrollbar in sync and fetch the next page when the bottom comes into view"""
+        self.v_scrollbar.set(first, last)
+        if float(last) >= 1.0 and not self.exhausted and self.loaded and not self.page_pending:
+            self.page_pending = True
+            self.window.after_idle(self.load_next_page)
+
+    def load_next_page(self):
+        """Fetch and append the next page of history"""
+        self.page_pending = False
+        if self.product_id is None or self.exhausted:
+            return
+        try:
+            rows, self.cursor = self.db.get_product_history_page(
+                self.product_id, limit=self.PAGE_SIZE, cursor=self.cursor)
+            for values in history_rows(rows):
+                self.tree.insert("", "end", values=values)
+            self.loaded += len(rows)
+            self.exhausted = self.cursor is None
+            self.load_more_btn.configure(state='disabled' if self.exhausted else 'normal')
+            suffix = "" if self.exhausted else "+"
+            self.status_label.configure(text=f"{self.loaded}{suffix} records")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load product history: {str(e)}", parent=self.window)
+            logging.error(f"Error loading product history page: {str(e)}")
+            self.exhausted = True
@@ -0,0 +1,88 @@
+"""Deferred imports for heavy modules
+
+lazy_import() returns a stand-in that imports the real module the first
+time one of its attributes is used, so openpyxl, numpy and bcrypt cost
+nothing at startup and are paid for by the first export, forecast or
+login that needs them. is_available() answers "is it installed?" from
+the import system's finders without importing anything.
+
+Each real import is timed; the timings are kept in import_times() and
+passed to the listener set with set_import_listener (the diagnostics
+recorder in the app).
+"""
+import importlib
+import importlib.util
+import threading
+import time
+import logging
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+_modules = {}
+_import_times = {}
+_import_listener = None
+_lock = threading.RLock()
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with _lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    self._module = importlib.import_module(self._name)
+                    _record(self._name, time.perf_counter() - started)
+                module = self._module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    """The LazyModule for name (one per name, shared by every caller); nothing is imported until it is used"""
+    with _lock:
+        module = _modules.get(name)
+        if module is None:
+            module = _modules[name] = LazyModule(name)
+        return module
+
+
+def is_available(name):
+    """True if the module is installed, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def set_import_listener(callback):
+    """Call callback(name, seconds) for every deferred import from now on"""
+    global _import_listener
+    _import_listener = callback
+
+
+def import_times():
+    """Deferred imports done so far: {module name: seconds}"""
+    with _lock:
+        return dict(_import_times)
+
+
+def _record(name, elapsed):
+    _import_times[name] = elapsed
+    logging.info(f"Deferred import of {name} took {elapsed * 1000:.0f} ms")
+    if _import_listener is not None:
+        _import_listener(f"import.{name}", elapsed)
@@ -2,14 +2,17 @@ import tkinter as tk
 from tkinter import messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-import bcrypt
 import logging
+from lazy_imports import lazy_import
 from gui_utils import (create_labeled_entry, create_button_frame, create_card_frame, 
                       DesignSystem, create_modern_button, configure_styles)
 
 # Configure logging
 logging.basicConfig(filename='pos.log', level=logging.INFO, 
                     format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Loaded when the first password is checked, not while the login window is being drawn
+bcrypt = lazy_import('bcrypt')
 # Safe ToolTip import
 try:
     from ttkbootstrap.tooltip import ToolTip
@@ -1,10 +1,29 @@
+import time
+
+# Startup clock: everything imported below counts against the import budget
+STARTUP_STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from login import LoginManager
 from database import DatabaseHandler
+from sale_journal import SaleJournal
+from sync import ChangeFeedMonitor
+from backup import BackupService
+from diagnostics import Instrumentation
+from stall_watchdog import StallWatchdog
+from analytics import SalesCube, NUMPY_AVAILABLE
+from lazy_imports import lazy_import, set_import_listener, import_times
 import logging
+import os
+import threading
+
+# Process pools and openpyxl; loaded by the first multi-period export
+report_jobs = lazy_import('report_jobs')
+
+IMPORTS_FINISHED = time.perf_counter()
 
 # Configure logging
 logging.basicConfig(filename='pos.log', level=logging.INFO,
@@ -12,12 +31,49 @@ logging.basicConfig(filename='pos.log', level=logging.INFO,
 
 
 class BlockCementPOS:
+    MAINTENANCE_INTERVAL_MS = 60 * 60 * 1000
+    JOURNAL_POLL_INTERVAL_MS = 500
+    DIAGNOSTICS_INTERVAL_MS = 5 * 60 * 1000
+    DIAGNOSTICS_FILE = 'diagnostics.json'
+    # Module imports before the first window; more than this is logged as a warning
+    STARTUP_IMPORT_BUDGET_S = 0.5
+    # Main-loop heartbeats later than this are logged as stalls
+    STALL_THRESHOLD_S = 0.5
+
     def __init__(self, root):
         self.root = root
         self.root.title("Block & Cement POS")
         self.root.geometry("1200x700")
+
+        # Time every query; tab refreshes are instrumented as their classes are imported
+        self.diagnostics = Instrumentation()
+        self.diagnostics.instrument_class(DatabaseHandler, 'db', exclude=('close',))
+        set_import_listener(self.diagnostics.record)
         self.db = DatabaseHandler('blocks_cement.db')
 
+        # Sales are journaled to disk first and applied to the database in the background
+        self.sale_journal = SaleJournal(self.db, os.path.splitext(self.db.db_name)[0] + '.journal')
+        self.sale_journal.start()
+
+        # Nightly online backup on a background thread
+        self.backup_service = BackupService(self.db)
+        self.backup_service.start()
+
+        # Multi-period exports run on worker processes, created on first use
+        self.report_jobs = None
+        self.journal_applied_seen = 0
+        self.journal_poll_job = None
+        self.maintenance_job = None
+        self.maintenance_thread = None
+        self.diagnostics_job = None
+        self.change_feed = None
+        self.active_tab = None
+        # Shared by the reports and the dashboard forecast; built on first use
+        self.sales_cube = None
+        # The dashboard builds and tops up the cube on its refresh thread
+        self.sales_cube_lock = threading.Lock()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Theme setup
         self.style = ttk.Style(theme='flatly')  # flatly, darkly, litera
         self.style.configure("TButton", font=("Helvetica", 12))
@@ -32,12 +88,19 @@ class BlockCementPOS:
         self.products_manager = None
         self.reports_manager = None
         self.inventory_details_manager = None
+        self.diagnostics_manager = None
 
         self.create_login_screen()
+        self.record_startup()
+
+        # Watch the Tk loop for freezes; stalls go to stalls.jsonl and the diagnostics
+        self.stall_watchdog = StallWatchdog(self, threshold_s=self.STALL_THRESHOLD_S)
+        self.stall_watchdog.start()
 
     def create_login_screen(self):
         """Create login screen"""
         self.login_manager = LoginManager(self.root, self.db, self.create_main_app)
+        self.active_tab = "Login"
         logging.info("Login screen initialized")
 
     def create_main_app(self):
@@ -82,18 +145,116 @@ class BlockCementPOS:
 
         # Initialize managers with error handling
         self.initialize_managers()
+        self.root.bind_all('<Control-Shift-D>', lambda event: self.show_diagnostics())
 
         # Safe hiding of tabs and show default
         self.hide_all_tabs()
         self.show_dashboard()  # Default tab
+        self.run_maintenance()
+        self.poll_sale_journal()
+        self.diagnostics_job = self.root.after(self.DIAGNOSTICS_INTERVAL_MS, self.write_diagnostics)
+
+        # Pick up sales and stock changes made at the other terminals
+        self.change_feed = ChangeFeedMonitor(self, self.db)
+        self.change_feed.start()
         logging.info("Main application interface initialized")
 
+    def run_maintenance(self):
+        """Start the hourly housekeeping on a background thread and schedule the next run
+
+        The first compaction replays the whole sales and inventory history
+        while holding the writer lock, so it must not run on the Tk thread.
+        """
+        if self.maintenance_thread is None or not self.maintenance_thread.is_alive():
+            self.maintenance_thread = threading.Thread(target=self.maintain_database, name="maintenance",
+                                                       daemon=True)
+            self.maintenance_thread.start()
+        self.maintenance_job = self.root.after(self.MAINTENANCE_INTERVAL_MS, self.run_maintenance)
+
+    def maintain_database(self):
+        """Housekeeping: roll finished days into the stock snapshot ledger and trim the change feed"""
+        try:
+            self.db.compact_stock_snapshots()
+        except Exception as e:
+            logging.error(f"Stock snapshot compaction failed: {str(e)}")
+        try:
+            self.db.prune_change_log()
+        except Exception as e:
+            logging.error(f"Change log pruning failed: {str(e)}")
+
+    def dump_diagnostics(self):
+        """Write the current query and refresh timings to the diagnostics file"""
+        self.diagnostics.dump(self.DIAGNOSTICS_FILE)
+
+    def write_diagnostics(self):
+        """Periodic diagnostics dump, so a busy day's costs survive a crash"""
+        try:
+            self.dump_diagnostics()
+        except OSError as e:
+            logging.error(f"Diagnostics dump failed: {str(e)}")
+        self.diagnostics_job = self.root.after(self.DIAGNOSTICS_INTERVAL_MS, self.write_diagnostics)
+
+    def record_startup(self):
+        """Put import and first-window times in the diagnostics and check the import budget"""
+        imports = IMPORTS_FINISHED - STARTUP_STARTED
+        ready = time.perf_counter() - STARTUP_STARTED
+        self.diagnostics.record('startup.imports', imports)
+        self.diagnostics.record('startup.login_window', ready)
+        self.diagnostics.startup = {
+            "imports_ms": round(imports * 1000, 1),
+            "import_budget_ms": round(self.STARTUP_IMPORT_BUDGET_S * 1000, 1),
+            "login_window_ms": round(ready * 1000, 1),
+            # Deferred modules that were needed before the login window (ideally none)
+            "deferred_imports_ms": {name: round(seconds * 1000, 1) for name, seconds in import_times().items()},
+        }
+        message = (f"Startup imports took {imports * 1000:.0f} ms (budget {self.STARTUP_IMPORT_BUDGET_S * 1000:.0f} ms), "
+                   f"login window ready after {ready * 1000:.0f} ms")
+        if imports > self.STARTUP_IMPORT_BUDGET_S:
+            logging.warning(message)
+        else:
+            logging.info(message)
+
+    def get_report_jobs(self):
+        """The export worker pool, created on the first multi-period export"""
+        if self.report_jobs is None:
+            self.report_jobs = report_jobs.ReportJobs(self.db.db_name)
+        return self.report_jobs
+
+    def get_sales_cube(self):
+        """The sales cube, loaded on first use and topped up with new sales after that
+
+        Returns None when NumPy is missing or the cube can't be built.
+        """
+        if not NUMPY_AVAILABLE:
+            return None
+        with self.sales_cube_lock:
+            try:
+                if self.sales_cube is None:
+                    self.sales_cube = SalesCube(self.db)
+                self.sales_cube.refresh()
+                return self.sales_cube
+            except Exception as e:
+                logging.error(f"Sales cube unavailable: {str(e)}")
+                self.sales_cube = None
+                return None
+
+    def poll_sale_journal(self):
+        """Refresh database-backed views once the journal applier has written new sales"""
+        applied = self.sale_journal.applied_count
+        if applied != self.journal_applied_seen:
+            self.journal_applied_seen = applied
+            self.refresh_all_managers(include_dashboard=False)
+        if hasattr(self.dashboard_manager, 'on_journal_progress'):
+            self.dashboard_manager.on_journal_progress()
+        self.journal_poll_job = self.root.after(self.JOURNAL_POLL_INTERVAL_MS, self.poll_sale_journal)
+
     def initialize_managers(self):
         """Initialize all manager classes with error handling"""
         try:
             # Try to import and create managers
             try:
                 from dashboard import DashboardManager
+                self.diagnostics.instrument_class(DashboardManager, 'dashboard', prefix='refresh_')
                 self.dashboard_manager = DashboardManager(self, self.content_frame, self.db)
                 logging.info("Dashboard manager initialized")
             except ImportError:
@@ -102,6 +263,7 @@ class BlockCementPOS:
 
             try:
                 from sales import SalesManager
+                self.diagnostics.instrument_class(SalesManager, 'sales', prefix='refresh_')
                 self.sales_manager = SalesManager(self, self.content_frame, self.db)
                 logging.info("Sales manager initialized")
             except ImportError:
@@ -110,6 +272,7 @@ class BlockCementPOS:
 
             try:
                 from inventory import InventoryManager
+                self.diagnostics.instrument_class(InventoryManager, 'inventory', prefix='refresh_')
                 self.inventory_manager = InventoryManager(self, self.content_frame, self.db)
                 logging.info("Inventory manager initialized")
             except ImportError:
@@ -118,6 +281,7 @@ class BlockCementPOS:
 
             try:
                 from products import ProductsManager
+                self.diagnostics.instrument_class(ProductsManager, 'products', prefix='refresh_')
                 self.products_manager = ProductsManager(self, self.content_frame, self.db)
                 logging.info("Products manager initialized")
             except ImportError:
@@ -126,6 +290,7 @@ class BlockCementPOS:
 
             try:
                 from reports import ReportsManager
+                self.diagnostics.instrument_class(ReportsManager, 'reports', prefix='refresh_')
                 self.reports_manager = ReportsManager(self, self.content_frame, self.db)
                 logging.info("Reports manager initialized")
             except ImportError:
@@ -134,6 +299,7 @@ class BlockCementPOS:
 
             try:
                 from inventory_details import InventoryDetailsManager
+                self.diagnostics.instrument_class(InventoryDetailsManager, 'inventory_details', prefix='refresh_')
                 self.inventory_details_manager = InventoryDetailsManager(self, self.content_frame, self.db)
                 logging.info("Inventory details manager initialized")
             except ImportError:
@@ -171,6 +337,7 @@ class BlockCementPOS:
             (self.products_manager, "products_frame"),
             (self.reports_manager, "reports_frame"),
             (self.inventory_details_manager, "inv_details_frame"),
+            (self.diagnostics_manager, "diagnostics_frame"),
         ]
 
         for manager, frame_attr in managers_and_frames:
@@ -187,9 +354,9 @@ class BlockCementPOS:
                 frame.pack(fill='both', expand=True)
             self.set_active_button("Dashboard")
             self.animate_tab()
-            # Refresh dashboard data when shown
-            if hasattr(self.dashboard_manager, 'refresh_dashboard'):
-                self.dashboard_manager.refresh_dashboard()
+            # Dashboard keeps itself current from sale/stock deltas; only reconcile if flagged
+            if hasattr(self.dashboard_manager, 'refresh_if_stale'):
+                self.dashboard_manager.refresh_if_stale()
             logging.info("Dashboard tab displayed")
         else:
             messagebox.showerror("Error", "Dashboard module not available")
@@ -254,6 +421,22 @@ class BlockCementPOS:
         else:
             messagebox.showerror("Error", "Inventory Details module not available")
 
+    def show_diagnostics(self):
+        """Hidden tab with query and refresh timings (Ctrl+Shift+D)"""
+        try:
+            if self.diagnostics_manager is None:
+                from diagnostics_view import DiagnosticsManager
+                self.diagnostics_manager = DiagnosticsManager(self, self.content_frame, self.db)
+            self.hide_all_tabs()
+            self.diagnostics_manager.diagnostics_frame.pack(fill='both', expand=True)
+            self.set_active_button(None)
+            self.active_tab = "Diagnostics"
+            self.diagnostics_manager.start()
+            logging.info("Diagnostics tab displayed")
+        except Exception as e:
+            logging.error(f"Error showing diagnostics: {str(e)}")
+            messagebox.showerror("Error", f"Diagnostics not available: {str(e)}")
+
     def animate_tab(self):
         """Smooth fade-in effect for the whole window"""
         try:
@@ -276,13 +459,19 @@ class BlockCementPOS:
 
     def set_active_button(self, active_text):
         """Highlight the active sidebar button"""
+        self.active_tab = active_text
         for text, btn in self.nav_buttons.items():
             btn.configure(bootstyle="primary-outline" if text != active_text else "primary")
 
-    def refresh_all_managers(self):
+    def on_sale_completed(self, product_id, quantity, total_price):
+        """Push a completed sale to the dashboard as a delta; other tabs refresh once it is applied"""
+        if hasattr(self.dashboard_manager, 'apply_sale'):
+            self.dashboard_manager.apply_sale(product_id, quantity, total_price)
+
+    def refresh_all_managers(self, include_dashboard=True):
         """Refresh all manager displays after data changes"""
         try:
-            if hasattr(self.dashboard_manager, 'refresh_dashboard'):
+            if include_dashboard and hasattr(self.dashboard_manager, 'refresh_dashboard'):
                 self.dashboard_manager.refresh_dashboard()
             if hasattr(self.inventory_manager, 'refresh_current_stocks'):
                 self.inventory_manager.refresh_current_stocks()
@@ -302,10 +491,41 @@ class BlockCementPOS:
 
     def logout(self):
         """Log out and return to login screen"""
+        for job in (self.maintenance_job, self.journal_poll_job, self.diagnostics_job):
+            if job:
+                self.root.after_cancel(job)
+        self.maintenance_job = None
+        self.journal_poll_job = None
+        self.diagnostics_job = None
+        self.root.unbind_all('<Control-Shift-D>')
+        if self.diagnostics_manager:
+            self.diagnostics_manager.stop()
+            self.diagnostics_manager = None
+        if self.change_feed:
+            self.change_feed.stop()
+            self.change_feed = None
+        if hasattr(self.dashboard_manager, 'stop'):
+            self.dashboard_manager.stop()
+        self.dashboard_manager = None
         self.main_frame.destroy()
         self.create_login_screen()
         logging.info("User logged out")
 
+    def on_close(self):
+        """Give the journal applier a chance to drain before exiting"""
+        self.stall_watchdog.stop()
+        if hasattr(self.dashboard_manager, 'stop'):
+            self.dashboard_manager.stop()
+        self.backup_service.stop()
+        self.sale_journal.stop()
+        if self.report_jobs is not None:
+            self.report_jobs.shutdown()
+        try:
+            self.dump_diagnostics()
+        except OSError as e:
+            logging.error(f"Diagnostics dump failed: {str(e)}")
+        self.root.destroy()
+
 
 if __name__ == "__main__":
     root = ttk.Window()
@@ -0,0 +1,224 @@
+"""Batch admin tasks for the Block & Cement POS database
+
+    python -m pos_admin import-stock delivery.csv --note "Truck from Dangote"
+    python -m pos_admin update-prices prices.json --dry-run
+    python -m pos_admin archive-year 2024
+
+Input files are CSV (with a header row) or JSON (a list of objects). Each
+row names a product by `product_id` or `name`; stock rows need `quantity`
+and price rows need `unit_price`. The whole file is validated first and
+then applied in a single transaction, so a bad row changes nothing.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sqlite3
+import sys
+import logging
+from database import DatabaseHandler
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class ValidationError(Exception):
+    """One or more input rows are invalid"""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid row(s)")
+        self.errors = errors
+
+
+def load_rows(path):
+    """Read a CSV or JSON input file into a list of dicts"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if ext == '.json':
+            rows = json.load(f)
+            if isinstance(rows, dict):
+                rows = rows.get('items', [])
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise ValidationError(["JSON input must be a list of objects"])
+            return rows
+        return list(csv.DictReader(f))
+
+
+def resolve_products(db, rows, value_field, parse_value):
+    """Validate rows against the catalog and return {product_id: value} plus the product rows
+
+    Repeated products are summed for stock and rejected for prices (see parse_value).
+    """
+    products = {row[0]: row for row in db.get_all_products()}
+    by_name = {row[1].strip().lower(): row[0] for row in products.values()}
+    values = {}
+    errors = []
+    for line_no, row in enumerate(rows, 2):
+        row = {str(k).strip().lower(): v for k, v in row.items() if k is not None}
+        product_id = None
+        raw_id = str(row.get('product_id') or '').strip()
+        raw_name = str(row.get('name') or '').strip()
+        if raw_id:
+            try:
+                product_id = int(raw_id)
+            except ValueError:
+                errors.append(f"row {line_no}: product_id '{raw_id}' is not a number")
+                continue
+            if product_id not in products:
+                errors.append(f"row {line_no}: no product with id {product_id}")
+                continue
+        elif raw_name:
+            product_id = by_name.get(raw_name.lower())
+            if product_id is None:
+                errors.append(f"row {line_no}: no product named '{raw_name}'")
+                continue
+        else:
+            errors.append(f"row {line_no}: needs product_id or name")
+            continue
+
+        try:
+            value = parse_value(row.get(value_field))
+        except ValueError as e:
+            errors.append(f"row {line_no}: {value_field} {e}")
+            continue
+        if product_id in values and value_field == 'unit_price':
+            errors.append(f"row {line_no}: {products[product_id][1]} appears more than once")
+            continue
+        values[product_id] = values.get(product_id, 0) + value
+
+    if not rows:
+        errors.append("input file has no rows")
+    if errors:
+        raise ValidationError(errors)
+    return values, products
+
+
+def parse_quantity(raw):
+    """A positive whole number of units from a file cell"""
+    try:
+        value = int(str(raw).strip())
+    except ValueError:
+        raise ValueError(f"'{raw}' is not a whole number")
+    if value <= 0:
+        raise ValueError("must be greater than zero")
+    return value
+
+
+def parse_price(raw):
+    """A positive, finite unit price from a file cell, rounded to pesewas"""
+    try:
+        value = round(float(str(raw).strip()), 2)
+    except ValueError:
+        raise ValueError(f"'{raw}' is not a number")
+    if not math.isfinite(value):
+        raise ValueError(f"'{raw}' is not a finite number")
+    if value <= 0:
+        raise ValueError("must be greater than zero")
+    return value
+
+
+def import_stock(db, args):
+    """Receive stock for every row of the input file"""
+    quantities, products = resolve_products(db, load_rows(args.file), 'quantity', parse_quantity)
+    print(f"{'Product':<30} {'Stock':>8} {'Received':>9} {'New':>8}")
+    for product_id, qty in sorted(quantities.items(), key=lambda item: products[item[0]][1]):
+        stock = products[product_id][5]
+        print(f"{products[product_id][1]:<30} {stock:>8} {qty:>+9} {stock + qty:>8}")
+    print(f"\n{len(quantities)} products, {sum(quantities.values())} units received")
+    if args.dry_run:
+        print("Dry run: nothing written")
+        return
+    db.receive_stock_bulk(list(quantities.items()), args.note)
+    print("Stock updated")
+
+
+def update_prices(db, args):
+    """Set unit prices for every row of the input file"""
+    prices, products = resolve_products(db, load_rows(args.file), 'unit_price', parse_price)
+    changed = {product_id: price for product_id, price in prices.items() if price != products[product_id][4]}
+    print(f"{'Product':<30} {'Old':>10} {'New':>10}")
+    for product_id, price in sorted(changed.items(), key=lambda item: products[item[0]][1]):
+        print(f"{products[product_id][1]:<30} {products[product_id][4]:>10.2f} {price:>10.2f}")
+    print(f"\n{len(changed)} of {len(prices)} prices change")
+    if args.dry_run:
+        print("Dry run: nothing written")
+        return
+    if changed:
+        db.update_prices_bulk(list(changed.items()))
+    print("Prices updated")
+
+
+def archive_year(db, args):
+    """Move a closed year's sales and logs into its archive file"""
+    if args.dry_run:
+        print(f"Would archive {args.year} to {db.archive_path(args.year)}")
+        return
+    sales_moved, logs_moved = db.archive_year(args.year)
+    print(f"Archived {args.year}: {sales_moved} sales, {logs_moved} inventory logs -> {db.archive_path(args.year)}")
+
+
+def list_archives(db, args):
+    """Show archived years"""
+    archives = db.get_archives()
+    if not archives:
+        print("No archived years")
+    for year, path, sales_count, logs_count, archived_at in archives:
+        print(f"{year}  {sales_count:>7} sales  {logs_count:>6} logs  {archived_at}  {path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pos_admin", description="Batch admin tasks for the POS database")
+    parser.add_argument('--db', default='blocks_cement.db', help="SQLite database file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stock_parser = subparsers.add_parser('import-stock', help="Receive stock from a CSV/JSON file")
+    stock_parser.add_argument('file')
+    stock_parser.add_argument('--note', default="Bulk stock receipt", help="Note for the inventory log entries")
+    stock_parser.add_argument('--dry-run', action='store_true', help="Validate and show changes without writing")
+    stock_parser.set_defaults(handler=import_stock)
+
+    price_parser = subparsers.add_parser('update-prices', help="Update unit prices from a CSV/JSON file")
+    price_parser.add_argument('file')
+    price_parser.add_argument('--dry-run', action='store_true', help="Validate and show changes without writing")
+    price_parser.set_defaults(handler=update_prices)
+
+    archive_parser = subparsers.add_parser('archive-year', help="Move a closed year into archive/pos_archive_YEAR.db")
+    archive_parser.add_argument('year', type=int)
+    archive_parser.add_argument('--dry-run', action='store_true', help="Show what would happen without writing")
+    archive_parser.set_defaults(handler=archive_year)
+
+    list_parser = subparsers.add_parser('list-archives', help="List archived years")
+    list_parser.set_defaults(handler=list_archives)
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+
+    db = DatabaseHandler(args.db)
+    try:
+        args.handler(db, args)
+        return 0
+    except ValidationError as e:
+        print("Input rejected, nothing written:", file=sys.stderr)
+        for error in e.errors:
+            print(f"  {error}", file=sys.stderr)
+        return 2
+    except (OSError, json.JSONDecodeError, csv.Error) as e:
+        # Before ValueError: JSONDecodeError is a subclass of it
+        print(f"Could not read {getattr(args, 'file', args.db)}: {e}", file=sys.stderr)
+        return 2
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    except sqlite3.Error as e:
+        print(f"Database error, nothing written: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
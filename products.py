@@ -3,6 +3,7 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from tkinter import messagebox
 from gui_utils import create_labeled_entry, create_button_frame, create_card_frame
+from view_models import product_rows
 import logging
 
 # Configure logging
@@ -43,8 +44,9 @@ class ProductsManager:
         stats_frame.pack(side='right')
         
         try:
-            total_products = len(self.db.get_all_products())
-            total_value = sum(p[4] * p[5] for p in self.db.get_all_products())  # price * stock
+            catalog = self.db.get_catalog()
+            total_products = len(catalog)
+            total_value = sum(p.unit_price * p.stock for p in catalog)
             
             stats_text = f"Total Products: {total_products} | Inventory Value: GH₵{total_value:.2f}"
             stats_label = ttk.Label(stats_frame, text=stats_text, 
@@ -135,6 +137,31 @@ class ProductsManager:
         self.prod_price_entry.bind("<FocusIn>", lambda e: self.clear_placeholder(self.prod_price_entry, "Enter price"))
         self.prod_price_entry.bind("<FocusOut>", lambda e: self.set_placeholder(self.prod_price_entry, "Enter price"))
 
+        # Reorder level input
+        reorder_frame = ttk.Frame(form_card)
+        reorder_frame.pack(fill='x', pady=15)
+
+        ttk.Label(reorder_frame, text="Reorder Level", 
+                 font=("Helvetica", 12, "bold"), foreground="#495057").pack(anchor='w', pady=(0, 5))
+        self.prod_reorder_var = tk.StringVar()
+        self.prod_reorder_entry = ttk.Entry(reorder_frame, textvariable=self.prod_reorder_var, 
+                                           font=("Helvetica", 11), width=15)
+        self.prod_reorder_entry.pack(anchor='w')
+        self.prod_reorder_entry.insert(0, "Category default")
+        self.prod_reorder_entry.bind("<FocusIn>", lambda e: self.clear_placeholder(self.prod_reorder_entry, "Category default"))
+        self.prod_reorder_entry.bind("<FocusOut>", lambda e: self.set_placeholder(self.prod_reorder_entry, "Category default"))
+
+        # Product code input (scanned barcode or short SKU for fast sale entry)
+        code_frame = ttk.Frame(form_card)
+        code_frame.pack(fill='x', pady=15)
+
+        ttk.Label(code_frame, text="Product Code", 
+                 font=("Helvetica", 12, "bold"), foreground="#495057").pack(anchor='w', pady=(0, 5))
+        self.prod_code_var = tk.StringVar()
+        self.prod_code_entry = ttk.Entry(code_frame, textvariable=self.prod_code_var, 
+                                        font=("Helvetica", 11), width=15)
+        self.prod_code_entry.pack(anchor='w')
+
         # Action buttons with modern styling
         button_frame = ttk.Frame(form_card)
         button_frame.pack(fill='x', pady=20)
@@ -208,7 +235,7 @@ class ProductsManager:
         tree_frame = ttk.Frame(list_card)
         tree_frame.pack(fill='both', expand=True, padx=10, pady=10)
 
-        columns = ('ID', 'Name', 'Category', 'Type', 'Price', 'Stock', 'Value')
+        columns = ('ID', 'Name', 'Category', 'Type', 'Price', 'Stock', 'Reorder', 'Value', 'Code')
         self.products_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', 
                                          height=20, selectmode='extended')
         
@@ -220,7 +247,9 @@ class ProductsManager:
             'Type': {'width': 120, 'anchor': 'w'},
             'Price': {'width': 80, 'anchor': 'e'},
             'Stock': {'width': 60, 'anchor': 'center'},
-            'Value': {'width': 100, 'anchor': 'e'}
+            'Reorder': {'width': 70, 'anchor': 'center'},
+            'Value': {'width': 100, 'anchor': 'e'},
+            'Code': {'width': 70, 'anchor': 'center'}
         }
         
         for col, config in column_configs.items():
@@ -280,6 +309,16 @@ class ProductsManager:
         except Exception as e:
             logging.error(f"Products card animation error: {str(e)}")
 
+    def parse_reorder_level(self):
+        """Read the reorder level field; None means use the category default or keep the current value"""
+        value = self.prod_reorder_var.get().strip()
+        if not value or value == "Category default":
+            return None
+        level = int(value)
+        if level < 0:
+            raise ValueError("Reorder level must not be negative")
+        return level
+
     def add_product(self):
         """Add a new product"""
         if not all([self.prod_name_var.get(), self.prod_category_var.get(), 
@@ -305,11 +344,18 @@ class ProductsManager:
             messagebox.showerror("Error", "Invalid price")
             logging.warning(f"Add product failed: Non-numeric price {self.prod_price_var.get()}")
             return
+
+        try:
+            reorder_level = self.parse_reorder_level()
+        except ValueError:
+            messagebox.showerror("Error", "Reorder level must be a whole number of 0 or more")
+            logging.warning(f"Add product failed: Invalid reorder level {self.prod_reorder_var.get()}")
+            return
         
         try:
             self.db.add_product(
                 self.prod_name_var.get(), self.prod_category_var.get(), 
-                self.prod_type_var.get(), price
+                self.prod_type_var.get(), price, reorder_level, self.prod_code_var.get()
             )
             messagebox.showinfo("Success", "Product added successfully")
             logging.info(f"Product added: {self.prod_name_var.get()}")
@@ -322,6 +368,8 @@ class ProductsManager:
                 self.app.inventory_details_manager.refresh_product_list()
             if hasattr(self.app, 'reports_manager'):
                 self.app.reports_manager.refresh_reports()
+            if hasattr(self.app.dashboard_manager, 'mark_stale'):
+                self.app.dashboard_manager.mark_stale()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to add product: {str(e)}")
             logging.error(f"Add product error: {str(e)}")
@@ -356,11 +404,19 @@ class ProductsManager:
             messagebox.showerror("Error", "Invalid price")
             logging.warning(f"Update product failed: Non-numeric price {self.prod_price_var.get()}")
             return
+
+        try:
+            reorder_level = self.parse_reorder_level()
+        except ValueError:
+            messagebox.showerror("Error", "Reorder level must be a whole number of 0 or more")
+            logging.warning(f"Update product failed: Invalid reorder level {self.prod_reorder_var.get()}")
+            return
         
         try:
             self.db.update_product(
                 self.selected_product_id, self.prod_name_var.get(), 
-                self.prod_category_var.get(), self.prod_type_var.get(), price
+                self.prod_category_var.get(), self.prod_type_var.get(), price, reorder_level,
+                self.prod_code_var.get()
             )
             messagebox.showinfo("Success", "Product updated successfully")
             logging.info(f"Product updated: ID {self.selected_product_id}")
@@ -373,6 +429,8 @@ class ProductsManager:
                 self.app.inventory_details_manager.refresh_product_list()
             if hasattr(self.app, 'reports_manager'):
                 self.app.reports_manager.refresh_reports()
+            if hasattr(self.app.dashboard_manager, 'mark_stale'):
+                self.app.dashboard_manager.mark_stale()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to update product: {str(e)}")
             logging.error(f"Update product error: {str(e)}")
@@ -398,6 +456,8 @@ class ProductsManager:
                     self.app.inventory_details_manager.refresh_product_list()
                 if hasattr(self.app, 'reports_manager'):
                     self.app.reports_manager.refresh_reports()
+                if hasattr(self.app.dashboard_manager, 'mark_stale'):
+                    self.app.dashboard_manager.mark_stale()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to delete product: {str(e)}")
                 logging.error(f"Delete product error: {str(e)}")
@@ -408,9 +468,12 @@ class ProductsManager:
         self.prod_category_var.set("")
         self.prod_type_var.set("")
         self.prod_price_var.set("")
+        self.prod_reorder_var.set("")
+        self.prod_code_var.set("")
         self.set_placeholder(self.prod_name_entry, "Enter product name")
         self.set_placeholder(self.prod_type_entry, "Enter product type")
         self.set_placeholder(self.prod_price_entry, "Enter price")
+        self.set_placeholder(self.prod_reorder_entry, "Category default")
         self.selected_product_id = None
         self.selection_label.configure(text="No product selected")
         logging.info("Product form cleared")
@@ -427,9 +490,12 @@ class ProductsManager:
         self.prod_category_var.set(values[2])
         self.prod_type_var.set(values[3])
         self.prod_price_var.set(values[4].replace("GH₵", ""))
+        self.prod_reorder_var.set(values[6])
+        self.prod_code_var.set(values[8])
         self.clear_placeholder(self.prod_name_entry, "Enter product name")
         self.clear_placeholder(self.prod_type_entry, "Enter product type")
         self.clear_placeholder(self.prod_price_entry, "Enter price")
+        self.clear_placeholder(self.prod_reorder_entry, "Category default")
         logging.info(f"Selected product for edit: ID {self.selected_product_id}")
 
     def on_product_select(self, event=None):
@@ -461,23 +527,8 @@ class ProductsManager:
             if search_term == "Search products...":
                 search_term = ""
             
-            for row in self.db.get_all_products():
-                product_id, name, category, ptype, price, stock = row
-                
-                # Apply search filter
-                if search_term and search_term.lower() not in name.lower():
-                    continue
-                
-                # Apply category filter
-                if filter_category != "All" and category != filter_category:
-                    continue
-                
-                # Calculate total value
-                total_value = price * stock
-                
-                self.products_tree.insert("", "end", values=(
-                    product_id, name, category, ptype, f"GH₵{price:.2f}", stock, f"GH₵{total_value:.2f}"
-                ))
+            for values in product_rows(self.db.get_catalog(), search_term, filter_category):
+                self.products_tree.insert("", "end", values=values)
             logging.info("Products display refreshed with filters")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to refresh products: {str(e)}")
@@ -0,0 +1,170 @@
+import csv
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+import logging
+from database import DatabaseHandler
+from lazy_imports import lazy_import, is_available
+
+# Excel export functionality; openpyxl is only imported when a workbook is written
+openpyxl = lazy_import('openpyxl')
+EXCEL_AVAILABLE = is_available('openpyxl')
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+SheetData = namedtuple('SheetData', ['name', 'title', 'headers', 'rows', 'widths'])
+
+SALES_HEADERS = ['Product', 'Category', 'Quantity Sold', 'Total (GH₵)']
+
+# Read-only handler opened once per worker process by the pool initializer
+_worker_db = None
+
+
+def _init_worker(db_name):
+    global _worker_db
+    _worker_db = DatabaseHandler(db_name, read_pool_size=1, read_only=True)
+
+
+def column_widths(headers, rows):
+    """Column widths sized to the longest value, as the single-sheet exports do"""
+    widths = [len(str(header)) for header in headers]
+    for row in rows:
+        for col, value in enumerate(row):
+            widths[col] = max(widths[col], len(str(value)))
+    return [min(width + 2, 50) for width in widths]
+
+
+def build_sales_sheet(kind, period):
+    """Worker job: one year's or one month's sales by product, ready to be written out"""
+    if kind == 'yearly':
+        sales = _worker_db.get_yearly_sales(period)
+        title = f"Yearly Sales Report - {period}"
+    else:
+        sales = _worker_db.get_monthly_sales(period)
+        title = f"Monthly Sales Report - {period}"
+    rows = [[name, category, qty, round(amount or 0.0, 2)] for name, category, qty, amount in sales]
+    return SheetData(period, title, SALES_HEADERS, rows, column_widths(SALES_HEADERS, rows))
+
+
+def write_workbook(sheets, filename):
+    """Stream finished sheets into one workbook (write-only mode: rows go straight to disk)"""
+    WriteOnlyCell, get_column_letter = openpyxl.cell.WriteOnlyCell, openpyxl.utils.get_column_letter
+    Font, PatternFill, Alignment = openpyxl.styles.Font, openpyxl.styles.PatternFill, openpyxl.styles.Alignment
+    wb = openpyxl.Workbook(write_only=True)
+    title_font = Font(bold=True, size=16)
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    centered = Alignment(horizontal="center", vertical="center")
+    generated = f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+
+    for sheet in sheets:
+        ws = wb.create_sheet(sheet.name)
+        last_column = get_column_letter(len(sheet.headers))
+        for col, width in enumerate(sheet.widths, 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        ws.merged_cells.add(f"A1:{last_column}1")
+        ws.merged_cells.add(f"A2:{last_column}2")
+
+        def styled(value, **styles):
+            cell = WriteOnlyCell(ws, value=value)
+            for name, style in styles.items():
+                setattr(cell, name, style)
+            return cell
+
+        ws.append([styled(sheet.title, font=title_font, alignment=centered)])
+        ws.append([styled(generated, alignment=centered)])
+        ws.append([])
+        ws.append([styled(header, font=header_font, fill=header_fill, alignment=centered)
+                   for header in sheet.headers])
+        money_col = len(sheet.headers) - 1
+        for row in sheet.rows:
+            values = list(row)
+            values[money_col] = styled(values[money_col], number_format='"GH₵"#,##0.00')
+            ws.append(values)
+    wb.save(filename)
+
+
+def write_csv(sheets, filename):
+    """All sheets in one CSV, with a Period column in front"""
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Period'] + SALES_HEADERS)
+        for sheet in sheets:
+            for row in sheet.rows:
+                writer.writerow([sheet.name] + row[:-1] + [f"{row[-1]:.2f}"])
+
+
+class ReportJobs:
+    """Multi-period exports built on a pool of worker processes
+
+    Each worker opens its own read-only connection and builds one period
+    (query, cleanup and column sizing), so a multi-year export uses every
+    core instead of one GIL-bound GUI process. openpyxl can't merge
+    worksheets across processes, so the finished sheets come back as plain
+    rows and a background thread in this process streams them into the
+    file in write-only mode; the GUI only waits on the returned future.
+    """
+
+    def __init__(self, db_name, max_workers=None):
+        self.db_name = db_name
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._pool = None
+        self._lock = threading.Lock()
+        self._merger = ThreadPoolExecutor(max_workers=1, thread_name_prefix='report-merge')
+
+    def _get_pool(self):
+        """Start the worker processes on first use"""
+        with self._lock:
+            if self._pool is None:
+                # Spawned, not forked: the GUI process holds Tk, SQLite connections and live threads
+                self._pool = ProcessPoolExecutor(self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker, initargs=(self.db_name,))
+                logging.info(f"Report worker pool started with {self.max_workers} processes")
+            return self._pool
+
+    def export_sales(self, years, filename, format_type='excel', per_month=True):
+        """Start exporting each year (and its months) as its own sheet
+
+        Returns a Future for (filename, sheet count).
+        """
+        return self._merger.submit(self._export_sales, [str(year) for year in years], filename,
+                                   format_type, per_month)
+
+    def _export_sales(self, years, filename, format_type, per_month):
+        started = time.perf_counter()
+        jobs = []
+        for year in years:
+            jobs.append(('yearly', year))
+            if per_month:
+                jobs.extend(('monthly', f"{year}-{month:02d}") for month in range(1, 13))
+        pool = self._get_pool()
+        futures = [pool.submit(build_sales_sheet, kind, period) for kind, period in jobs]
+        sheets = []
+        for (kind, _), future in zip(jobs, futures):
+            sheet = future.result()
+            # Months without sales are left out; every requested year keeps its summary sheet
+            if kind == 'yearly' or sheet.rows:
+                sheets.append(sheet)
+
+        if format_type == 'excel' and EXCEL_AVAILABLE:
+            write_workbook(sheets, filename)
+        else:
+            write_csv(sheets, filename)
+        logging.info(f"Exported {len(sheets)} sales sheets for {', '.join(years)} to {filename} "
+                     f"in {time.perf_counter() - started:.2f}s")
+        return filename, len(sheets)
+
+    def shutdown(self):
+        """Stop the worker processes without waiting for queued exports"""
+        self._merger.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
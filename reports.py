@@ -6,16 +6,14 @@ from datetime import datetime
 import csv
 import logging
 from gui_utils import create_button_frame, create_card_frame
+from timeutils import format_local
+from lazy_imports import lazy_import, is_available
 
-# Excel export functionality
-try:
-    import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment
-    from openpyxl.utils import get_column_letter
-    EXCEL_AVAILABLE = True
-except ImportError:
-    EXCEL_AVAILABLE = False
-    print("Warning: openpyxl not installed. Excel export will be disabled.")
+# Excel export functionality; openpyxl itself is only imported by the first Excel export
+openpyxl = lazy_import('openpyxl')
+EXCEL_AVAILABLE = is_available('openpyxl')
+if not EXCEL_AVAILABLE:
+    logging.warning("openpyxl not installed. Excel export will be disabled.")
 
 # Safe ToolTip import
 try:
@@ -33,6 +31,9 @@ logging.basicConfig(filename='pos.log', level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
 class ReportsManager:
+    # How often a running background export is checked for completion
+    EXPORT_POLL_MS = 200
+
     def __init__(self, app, parent, db):
         self.app = app
         self.db = db
@@ -194,6 +195,28 @@ class ReportsManager:
                                       bootstyle="outline-primary", command=lambda: self.choose_export_format(self.export_yearly_sales))
         export_yearly_btn.pack(side='right', padx=(5, 0))
 
+        # Sales Trends section (answered from the in-memory sales cube)
+        trends_section = ttk.Frame(custom_card)
+        trends_section.pack(fill='x', pady=10, padx=10)
+
+        ttk.Label(trends_section, text="Sales Trends",
+                 font=("Helvetica", 12, "bold"), foreground="#495057").pack(anchor='w', pady=(0, 5))
+
+        trend_options = ttk.Frame(trends_section)
+        trend_options.pack(fill='x', pady=(0, 5))
+        categories = sorted({p.category for p in self.db.get_catalog() if p.category})
+        self.trend_category_var = tk.StringVar(value="All Categories")
+        ttk.Combobox(trend_options, textvariable=self.trend_category_var, state='readonly', width=14,
+                     values=["All Categories"] + categories).pack(side='left', padx=(0, 5))
+        self.trend_freq_var = tk.StringVar(value="Weekly")
+        ttk.Combobox(trend_options, textvariable=self.trend_freq_var, state='readonly', width=8,
+                     values=["Weekly", "Monthly"]).pack(side='left')
+
+        ttk.Button(trends_section, text=" This Year vs Last", bootstyle="outline-success",
+                   command=self.show_year_comparison).pack(fill='x', pady=2)
+        ttk.Button(trends_section, text=" Top 10 This Year", bootstyle="outline-success",
+                   command=self.show_top_products).pack(fill='x', pady=2)
+
         # Export All section
         export_section = ttk.Frame(custom_card)
         export_section.pack(fill='x', pady=10, padx=10)
@@ -209,6 +232,10 @@ class ReportsManager:
                                    bootstyle="outline-warning", command=lambda: self.choose_export_format(self.export_inventory_adjustments))
         export_adj_btn.pack(fill='x', pady=2)
 
+        export_all_btn = ttk.Button(export_section, text=" Export All Years (by Month)",
+                                   bootstyle="outline-success", command=lambda: self.choose_export_format(self.export_all_sales))
+        export_all_btn.pack(fill='x', pady=2)
+
         # Right column - Report display
         right_column = ttk.Frame(main_container)
         right_column.grid(row=0, column=2, padx=(15, 0), sticky="nsew")
@@ -288,7 +315,8 @@ class ReportsManager:
             for item in self.report_tree.get_children():
                 self.report_tree.delete(item)
             
-            for row in self.db.get_daily_sales(date_str):
+            rows = self.get_sales_rows('daily', date_str)
+            for row in rows:
                 product_name, total_qty, total_amount = row
                 self.report_tree.insert("", "end", values=(
                     product_name, total_qty, f"GH₵{total_amount:.2f}"
@@ -296,9 +324,9 @@ class ReportsManager:
             self.report_card.title_label.configure(text=f"Daily Sales Report ({date_str})")
             
             # Calculate summary statistics
-            total_sales = len([row for row in self.db.get_daily_sales(date_str)])
-            total_revenue = sum(row[2] for row in self.db.get_daily_sales(date_str))
-            total_quantity = sum(row[1] for row in self.db.get_daily_sales(date_str))
+            total_sales = len(rows)
+            total_revenue = sum(row[2] for row in rows)
+            total_quantity = sum(row[1] for row in rows)
             
             self.summary_label.configure(text=f"Sales: {total_sales} | Revenue: GH₵{total_revenue:.2f} | Items Sold: {total_quantity}")
             logging.info(f"Daily sales report generated for {date_str}")
@@ -326,7 +354,8 @@ class ReportsManager:
             for item in self.report_tree.get_children():
                 self.report_tree.delete(item)
             
-            for row in self.db.get_monthly_sales(month_str):
+            rows = self.get_sales_rows('monthly', month_str)
+            for row in rows:
                 product_name, category, total_qty, total_amount = row
                 self.report_tree.insert("", "end", values=(
                     product_name, category, total_qty, f"GH₵{total_amount:.2f}"
@@ -334,9 +363,9 @@ class ReportsManager:
             self.report_card.title_label.configure(text=f"Monthly Sales Report ({month_str})")
             
             # Calculate summary statistics
-            total_sales = len([row for row in self.db.get_monthly_sales(month_str)])
-            total_revenue = sum(row[3] for row in self.db.get_monthly_sales(month_str))
-            total_quantity = sum(row[2] for row in self.db.get_monthly_sales(month_str))
+            total_sales = len(rows)
+            total_revenue = sum(row[3] for row in rows)
+            total_quantity = sum(row[2] for row in rows)
             
             self.summary_label.configure(text=f"Sales: {total_sales} | Revenue: GH₵{total_revenue:.2f} | Items Sold: {total_quantity}")
             logging.info(f"Monthly sales report generated for {month_str}")
@@ -359,11 +388,11 @@ class ReportsManager:
                 self.report_tree.delete(item)
             
             for row in self.db.get_stock_report():
-                name, category, ptype, unit_price, stock, stock_value = row
+                name, category, ptype, unit_price, stock, stock_value, reorder_level = row
                 item_id = self.report_tree.insert("", "end", values=(
                     name, category, ptype, f"GH₵{unit_price:.2f}", stock, f"GH₵{stock_value:.2f}"
                 ))
-                if (category == 'Block' and stock < 10) or (category == 'Cement' and stock < 5):
+                if stock < reorder_level:
                     self.report_tree.item(item_id, tags=('low_stock',))
             self.report_tree.tag_configure('low_stock', foreground='red')
             self.report_card.title_label.configure(text="Current Stock Report")
@@ -371,8 +400,7 @@ class ReportsManager:
             # Calculate summary statistics
             total_products = len([row for row in self.db.get_stock_report()])
             total_value = sum(row[5] for row in self.db.get_stock_report())
-            low_stock_items = len([row for row in self.db.get_stock_report() 
-                                 if (row[1] == 'Block' and row[4] < 10) or (row[1] == 'Cement' and row[4] < 5)])
+            low_stock_items = self.db.get_low_stock_count()
             
             self.summary_label.configure(text=f"Products: {total_products} | Total Value: GH₵{total_value:.2f} | Low Stock: {low_stock_items}")
             logging.info("Stock report generated")
@@ -393,8 +421,8 @@ class ReportsManager:
             
             total_adjustments = 0
             for row in self.db.get_inventory_logs():
-                log_id, product_name, change_qty, note, log_date = row
-                formatted_date = datetime.fromisoformat(log_date).strftime("%Y-%m-%d %H:%M:%S")
+                log_id, product_name, change_qty, note, log_ts = row
+                formatted_date = format_local(log_ts)
                 self.report_tree.insert("", "end", values=(
                     log_id, product_name, change_qty, note or "", formatted_date
                 ))
@@ -452,7 +480,8 @@ class ReportsManager:
             for item in self.report_tree.get_children():
                 self.report_tree.delete(item)
             
-            for row in self.db.get_yearly_sales(year_str):
+            rows = self.get_sales_rows('yearly', year_str)
+            for row in rows:
                 product_name, category, total_qty, total_amount = row
                 self.report_tree.insert("", "end", values=(
                     product_name, category, total_qty, f"GH₵{total_amount:.2f}"
@@ -460,9 +489,9 @@ class ReportsManager:
             self.report_card.title_label.configure(text=f"Yearly Sales Report ({year_str})")
             
             # Calculate summary statistics
-            total_sales = len([row for row in self.db.get_yearly_sales(year_str)])
-            total_revenue = sum(row[3] for row in self.db.get_yearly_sales(year_str))
-            total_quantity = sum(row[2] for row in self.db.get_yearly_sales(year_str))
+            total_sales = len(rows)
+            total_revenue = sum(row[3] for row in rows)
+            total_quantity = sum(row[2] for row in rows)
             
             self.summary_label.configure(text=f"Sales: {total_sales} | Revenue: GH₵{total_revenue:.2f} | Items Sold: {total_quantity}")
             logging.info(f"Yearly sales report generated for {year_str}")
@@ -470,6 +499,91 @@ class ReportsManager:
             messagebox.showerror("Error", f"Failed to generate yearly sales report: {str(e)}")
             logging.error(f"Yearly sales report error: {str(e)}")
 
+    def get_cube(self):
+        """The application's sales cube, or None when it can't be used (callers then use SQL)"""
+        if hasattr(self.app, 'get_sales_cube'):
+            return self.app.get_sales_cube()
+        return None
+
+    def get_sales_rows(self, kind, period):
+        """Daily/monthly/yearly report rows, from the cube when available"""
+        cube = self.get_cube()
+        if cube is not None:
+            return getattr(cube, f"{kind}_sales")(period)
+        return getattr(self.db, f"get_{kind}_sales")(period)
+
+    def get_trend_options(self):
+        """Selected category (None for all) and bucket size for the trend reports"""
+        category = self.trend_category_var.get()
+        freq = 'month' if self.trend_freq_var.get() == "Monthly" else 'week'
+        return (None if category == "All Categories" else category), freq
+
+    def show_year_comparison(self):
+        """This year against last year, week by week or month by month"""
+        try:
+            cube = self.get_cube()
+            if cube is None:
+                messagebox.showerror("Error", "Sales trends need NumPy installed")
+                return
+            category, freq = self.get_trend_options()
+            year = datetime.now().year
+            rows = cube.compare_years(year, year - 1, freq=freq, category=category)
+
+            self.report_tree['columns'] = ('Period', f'Qty {year}', f'Revenue {year} (GH₵)',
+                                           f'Qty {year - 1}', f'Revenue {year - 1} (GH₵)', 'Change')
+            for col in self.report_tree['columns']:
+                self.report_tree.heading(col, text=col)
+                self.report_tree.column(col, width=120)
+            for item in self.report_tree.get_children():
+                self.report_tree.delete(item)
+
+            for label, qty, revenue, last_qty, last_revenue in rows:
+                change = f"{(revenue - last_revenue) / last_revenue * 100:+.1f}%" if last_revenue else "—"
+                self.report_tree.insert("", "end", values=(
+                    label, qty, f"GH₵{revenue:.2f}", last_qty, f"GH₵{last_revenue:.2f}", change
+                ))
+
+            scope = category or "All Categories"
+            self.report_card.title_label.configure(text=f"Year Comparison ({scope}, {self.trend_freq_var.get()})")
+            total = sum(row[2] for row in rows)
+            last_total = sum(row[4] for row in rows)
+            self.summary_label.configure(text=f"{year}: GH₵{total:.2f} | {year - 1}: GH₵{last_total:.2f}")
+            logging.info(f"Year comparison report generated for {scope}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to generate year comparison: {str(e)}")
+            logging.error(f"Year comparison report error: {str(e)}")
+
+    def show_top_products(self):
+        """Best-selling products of the current year by revenue"""
+        try:
+            cube = self.get_cube()
+            if cube is None:
+                messagebox.showerror("Error", "Sales trends need NumPy installed")
+                return
+            category, _ = self.get_trend_options()
+            year = str(datetime.now().year)
+            rows = cube.top_products(year, 10, category=category)
+
+            self.report_tree['columns'] = ('Rank', 'Product', 'Category', 'Quantity Sold', 'Total (GH₵)')
+            for col in self.report_tree['columns']:
+                self.report_tree.heading(col, text=col)
+                self.report_tree.column(col, width=120)
+            for item in self.report_tree.get_children():
+                self.report_tree.delete(item)
+
+            for rank, (product_name, product_category, qty, revenue) in enumerate(rows, 1):
+                self.report_tree.insert("", "end", values=(
+                    rank, product_name, product_category, qty, f"GH₵{revenue:.2f}"
+                ))
+
+            scope = category or "All Categories"
+            self.report_card.title_label.configure(text=f"Top Products ({scope}, {year})")
+            self.summary_label.configure(text=f"Top {len(rows)} by revenue | Revenue: GH₵{sum(row[3] for row in rows):.2f}")
+            logging.info(f"Top products report generated for {scope}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to generate top products report: {str(e)}")
+            logging.error(f"Top products report error: {str(e)}")
+
     def export_daily_sales(self, format_type='csv'):
         """Export daily sales report to CSV or Excel"""
         try:
@@ -566,7 +680,7 @@ class ReportsManager:
             headers = ['Product', 'Category', 'Type', 'Unit Price (GH₵)', 'Stock', 'Stock Value (GH₵)']
             data = []
             for row in self.db.get_stock_report():
-                name, category, ptype, unit_price, stock, stock_value = row
+                name, category, ptype, unit_price, stock, stock_value, _ = row
                 if format_type == 'excel':
                     data.append([name, category, ptype, f"GH₵{unit_price:.2f}", stock, f"GH₵{stock_value:.2f}"])
                 else:
@@ -597,8 +711,8 @@ class ReportsManager:
             headers = ['ID', 'Product', 'Quantity Change', 'Note', 'Date']
             data = []
             for row in self.db.get_inventory_logs():
-                log_id, product_name, change_qty, note, log_date = row
-                formatted_date = datetime.fromisoformat(log_date).strftime("%Y-%m-%d %H:%M:%S")
+                log_id, product_name, change_qty, note, log_ts = row
+                formatted_date = format_local(log_ts)
                 data.append([log_id, product_name, change_qty, note or "", formatted_date])
             
             if format_type == 'excel' and EXCEL_AVAILABLE:
@@ -639,6 +753,12 @@ class ReportsManager:
                 logging.warning(f"Yearly sales export failed: Invalid year {year_str}")
                 return
             
+            if format_type == 'excel' and EXCEL_AVAILABLE and hasattr(self.app, 'get_report_jobs'):
+                # Year summary plus one sheet per month, built on the report worker processes
+                filename = f"yearly_sales_{year_str}.xlsx"
+                self.start_export(self.app.get_report_jobs().export_sales([year_str], filename), "Yearly sales report")
+                return
+
             headers = ['Product', 'Category', 'Quantity Sold', 'Total (GH₵)']
             data = []
             for row in self.db.get_yearly_sales(year_str):
@@ -671,6 +791,42 @@ class ReportsManager:
             messagebox.showerror("Error", f"Failed to export yearly sales: {str(e)}")
             logging.error(f"Yearly sales export error: {str(e)}")
 
+    def export_all_sales(self, format_type='csv'):
+        """Export every year with sales, one sheet per year and per month"""
+        try:
+            if not hasattr(self.app, 'get_report_jobs'):
+                messagebox.showerror("Error", "Report workers are not available")
+                return
+            years = self.db.get_sales_years()
+            if not years:
+                messagebox.showerror("Error", "No sales to export")
+                return
+            extension = 'xlsx' if format_type == 'excel' and EXCEL_AVAILABLE else 'csv'
+            filename = f"sales_{years[0]}_{years[-1]}_by_month.{extension}"
+            self.start_export(self.app.get_report_jobs().export_sales(years, filename, format_type),
+                              "Sales for all years")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to export sales: {str(e)}")
+            logging.error(f"All-years sales export error: {str(e)}")
+
+    def start_export(self, future, label):
+        """Show progress while a background export runs, then report the result"""
+        self.summary_label.configure(text=f"Exporting {label.lower()}...")
+        self.reports_frame.after(self.EXPORT_POLL_MS, self.finish_export, future, label)
+
+    def finish_export(self, future, label):
+        if not future.done():
+            self.reports_frame.after(self.EXPORT_POLL_MS, self.finish_export, future, label)
+            return
+        try:
+            filename, sheets = future.result()
+            self.summary_label.configure(text=f"{label} exported to {filename} ({sheets} sheets)")
+            messagebox.showinfo("Success", f"{label} exported to {filename}")
+        except Exception as e:
+            self.summary_label.configure(text=f"{label} export failed")
+            messagebox.showerror("Error", f"Failed to export {label.lower()}: {str(e)}")
+            logging.error(f"{label} export error: {str(e)}")
+
     def refresh_reports(self):
         """Refresh the current report display"""
         try:
@@ -685,6 +841,10 @@ class ReportsManager:
                 self.show_inventory_adjustments()
             elif "Yearly Sales" in current_label:
                 self.show_yearly_sales()
+            elif "Year Comparison" in current_label:
+                self.show_year_comparison()
+            elif "Top Products" in current_label:
+                self.show_top_products()
             logging.info("Reports refreshed")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to refresh reports: {str(e)}")
@@ -730,6 +890,8 @@ class ReportsManager:
     def create_excel_workbook(self, title, headers, data, filename):
         """Create a professionally formatted Excel workbook"""
         try:
+            Font, PatternFill, Alignment = openpyxl.styles.Font, openpyxl.styles.PatternFill, openpyxl.styles.Alignment
+            get_column_letter = openpyxl.utils.get_column_letter
             wb = openpyxl.Workbook()
             ws = wb.active
             ws.title = title
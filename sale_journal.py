@@ -0,0 +1,254 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+import logging
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def read_journal(path):
+    """Journal entries in a sale journal file, oldest first"""
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn final line means the sale was never acknowledged
+                logging.warning(f"Skipping unreadable sale journal line {line_no}")
+    return entries
+
+
+def entry_problem(entry):
+    """Why a journal entry can't be a sale, or None if its shape is fine"""
+    if not isinstance(entry, dict):
+        return f"not an object: {type(entry).__name__}"
+    missing = [key for key in ("uid", "product_id", "quantity") if key not in entry]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    quantity = entry["quantity"]
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+        return f"quantity is not a positive integer: {quantity!r}"
+    return None
+
+
+def unapplied_quantities(db, path):
+    """Units per product in a journal file (possibly another process's) that aren't in the database yet
+
+    Applied entries stay in the file until it is truncated, so entries are
+    matched against the recorded sale uids rather than counted blindly.
+    """
+    entries = [entry for entry in read_journal(path) if entry_problem(entry) is None]
+    recorded = db.get_recorded_sale_uids(entry["uid"] for entry in entries)
+    totals = {}
+    for entry in entries:
+        if entry["uid"] not in recorded:
+            totals[entry["product_id"]] = totals.get(entry["product_id"], 0) + entry["quantity"]
+    return totals
+
+
+class SaleJournal:
+    """Append-only sale journal that accepts sales instantly and drains them into SQLite
+
+    Every sale is written as one JSON line and fsync'd before record_sale
+    returns, so checkout only costs a small file append. A background
+    applier moves journaled sales into the database in batches; whatever
+    is still in the file after a crash is replayed on the next start.
+    An entry the database can't take for a reason other than SQLite
+    itself (a missing field, an unparseable date) is moved to
+    <journal>.rejected so it can't hold up the sales behind it.
+    """
+
+    def __init__(self, db, path, batch_size=50, retry_interval=2.0, max_retry_interval=30.0):
+        self.db = db
+        self.path = path
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.applied_count = 0
+        self.rejected_count = 0
+        self.last_error = None
+        self.rejected_path = path + '.rejected'
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pending = self.load_pending()
+        # Entries are applied in order, so entry N is in the database once settled_count >= N
+        self.accepted_count = len(self._pending)
+        self.settled_count = 0
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name="sale-journal-applier", daemon=True)
+        if self._pending:
+            logging.info(f"Sale journal has {len(self._pending)} entries to replay")
+
+    def load_pending(self):
+        """Read journal entries left over from a previous run
+
+        Entries without a usable uid, product_id and quantity are moved to
+        the .rejected file before anything can read them as sales, and the
+        journal is rewritten without them.
+        """
+        pending = []
+        rejected = 0
+        for entry in read_journal(self.path):
+            problem = entry_problem(entry)
+            if problem is None:
+                pending.append(entry)
+            else:
+                self.reject(entry, ValueError(problem))
+                rejected += 1
+        if rejected:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("".join(json.dumps(sale, separators=(',', ':')) + "\n" for sale in pending))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        return pending
+
+    def start(self):
+        """Start the background applier"""
+        self._thread.start()
+        self._wake.set()
+        logging.info(f"Sale journal started: {self.path}")
+
+    def stop(self, timeout=5.0):
+        """Stop the applier after a final drain attempt"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self._file.close()
+        logging.info(f"Sale journal stopped with {self.pending_count()} unapplied entries")
+
+    def record_sale(self, product_id, quantity, total_price):
+        """Durably accept a sale; it reaches the database shortly after"""
+        return self.record_sales([(product_id, quantity, total_price)])[0]
+
+    def record_sales(self, lines):
+        """Durably accept several (product_id, quantity, total_price) sales with a single fsync"""
+        sale_date = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        sales = [{
+            "uid": uuid.uuid4().hex,
+            "product_id": product_id,
+            "quantity": quantity,
+            "total_price": total_price,
+            "sale_date": sale_date,
+        } for product_id, quantity, total_price in lines]
+        data = "".join(json.dumps(sale, separators=(',', ':')) + "\n" for sale in sales)
+        with self._lock:
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending.extend(sales)
+            self.accepted_count += len(sales)
+        self._wake.set()
+        for sale in sales:
+            logging.info(f"Sale journaled: {sale['uid']} product_id {sale['product_id']}, quantity {sale['quantity']}")
+        return sales
+
+    def pending_count(self):
+        """Number of accepted sales not yet in the database"""
+        with self._lock:
+            return len(self._pending)
+
+    def pending_quantity(self, product_id):
+        """Units of a product sold but not yet deducted from products.stock"""
+        with self._lock:
+            return sum(sale["quantity"] for sale in self._pending if sale["product_id"] == product_id)
+
+    def pending_quantities(self):
+        """Unapplied units for every product with journaled sales: {product_id: quantity}"""
+        totals = {}
+        with self._lock:
+            for sale in self._pending:
+                totals[sale["product_id"]] = totals.get(sale["product_id"], 0) + sale["quantity"]
+        return totals
+
+    def _run(self):
+        delay = self.retry_interval
+        while True:
+            self._wake.wait(delay)
+            self._wake.clear()
+            try:
+                while self.drain_batch():
+                    pass
+                delay = self.retry_interval
+                self.last_error = None
+            except sqlite3.Error as e:
+                # Database busy or locked: keep the entries and back off
+                self.last_error = str(e)
+                delay = min(delay * 2, self.max_retry_interval)
+                logging.warning(f"Sale journal apply failed, retrying in {delay:.0f}s: {str(e)}")
+            except Exception as e:
+                # Never let the applier die: later sales would stay pending forever
+                self.last_error = str(e)
+                delay = min(delay * 2, self.max_retry_interval)
+                logging.exception(f"Unexpected sale journal error, retrying in {delay:.0f}s")
+            if self._stop.is_set():
+                break
+
+    def drain_batch(self):
+        """Apply the oldest batch of pending sales; returns False once the journal is empty"""
+        with self._lock:
+            batch = self._pending[:self.batch_size]
+        if not batch:
+            return False
+
+        rejected = 0
+        try:
+            self.db.add_sales_batch(batch)
+        except sqlite3.Error:
+            raise
+        except Exception:
+            logging.exception("Sale journal batch failed; applying its entries one at a time")
+            rejected = self.apply_singly(batch)
+
+        with self._lock:
+            del self._pending[:len(batch)]
+            self.applied_count += len(batch) - rejected
+            self.settled_count += len(batch)
+            if not self._pending:
+                # Everything is in the database; start the file afresh
+                self._file.truncate(0)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        return True
+
+    def apply_singly(self, batch):
+        """Apply a batch entry by entry, quarantining the ones that can't be applied
+
+        Entries applied before a SQLite error are skipped by uid when the
+        batch is retried. Returns the number of entries rejected.
+        """
+        rejected = 0
+        for entry in batch:
+            try:
+                self.db.add_sales_batch([entry])
+            except sqlite3.Error:
+                raise
+            except Exception as e:
+                self.reject(entry, e)
+                rejected += 1
+        return rejected
+
+    def reject(self, entry, error):
+        """Move a bad entry to the .rejected file"""
+        with open(self.rejected_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"entry": entry, "error": repr(error),
+                                "rejected_at": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.rejected_count += 1
+        logging.error(f"Sale journal entry rejected to {self.rejected_path}: {entry!r} ({error!r})")
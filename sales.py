@@ -2,8 +2,10 @@ import tkinter as tk
 from tkinter import messagebox
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from datetime import datetime
+from datetime import datetime, timezone
+import uuid
 from gui_utils import create_labeled_entry, create_button_frame, create_card_frame
+from view_models import cart_row, recent_sales_rows
 import logging
 
 # Safe ToolTip import
@@ -26,6 +28,11 @@ class SalesManager:
         self.app = app
         self.db = db
         self.sales_frame = ttk.Frame(parent, padding=10)
+
+        # Fast entry: code -> ProductRecord index rebuilt when the catalog version moves
+        self.code_index = {}
+        self.code_index_version = None
+        self.cart = {}
         self.create_sales_tab()
 
     def create_sales_tab(self):
@@ -136,6 +143,8 @@ class SalesManager:
                               bootstyle="outline-secondary", command=self.clear_sale_form)
         clear_btn.pack(side='right', padx=(10, 0))
 
+        self.create_fast_entry(left_column)
+
         # Right column - Recent sales
         right_column = ttk.Frame(main_container)
         right_column.grid(row=0, column=1, padx=(10, 0), sticky="nsew")
@@ -202,15 +211,26 @@ class SalesManager:
                 entry.configure(show="")
         logging.info(f"Set placeholder for {entry}")
 
+    def available_stock(self, product_id, stock):
+        """Stock left once sales still waiting in the journal are taken off"""
+        journal = getattr(self.app, 'sale_journal', None)
+        if journal is None:
+            return stock
+        return stock - journal.pending_quantity(product_id)
+
     def refresh_product_list(self):
         """Refresh the product dropdown"""
         try:
-            products = self.db.get_products()
-            self.product_map = {f"{p[1]} (GH₵{p[2]:.2f}, Stock: {p[3]})": p[0] for p in products}
+            selected_id = self.product_map.get(self.product_var.get()) if hasattr(self, 'product_map') else None
+            self.product_map = {f"{p.name} (GH₵{p.unit_price:.2f}, Stock: {self.available_stock(p.id, p.stock)})": p.id
+                                for p in self.db.get_catalog()}
             product_names = list(self.product_map.keys())
             self.product_combo['values'] = product_names
             if product_names:
-                self.product_var.set(product_names[0])
+                # Keep the cashier's current product selected across background refreshes
+                selected = next((name for name, pid in self.product_map.items() if pid == selected_id),
+                                product_names[0])
+                self.product_var.set(selected)
                 self.on_product_select()
             logging.info("Sales product dropdown refreshed")
         except Exception as e:
@@ -223,10 +243,10 @@ class SalesManager:
             return
         product_display = self.product_var.get()
         product_id = self.product_map.get(product_display)
-        result = self.db.get_product_by_id(product_id)
-        if result:
-            price, stock = result
-            self.price_var.set(f"{price:.2f}")
+        product = self.db.get_catalog_product(product_id)
+        if product:
+            stock = self.available_stock(product_id, product.stock)
+            self.price_var.set(f"{product.unit_price:.2f}")
             self.stock_var.set(f"{stock}")
             self.quantity_entry.configure(validate="key", 
                                         validatecommand=(self.quantity_entry.register(self.validate_quantity), "%P", stock))
@@ -246,6 +266,175 @@ class SalesManager:
         except ValueError:
             return False
 
+    def create_fast_entry(self, parent):
+        """Single scan/code input feeding a cart that is committed in one go"""
+        fast_card = create_card_frame(parent, "⚡ Fast Entry")
+        fast_card.pack(fill='both', expand=True)
+
+        entry_frame = ttk.Frame(fast_card)
+        entry_frame.pack(fill='x', pady=(5, 5))
+        self.code_var = tk.StringVar()
+        self.code_entry = ttk.Entry(entry_frame, textvariable=self.code_var, font=("Helvetica", 14))
+        self.code_entry.pack(side='left', fill='x', expand=True)
+        self.code_entry.bind("<Return>", self.on_code_entered)
+        self.code_entry.bind("<KP_Enter>", self.on_code_entered)
+        self.code_entry.bind("<Escape>", lambda e: self.code_var.set(""))
+        self.code_entry.bind("<F12>", lambda e: self.checkout_cart())
+        ToolTip(self.code_entry, text="Scan or type a code, or qty*code (e.g. 20*B5). Enter adds, F12 checks out.")
+
+        self.fast_status_var = tk.StringVar(value="Scan a code or type qty*code")
+        self.fast_status_label = ttk.Label(fast_card, textvariable=self.fast_status_var,
+                                          font=("Helvetica", 10), foreground="#6c757d")
+        self.fast_status_label.pack(anchor='w')
+
+        columns = ('Product', 'Qty', 'Unit', 'Total')
+        self.cart_tree = ttk.Treeview(fast_card, columns=columns, show='headings', height=5, selectmode='browse')
+        for col, width, anchor in (('Product', 170, 'w'), ('Qty', 50, 'center'),
+                                   ('Unit', 70, 'e'), ('Total', 80, 'e')):
+            self.cart_tree.heading(col, text=col, anchor='center')
+            self.cart_tree.column(col, width=width, anchor=anchor)
+        self.cart_tree.pack(fill='both', expand=True, pady=5)
+        self.cart_tree.bind("<Delete>", lambda e: self.remove_cart_line())
+
+        cart_buttons = ttk.Frame(fast_card)
+        cart_buttons.pack(fill='x')
+        self.cart_total_var = tk.StringVar(value="GH₵ 0.00")
+        ttk.Label(cart_buttons, textvariable=self.cart_total_var, font=("Helvetica", 16, "bold"),
+                 foreground="#dc3545").pack(side='left')
+        ttk.Button(cart_buttons, text="Checkout (F12)", bootstyle="success",
+                  command=self.checkout_cart).pack(side='right')
+        ttk.Button(cart_buttons, text="Remove", bootstyle="outline-danger",
+                  command=self.remove_cart_line).pack(side='right', padx=5)
+        ttk.Button(cart_buttons, text="Clear", bootstyle="outline-secondary",
+                  command=self.clear_cart).pack(side='right')
+
+    def get_code_index(self):
+        """Codes and product ids mapped to catalog records, rebuilt only after catalog changes"""
+        catalog = self.db.get_catalog()
+        if self.code_index_version != self.db.catalog_version:
+            index = {str(p.id): p for p in catalog}
+            # Codes win over ids when the two collide
+            index.update({p.code: p for p in catalog if p.code})
+            self.code_index = index
+            self.code_index_version = self.db.catalog_version
+        return self.code_index
+
+    def fast_feedback(self, message, error=False):
+        """Status line under the code entry; errors also ring the bell"""
+        self.fast_status_var.set(message)
+        self.fast_status_label.configure(foreground="#dc3545" if error else "#28a745")
+        if error:
+            self.sales_frame.bell()
+
+    def on_code_entered(self, event=None):
+        """Resolve the typed/scanned code and add it to the cart; no database access"""
+        text = self.code_var.get().strip().upper()
+        self.code_var.set("")
+        if not text:
+            return "break"
+        quantity, _, code = text.rpartition('*')
+        try:
+            quantity = int(quantity) if quantity else 1
+        except ValueError:
+            self.fast_feedback(f"Bad quantity in '{text}'", error=True)
+            return "break"
+        product = self.get_code_index().get(code.strip())
+        if product is None:
+            self.fast_feedback(f"Unknown code '{code}'", error=True)
+            return "break"
+        if quantity <= 0:
+            self.fast_feedback("Quantity must be positive", error=True)
+            return "break"
+
+        in_cart = self.cart.get(product.id, 0)
+        available = self.available_stock(product.id, product.stock) - in_cart
+        if quantity > available:
+            self.fast_feedback(f"Only {available} {product.name} left", error=True)
+            return "break"
+
+        self.cart[product.id] = in_cart + quantity
+        self.render_cart_line(product)
+        self.fast_feedback(f"+{quantity} {product.name}")
+        return "break"
+
+    def render_cart_line(self, product):
+        """Insert or update one cart row and the running total"""
+        values = cart_row(product, self.cart[product.id])
+        iid = str(product.id)
+        if self.cart_tree.exists(iid):
+            self.cart_tree.item(iid, values=values)
+        else:
+            self.cart_tree.insert("", "end", iid=iid, values=values)
+        self.update_cart_total()
+
+    def update_cart_total(self):
+        """Show the cart total at current catalog prices"""
+        total = 0.0
+        for product_id, quantity in self.cart.items():
+            product = self.db.get_catalog_product(product_id)
+            if product is not None:
+                total += product.unit_price * quantity
+        self.cart_total_var.set(f"GH₵ {total:.2f}")
+
+    def remove_cart_line(self):
+        """Drop the selected cart line"""
+        selection = self.cart_tree.selection()
+        if not selection:
+            return
+        self.cart.pop(int(selection[0]), None)
+        self.cart_tree.delete(selection[0])
+        self.update_cart_total()
+        self.code_entry.focus_set()
+
+    def clear_cart(self):
+        """Empty the cart"""
+        self.cart = {}
+        for item in self.cart_tree.get_children():
+            self.cart_tree.delete(item)
+        self.update_cart_total()
+        self.code_entry.focus_set()
+
+    def checkout_cart(self):
+        """Record every cart line as one journal write (or one database transaction)"""
+        if not self.cart:
+            self.fast_feedback("Cart is empty", error=True)
+            return
+        lines = []
+        for product_id, quantity in self.cart.items():
+            product = self.db.get_catalog_product(product_id)
+            if product is None:
+                self.fast_feedback("A product in the cart no longer exists", error=True)
+                return
+            if quantity > self.available_stock(product_id, product.stock):
+                self.fast_feedback(f"Not enough {product.name} left", error=True)
+                return
+            lines.append((product_id, quantity, quantity * product.unit_price))
+
+        try:
+            journal = getattr(self.app, 'sale_journal', None)
+            if journal is not None:
+                journal.record_sales(lines)
+            else:
+                sale_date = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                self.db.add_sales_batch([
+                    {"uid": uuid.uuid4().hex, "product_id": pid, "quantity": qty,
+                     "total_price": total, "sale_date": sale_date}
+                    for pid, qty, total in lines
+                ])
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to process sale: {str(e)}")
+            logging.error(f"Fast entry checkout error: {str(e)}")
+            return
+
+        grand_total = sum(total for _, _, total in lines)
+        logging.info(f"Fast entry checkout: {len(lines)} lines, total GH₵{grand_total:.2f}")
+        self.clear_cart()
+        self.fast_feedback(f"Sold {len(lines)} lines for GH₵{grand_total:.2f}")
+        for product_id, quantity, total in lines:
+            self.app.on_sale_completed(product_id, quantity, total)
+        self.refresh_product_list()
+        self.refresh_recent_sales()
+
     def calculate_total(self, *args):
         """Calculate total price"""
         try:
@@ -278,14 +467,15 @@ class SalesManager:
         
         product_display = self.product_var.get()
         product_id = self.product_map.get(product_display)
-        result = self.db.get_product_by_id(product_id)
+        product = self.db.get_catalog_product(product_id)
         
-        if not result:
+        if not product:
             messagebox.showerror("Error", "Product not found")
             logging.error(f"Sale attempt failed: Product not found for display {product_display}")
             return
         
-        unit_price, current_stock = result
+        unit_price = product.unit_price
+        current_stock = self.available_stock(product_id, product.stock)
         
         if quantity > current_stock:
             messagebox.showerror("Error", f"Insufficient stock. Available: {current_stock}")
@@ -294,12 +484,16 @@ class SalesManager:
         
         total_price = quantity * unit_price
         try:
-            self.db.add_sale(product_id, quantity, total_price)
+            journal = getattr(self.app, 'sale_journal', None)
+            if journal is not None:
+                journal.record_sale(product_id, quantity, total_price)
+            else:
+                self.db.add_sale(product_id, quantity, total_price)
             logging.info(f"Sale completed: Product ID {product_id}, Quantity {quantity}, Total GH₵{total_price:.2f}, New stock {current_stock - quantity}")
             messagebox.showinfo("Success", f"Sale completed!\nTotal: GH₵{total_price:.2f}\nNew stock: {current_stock - quantity}")
             self.clear_sale_form()
             self.refresh_recent_sales()
-            self.app.refresh_all_managers()
+            self.app.on_sale_completed(product_id, quantity, total_price)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to process sale: {str(e)}")
             logging.error(f"Sale processing error: {str(e)}")
@@ -321,12 +515,8 @@ class SalesManager:
             for item in self.sales_tree.get_children():
                 self.sales_tree.delete(item)
             
-            for row in self.db.get_recent_sales():
-                sale_id, product_name, quantity, total, date = row
-                formatted_date = datetime.fromisoformat(date).strftime("%Y-%m-%d %H:%M:%S")
-                self.sales_tree.insert("", "end", values=(
-                    sale_id, product_name, quantity, f"GH₵{total:.2f}", formatted_date
-                ))
+            for values in recent_sales_rows(self.db.get_recent_sales()):
+                self.sales_tree.insert("", "end", values=values)
             logging.info("Recent sales display refreshed")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to refresh sales: {str(e)}")
@@ -0,0 +1,119 @@
+import json
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+import logging
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class StallWatchdog:
+    """Catch the Tk main thread in the act when the till freezes
+
+    A heartbeat scheduled with after() stamps the time every interval_ms.
+    A background thread checks the stamp; once it is more than threshold_s
+    late, the main thread's stack is taken from sys._current_frames()
+    together with the active tab and the DatabaseHandler call the main
+    thread is inside (from the instrumentation's in-flight stacks), and a
+    warning goes to pos.log straight away in case the freeze never ends.
+    When the heartbeat comes back the stall's full length is known: it is
+    appended to stalls.jsonl, recorded as 'stall.main_thread' in the
+    diagnostics and added to the stall summary the diagnostics tab shows.
+    """
+
+    def __init__(self, app, threshold_s=0.5, interval_ms=100, log_path='stalls.jsonl'):
+        self.app = app
+        self.threshold = threshold_s
+        self.interval_ms = interval_ms
+        self.log_path = log_path
+        self.job = None
+        self.main_ident = threading.get_ident()
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+
+        self._last_beat = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stall-watchdog", daemon=True)
+
+    def start(self):
+        """Start the heartbeat (call from the Tk thread) and the watching thread"""
+        self._last_beat = time.perf_counter()
+        self.job = self.app.root.after(self.interval_ms, self._beat)
+        self._thread.start()
+        logging.info(f"Stall watchdog started: threshold {self.threshold * 1000:.0f} ms")
+
+    def stop(self, timeout=1.0):
+        """Stop watching and cancel the heartbeat"""
+        self._stop.set()
+        if self.job:
+            self.app.root.after_cancel(self.job)
+            self.job = None
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _beat(self):
+        self._last_beat = time.perf_counter()
+        self.job = self.app.root.after(self.interval_ms, self._beat)
+
+    def _run(self):
+        interval = self.interval_ms / 1000
+        stall = None
+        while not self._stop.wait(interval / 2):
+            last_beat = self._last_beat
+            lag = time.perf_counter() - last_beat - interval
+            if stall is None:
+                if lag > self.threshold:
+                    stall = self.capture(last_beat, lag)
+            elif last_beat != stall["last_beat"]:
+                # Heartbeat is back: the loop was blocked from the missed beat until this one
+                self.finish(stall, last_beat - stall["last_beat"] - interval)
+                stall = None
+
+    def capture(self, last_beat, lag):
+        """Record where the main thread is while it is stuck"""
+        frame = sys._current_frames().get(self.main_ident)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        calls = self.app.diagnostics.stack_of(self.main_ident)
+        db_calls = [(name, seconds) for name, seconds in calls if name.startswith('db.')]
+        stall = {
+            "last_beat": last_beat,
+            "started_at": datetime.fromtimestamp(time.time() - lag).isoformat(timespec='milliseconds'),
+            "tab": getattr(self.app, 'active_tab', None),
+            # Innermost database call on the main thread, if it is waiting on one
+            "db_call": {"name": db_calls[-1][0], "seconds": round(db_calls[-1][1], 3)} if db_calls else None,
+            "calls": [name for name, _ in calls],
+            "other_threads": [{"thread": thread, "name": name, "seconds": round(seconds, 3)}
+                              for thread, name, seconds in self.app.diagnostics.in_flight()
+                              if thread != threading.main_thread().name],
+            "stack": [line.rstrip('\n') for line in stack],
+        }
+        where = stall["db_call"]["name"] if stall["db_call"] else (stack[-1].strip().splitlines()[0] if stack else "unknown")
+        logging.warning(f"Main thread stalled for {lag * 1000:.0f} ms so far on tab {stall['tab']} in {where}\n"
+                        + "".join(stack))
+        return stall
+
+    def finish(self, stall, seconds):
+        """Log a stall that has ended and add it to the diagnostics"""
+        del stall["last_beat"]
+        stall["seconds"] = round(seconds, 3)
+        self.count += 1
+        self.total += seconds
+        self.longest = max(self.longest, seconds)
+        self.app.diagnostics.record('stall.main_thread', seconds)
+        self.app.diagnostics.stalls = {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 1),
+            "longest_ms": round(self.longest * 1000, 1),
+            "last": {key: stall[key] for key in ("started_at", "seconds", "tab", "db_call")},
+        }
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(stall) + '\n')
+        except OSError as e:
+            logging.error(f"Could not write stall log: {str(e)}")
+        logging.warning(f"Main thread stall ended after {seconds * 1000:.0f} ms (tab {stall['tab']})")
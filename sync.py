@@ -0,0 +1,135 @@
+import logging
+
+# Configure logging
+logging.basicConfig(filename='pos.log', level=logging.INFO,
+                    format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class ChangeFeedMonitor:
+    """Keep this terminal's screens current with writes made by other terminals
+
+    Every tick costs one PRAGMA data_version, which only moves when another
+    connection commits to the database file. When it moves, the rows added
+    to change_log since the last seen version are pulled, the changed rows
+    are fetched by id, and only the affected views are updated.
+    """
+
+    # Tab refreshes triggered by each table in the change feed
+    TABLE_REFRESHES = {
+        'products': [
+            ('inventory_manager', 'refresh_current_stocks'),
+            ('inventory_manager', 'refresh_product_list'),
+            ('products_manager', 'refresh_products_display'),
+            ('sales_manager', 'refresh_product_list'),
+        ],
+        'sales': [
+            ('sales_manager', 'refresh_recent_sales'),
+            ('reports_manager', 'refresh_reports'),
+        ],
+        'inventory_logs': [
+            ('inventory_manager', 'refresh_current_stocks'),
+            ('inventory_details_manager', 'refresh_history'),
+        ],
+    }
+
+    def __init__(self, app, db, interval_ms=1000):
+        self.app = app
+        self.db = db
+        self.interval_ms = interval_ms
+        self.job = None
+        self.data_version = self.db.get_data_version()
+        self.last_version = self.db.get_change_log_bounds()[1]
+
+    def start(self):
+        """Begin polling on the Tk event loop"""
+        self.job = self.app.root.after(self.interval_ms, self.poll)
+        logging.info(f"Change feed monitor started at version {self.last_version}")
+
+    def stop(self):
+        """Cancel the pending poll"""
+        if self.job:
+            self.app.root.after_cancel(self.job)
+            self.job = None
+
+    def poll(self):
+        """Pull and apply remote changes if another connection has committed"""
+        try:
+            data_version = self.db.get_data_version()
+            if data_version != self.data_version:
+                self.data_version = data_version
+                self.pull_changes()
+        except Exception as e:
+            logging.error(f"Change feed poll failed: {str(e)}")
+        self.job = self.app.root.after(self.interval_ms, self.poll)
+
+    def pull_changes(self):
+        """Apply every change_log entry after the last seen version"""
+        oldest, newest = self.db.get_change_log_bounds()
+        if oldest > self.last_version + 1:
+            # Entries we never saw were pruned; only a full reload is safe
+            logging.warning(f"Change feed gap ({self.last_version} -> {oldest}), reloading all views")
+            self.last_version = newest
+            self.db.invalidate_catalog()
+            self.app.refresh_all_managers()
+            return
+
+        changed = {'products': set(), 'sales': set(), 'inventory_logs': set()}
+        deleted = set()
+        while True:
+            changes = self.db.get_changes_since(self.last_version)
+            if not changes:
+                break
+            for version, table_name, row_id, op, is_local in changes:
+                if is_local or table_name not in changed:
+                    continue
+                if op == 'DELETE':
+                    deleted.add(table_name)
+                    changed[table_name].discard(row_id)
+                else:
+                    changed[table_name].add(row_id)
+            self.last_version = changes[-1][0]
+
+        touched = {table for table, ids in changed.items() if ids} | deleted
+        if not touched:
+            return
+        if 'products' in touched:
+            # Another terminal changed products or stock; our cached catalog is out of date
+            self.db.invalidate_catalog()
+        self.apply_to_dashboard(changed, deleted)
+        self.refresh_tabs(touched)
+        logging.info(f"Applied remote changes up to version {self.last_version}: {sorted(touched)}")
+
+    def apply_to_dashboard(self, changed, deleted):
+        """Feed new remote rows to the dashboard as deltas"""
+        dashboard = self.app.dashboard_manager
+        if not hasattr(dashboard, 'apply_sale'):
+            return
+        if deleted:
+            # Deletions can't be applied as deltas
+            dashboard.mark_stale()
+
+        for _, product_id, quantity, total_price, _ in self.db.get_sales_by_ids(changed['sales']):
+            dashboard.apply_sale(product_id, quantity, total_price)
+        for _, product_id, change_qty, note, _ in self.db.get_inventory_logs_by_ids(changed['inventory_logs']):
+            dashboard.apply_stock_change(product_id, change_qty, note)
+
+        # Product rows carry the authoritative stock, so they go last
+        journal = getattr(self.app, 'sale_journal', None)
+        for row in self.db.get_products_by_ids(changed['products']):
+            pending = journal.pending_quantity(row[0]) if journal else 0
+            dashboard.apply_product_row(row, pending)
+
+    def refresh_tabs(self, tables):
+        """Run each affected tab refresh once"""
+        done = set()
+        for table in tables:
+            for manager_name, method in self.TABLE_REFRESHES.get(table, []):
+                if (manager_name, method) in done:
+                    continue
+                done.add((manager_name, method))
+                manager = getattr(self.app, manager_name, None)
+                if hasattr(manager, method):
+                    try:
+                        getattr(manager, method)()
+                    except Exception as e:
+                        logging.error(f"Error refreshing {manager_name}.{method}: {str(e)}")
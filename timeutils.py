@@ -0,0 +1,95 @@
+"""Epoch timestamp helpers
+
+sales.sale_ts and inventory_logs.log_ts hold whole seconds since the Unix
+epoch. Queries filter and sort on them with plain integer comparisons;
+text is only produced at display time, in local time, through a cached
+formatter. Stored calendar periods (report days, months and years, stock
+snapshot days, archive years) are UTC, the same as the TEXT
+sale_date/log_date columns, which are still written for older terminals.
+"""
+import calendar
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+DISPLAY_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def now_ts():
+    """Current time as epoch seconds"""
+    return int(time.time())
+
+
+def utc_text(ts):
+    """Epoch seconds as a 'YYYY-MM-DD HH:MM:SS' UTC string (the CURRENT_TIMESTAMP format)"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(ts))
+
+
+def text_to_ts(text):
+    """Parse a stored UTC timestamp string back to epoch seconds"""
+    parsed = datetime.fromisoformat(str(text))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def period_bounds(period):
+    """[start, end) epoch seconds of a UTC 'YYYY', 'YYYY-MM' or 'YYYY-MM-DD' period"""
+    period = str(period)
+    parts = [int(part) for part in period.split('-')]
+    if len(parts) == 1:
+        start, end = (parts[0], 1, 1), (parts[0] + 1, 1, 1)
+    elif len(parts) == 2:
+        year, month = parts
+        start = (year, month, 1)
+        end = (year + 1, 1, 1) if month == 12 else (year, month + 1, 1)
+    elif len(parts) == 3:
+        day = datetime(*parts)
+        following = day + timedelta(days=1)
+        start, end = parts, (following.year, following.month, following.day)
+    else:
+        raise ValueError(f"Not a year, month or day: {period}")
+    return calendar.timegm((*start, 0, 0, 0)), calendar.timegm((*end, 0, 0, 0))
+
+
+def local_day_start(days_ago=0):
+    """Epoch seconds of local midnight, days_ago days back"""
+    midnight = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days_ago)
+    return int(midnight.timestamp())
+
+
+@lru_cache(maxsize=4096)
+def format_local(ts, fmt=DISPLAY_FORMAT):
+    """Epoch seconds as local time text; cached because the same rows are redrawn on every refresh"""
+    if ts is None:
+        return ""
+    return time.strftime(fmt, time.localtime(ts))
+
+
+# "MM:SS" for every second of an hour, so bulk formatting is one lookup per row
+_MINUTE_SECOND = [f"{minute:02d}:{second:02d}" for minute in range(60) for second in range(60)]
+
+
+def format_local_many(timestamps):
+    """format_local (default format) over many timestamps at once
+
+    Rows in the same hour share one localtime/strftime call; the minutes
+    and seconds come from a lookup table. Zones whose offset isn't a whole
+    number of hours fall back to format_local per row.
+    """
+    hours = {}
+    formatted = []
+    append = formatted.append
+    for ts in timestamps:
+        if ts is None:
+            append("")
+            continue
+        second = ts % 3600
+        hour = ts - second
+        prefix = hours.get(hour)
+        if prefix is None:
+            start = time.localtime(hour)
+            whole_hour = not (start.tm_min or start.tm_sec)
+            prefix = hours[hour] = time.strftime('%Y-%m-%d %H:', start) if whole_hour else False
+        append(prefix + _MINUTE_SECOND[second] if prefix else format_local(ts))
+    return formatted
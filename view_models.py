@@ -0,0 +1,128 @@
+"""Display rows for the Tk tables, built in bulk and without Tk
+
+Each builder turns DatabaseHandler rows (or catalog records) into the
+exact value tuples a Treeview shows, so the views only insert them and
+the formatting can be timed headlessly (see bench_view_models.py).
+Builders work column-wise: each formatted column formats its distinct
+values once (sale totals are price x quantity and stock changes are small
+integers, so they repeat a lot) and timestamps go through one batched
+pass.
+"""
+from operator import mul
+from timeutils import format_local_many
+
+CURRENCY = "GH₵"
+
+_money = (CURRENCY + "{:.2f}").format
+_amount = "{:.2f}".format
+
+STATUS_OUT = "🔴 Out of Stock"
+STATUS_LOW = "🟡 Low Stock"
+STATUS_NORMAL = "🟢 Normal"
+
+
+def money(value):
+    """Currency text, e.g. GH₵12.50"""
+    return _money(value)
+
+
+def signed(quantity):
+    """Stock change with an explicit + for additions"""
+    return f"+{quantity}" if quantity > 0 else str(quantity)
+
+
+def _columns(rows, width):
+    """Transpose rows into width column tuples (empty tuples for no rows)"""
+    return tuple(zip(*rows)) if rows else ((),) * width
+
+
+def _formatted(formatter, values):
+    """formatter applied to a column, calling it once per distinct value"""
+    texts = {value: formatter(value) for value in set(values)}
+    return map(texts.__getitem__, values)
+
+
+def recent_sales_rows(rows):
+    """(id, product_name, quantity, total, sale_ts) -> Recent Sales table values"""
+    ids, names, quantities, totals, stamps = _columns(rows, 5)
+    return list(zip(ids, names, quantities, _formatted(_money, totals), format_local_many(stamps)))
+
+
+def cart_row(product, quantity):
+    """Values for one fast-entry cart line"""
+    return (product.name, quantity, _amount(product.unit_price), _amount(quantity * product.unit_price))
+
+
+def stock_rows(catalog, search="", status_filter="All"):
+    """Catalog records -> Current Stock table values, after the search and status filters"""
+    term = search.lower()
+    rows = []
+    append = rows.append
+    for product in catalog:
+        name = product.name
+        if term and term not in name.lower():
+            continue
+        stock = product.stock
+        low = stock < product.reorder_level
+        if status_filter == "Low Stock" and not low:
+            continue
+        elif status_filter == "Out of Stock" and stock > 0:
+            continue
+        elif status_filter == "Normal Stock" and low:
+            continue
+        status = STATUS_OUT if stock == 0 else (STATUS_LOW if low else STATUS_NORMAL)
+        append((product.id, name, product.category, stock, status))
+    return rows
+
+
+def product_rows(catalog, search="", category="All"):
+    """Catalog records -> Products table values, after the search and category filters"""
+    term = search.lower()
+    selected = [p for p in catalog
+                if (not term or term in p.name.lower()) and (category == "All" or p.category == category)]
+    ids, names, categories, types, prices, stocks, reorder_levels, codes = _columns(selected, 8)
+    # Prices and stock values are mostly distinct per product, so these are formatted directly
+    values = map(_money, map(mul, prices, stocks))
+    return list(zip(ids, names, categories, types, map(_money, prices), stocks, reorder_levels, values,
+                    (code or "" for code in codes)))
+
+
+def inventory_log_rows(rows):
+    """(id, product_name, change_qty, note, log_ts) -> Inventory History table values"""
+    ids, names, changes, notes, stamps = _columns(rows, 5)
+    return list(zip(ids, names, _formatted(signed, changes), (note or "No note" for note in notes),
+                    format_local_many(stamps)))
+
+
+def history_rows(rows):
+    """(kind, row_id, change_qty, total_price, note, ts) -> Product History window values"""
+    kinds, row_ids, changes, totals, notes, stamps = _columns(rows, 6)
+    details = [f"Sale ID: {row_id}, Total: {_money(total)}" if kind == 'Sale' else (note or "No note")
+               for kind, row_id, total, note in zip(kinds, row_ids, totals, notes)]
+    return list(zip(kinds, _formatted(signed, changes), details, format_local_many(stamps)))
+
+
+def recent_sale_summary_rows(rows):
+    """Recent sales -> dashboard Recent Sales values (product, quantity, total)"""
+    _, names, quantities, totals, _ = _columns(rows, 5)
+    return list(zip(names, quantities, _formatted(_money, totals)))
+
+
+def recent_change_rows(rows):
+    """Inventory logs -> dashboard Recent Inventory Changes values (product, change, note)"""
+    _, names, changes, notes, _ = _columns(rows, 5)
+    return list(zip(names, _formatted(signed, changes), (note or "N/A" for note in notes)))
+
+
+def ranked_sales_rows(product_sales):
+    """{name: (quantity, revenue)} -> (name, quantity, revenue text), best revenue first"""
+    ranked = sorted(product_sales.items(), key=lambda item: item[1][1], reverse=True)
+    return [(name, quantity, _amount(revenue)) for name, (quantity, revenue) in ranked]
+
+
+def forecast_rows(forecasts):
+    """Forecast records -> dashboard Stock-out Forecast values"""
+    return [(f.name, f.available, _amount(f.daily_rate),
+             "Out" if f.days_left == 0 else ("" if f.days_left is None else f.days_left),
+             f.stockout_date or "", f.reorder_qty or "")
+            for f in forecasts]